@@ -0,0 +1,280 @@
+# academic_calendar.py - 校历：按日期把作息规则编译成每分钟的时间因子与高峰标记
+#
+# data/calendar.json 定义若干"作息"（一组 时间窗 -> 时间因子 的规则，含义同 scoring.TIME_FACTOR_RULES）
+# 和按顺序匹配的日期规则。每条规则按星期、日期区间或日期列表选中某些天，然后
+#   - 指定 profile：这一天改用另一套作息（周末、考试周、节假日；调休上课改回"教学日"），后面的规则优先；
+#   - 或给出 windows + factor：只在这些时间窗上覆盖时间因子（调课、运动会、新生报到等）。
+# 没有被规则选中的日子使用"教学日"作息，即 scoring.TIME_FACTOR_RULES。
+# 每个日期只编译一次，得到 1440 分钟的 时间因子 / 是否高峰 / 所在高峰时段 数组，
+# 服务时查某一分钟只是一次数组索引，不再逐条匹配规则。
+#
+# 用法：
+#   python academic_calendar.py 2026-01-08          # 打印当天的作息、生效规则与高峰时段
+import argparse
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import date as calendar_date
+
+import numpy as np
+
+from opening_hours import MINUTES_PER_DAY, WEEKDAY_NAMES, parse_intervals, parse_weekdays
+from scoring import OFF_PEAK_FACTOR, PEAK_FACTOR_THRESHOLD, TIME_FACTOR_RULES
+
+CALENDAR_PATH = os.environ.get(
+    "CANTEEN_CALENDAR_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "calendar.json")
+)
+DEFAULT_PROFILE = "教学日"
+MAX_CACHED_DAYS = 400
+
+# 高峰时段按开始时间命名
+MEAL_NAMES = [(10 * 60 + 30, "早餐"), (15 * 60, "午餐"), (21 * 60, "晚餐"), (MINUTES_PER_DAY, "夜宵")]
+WEEKDAY_LABELS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class CalendarError(ValueError):
+    """校历格式或取值有误"""
+
+
+def meal_name(minute):
+    """某一分钟开始的高峰属于哪一餐"""
+    return next(name for end, name in MEAL_NAMES if minute < end)
+
+
+def format_window(window):
+    """(开始, 结束) 分钟 -> "11:40-12:30" """
+    return "-".join(f"{m // 60:02d}:{m % 60:02d}" for m in window)
+
+
+# ============ 数据结构 ============
+@dataclass(frozen=True)
+class CalendarRule:
+    """一条日期规则：条件都满足的日子改用 profile 作息，或在 windows 上把时间因子设为 factor"""
+    name: str
+    weekdays: frozenset = None     # 星期（0 表示周一），None 表示不限
+    start: calendar_date = None    # 日期区间，两端均包含
+    end: calendar_date = None
+    dates: frozenset = None        # 指定日期列表
+    profile: str = None
+    windows: tuple = ()            # ((开始, 结束), ...)，两端均包含
+    factor: float = None
+
+    def matches(self, day):
+        return ((self.weekdays is None or day.weekday() in self.weekdays)
+                and (self.start is None or self.start <= day)
+                and (self.end is None or day <= self.end)
+                and (self.dates is None or day in self.dates))
+
+
+@dataclass(frozen=True)
+class DaySchedule:
+    """某一天编译好的作息，数组长度均为 1440"""
+    date: calendar_date
+    profile: str               # 采用的作息
+    events: tuple              # 生效的规则名称：选定作息的规则（如有）与各覆盖规则
+    factor: np.ndarray         # 时间因子
+    peak: np.ndarray           # 是否高峰（时间因子超过 PEAK_FACTOR_THRESHOLD）
+    window: np.ndarray         # 所在高峰时段在 peak_windows 中的下标，非高峰为 -1
+    peak_windows: tuple        # 高峰时段 ((开始, 结束), ...)，两端均包含
+
+    @property
+    def signature(self):
+        """作息与生效规则都相同的日子时间因子完全一致，可共用缓存"""
+        return self.profile, self.events
+
+    def peak_window_at(self, minute):
+        """minute 所在的高峰时段 (开始, 结束)，不在高峰时为 None"""
+        i = self.window[int(minute) % MINUTES_PER_DAY]
+        return None if i < 0 else self.peak_windows[i]
+
+    def describe(self):
+        """"周四 · 考试周作息 · 期末考试周" 这样的说明"""
+        parts = [WEEKDAY_LABELS[self.date.weekday()], f"{self.profile}作息"]
+        return " · ".join(parts + [e for e in self.events if e != self.profile])
+
+
+# ============ 编译 ============
+def _apply(factor, rules):
+    """按 TIME_FACTOR_RULES 的语义写入时间因子：规则按顺序匹配，先匹配的优先"""
+    for windows, value in reversed(rules):
+        for start, end in windows:
+            factor[start:end + 1] = value
+
+
+class AcademicCalendar:
+    """作息与日期规则；day() 按日期编译并缓存"""
+
+    def __init__(self, profiles=None, rules=(), path=None, mtime=None):
+        self.profiles = {DEFAULT_PROFILE: TIME_FACTOR_RULES, **(profiles or {})}
+        self.rules = list(rules)
+        self.path = path
+        self.mtime = mtime
+        self._days = {}
+
+    def compile(self, day):
+        """编译某一天的作息（不使用缓存）"""
+        matched = [rule for rule in self.rules if rule.matches(day)]
+        chosen = [rule for rule in matched if rule.profile is not None][-1:]
+        overlays = [rule for rule in matched if rule.profile is None]
+        profile = chosen[0].profile if chosen else DEFAULT_PROFILE
+
+        factor = np.full(MINUTES_PER_DAY, OFF_PEAK_FACTOR)
+        _apply(factor, self.profiles[profile])
+        for rule in overlays:
+            _apply(factor, [(rule.windows, rule.factor)])
+
+        peak = factor > PEAK_FACTOR_THRESHOLD
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], peak.astype(np.int8), [0]])))
+        peak_windows = tuple(zip(edges[::2].tolist(), (edges[1::2] - 1).tolist()))
+        window = np.full(MINUTES_PER_DAY, -1, dtype=np.int16)
+        for i, (start, end) in enumerate(peak_windows):
+            window[start:end + 1] = i
+        for array in (factor, peak, window):
+            array.setflags(write=False)
+        return DaySchedule(date=day, profile=profile, events=tuple(rule.name for rule in chosen + overlays),
+                           factor=factor, peak=peak, window=window, peak_windows=peak_windows)
+
+    def day(self, day):
+        """某一天的作息，同一日期只编译一次"""
+        schedule = self._days.get(day)
+        if schedule is None:
+            schedule = self.compile(day)
+            if len(self._days) >= MAX_CACHED_DAYS:
+                self._days = {}
+            self._days[day] = schedule
+        return schedule
+
+
+# ============ 读取 ============
+def _parse_windows(texts, where, problems):
+    """["11:40-12:30", ...] -> ((开始, 结束), ...)，两端均包含，不允许跨过午夜"""
+    windows = []
+    if not (isinstance(texts, list) and texts and all(isinstance(t, str) for t in texts)):
+        problems.append(f"{where}: windows 必须是非空的时间窗字符串列表")
+        return ()
+    for text in texts:
+        try:
+            intervals = parse_intervals(text)
+        except ValueError as exc:
+            problems.append(f"{where}: {exc}")
+            continue
+        for start, end in intervals:
+            if end <= start:
+                problems.append(f"{where}: 时间窗不能跨过午夜: {text!r}")
+            windows.append((start, min(end, MINUTES_PER_DAY - 1)))
+    return tuple(windows)
+
+
+def _parse_factor(value, where, problems):
+    if not (isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0):
+        problems.append(f"{where}: factor 必须是正数")
+        return None
+    return float(value)
+
+
+def _parse_date(text, where, problems):
+    if not (isinstance(text, str) and _DATE_RE.fullmatch(text)):
+        problems.append(f"{where}: 日期必须是 YYYY-MM-DD: {text!r}")
+        return None
+    try:
+        return calendar_date.fromisoformat(text)
+    except ValueError:
+        problems.append(f"{where}: 无效的日期: {text!r}")
+        return None
+
+
+def _parse_profiles(data, problems):
+    profiles = {}
+    for name, entries in data.items():
+        if not (isinstance(entries, list) and all(isinstance(e, dict) for e in entries)):
+            problems.append(f"作息 {name}: 必须是 {{windows, factor}} 对象列表")
+            continue
+        profiles[name] = [(_parse_windows(e.get("windows"), f"作息 {name}", problems),
+                           _parse_factor(e.get("factor"), f"作息 {name}", problems)) for e in entries]
+    return profiles
+
+
+def _parse_rule(i, record, profiles, problems):
+    if not isinstance(record, dict) or not isinstance(record.get("name"), str) or not record["name"].strip():
+        problems.append(f"第 {i + 1} 条规则缺少 name")
+        return None
+    where = f"规则 {record['name']}"
+    fields = {"name": record["name"]}
+    if "weekdays" in record:
+        try:
+            fields["weekdays"] = frozenset(parse_weekdays(record["weekdays"]))
+        except (ValueError, IndexError):
+            problems.append(f"{where}: 无法解析星期 {record['weekdays']!r}（可用 {', '.join(WEEKDAY_NAMES)} 或 0-6）")
+    for field in ("from", "to"):
+        if field in record:
+            fields["start" if field == "from" else "end"] = _parse_date(record[field], where, problems)
+    if "dates" in record:
+        if isinstance(record["dates"], list):
+            fields["dates"] = frozenset(_parse_date(d, where, problems) for d in record["dates"])
+        else:
+            problems.append(f"{where}: dates 必须是日期列表")
+
+    if ("profile" in record) == ("windows" in record):
+        problems.append(f"{where}: 必须且只能给出 profile 或 windows + factor 之一")
+    elif "profile" in record:
+        if record["profile"] not in profiles:
+            problems.append(f"{where}: 未定义的作息 {record['profile']!r}")
+        fields["profile"] = record["profile"]
+    else:
+        fields["windows"] = _parse_windows(record["windows"], where, problems)
+        fields["factor"] = _parse_factor(record.get("factor"), where, problems)
+    return CalendarRule(**fields)
+
+
+def parse_calendar(data, path=None, mtime=None):
+    """校历字典 -> AcademicCalendar，有问题时抛出 CalendarError（列出所有问题）"""
+    problems = []
+    if not isinstance(data, dict):
+        raise CalendarError("校历必须是包含 profiles 与 rules 的对象")
+    profiles = _parse_profiles(data.get("profiles", {}), problems)
+    known = {DEFAULT_PROFILE, *profiles}
+    rules = [_parse_rule(i, record, known, problems) for i, record in enumerate(data.get("rules", []))]
+    if problems:
+        raise CalendarError("校历校验失败：\n" + "\n".join(problems))
+    return AcademicCalendar(profiles, rules, path, mtime)
+
+
+def load_calendar(path=CALENDAR_PATH):
+    """加载并校验校历；文件不存在时每天都使用"教学日"作息"""
+    if not os.path.exists(path):
+        return AcademicCalendar(path=path)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise CalendarError(f"无法读取校历 {path}: {exc}") from None
+    return parse_calendar(data, path, mtime)
+
+
+def calendar_mtime(path=CALENDAR_PATH):
+    """校历文件的修改时间，不存在时为 None"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查看某一天按校历编译的作息")
+    parser.add_argument("dates", nargs="+", type=calendar_date.fromisoformat, help="日期 YYYY-MM-DD")
+    parser.add_argument("--calendar", default=CALENDAR_PATH, help="校历文件")
+    args = parser.parse_args(argv)
+
+    calendar = load_calendar(args.calendar)
+    for day in args.dates:
+        schedule = calendar.day(day)
+        peaks = "、".join(f"{meal_name(w[0])} {format_window(w)}" for w in schedule.peak_windows) or "无"
+        print(f"{day}  {schedule.describe()}  最高时间因子 {schedule.factor.max():g}  高峰：{peaks}")
+
+
+if __name__ == "__main__":
+    main()
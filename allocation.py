@@ -0,0 +1,110 @@
+# allocation.py - 按剩余容量分流推荐
+#
+# 高峰期所有会话按同样规则评分，会被推荐到同一个"今日最佳"，反而制造拥堵。
+# 分流模式把同一时间桶内所有在线会话的需求合并，在满足各自价格、类型、
+# 等待约束（可行矩阵）的前提下，按食堂剩余容量分配：
+#   1. 价格调整：超载食堂逐轮提高"拥挤价格"，把边际用户推向次优选择；
+#   2. 容量修复：未分配或仍超载时，按偏好强度分轮录取，保证不超过容量。
+# 每轮都是对 N × M 矩阵的向量化运算，几千人一个桶也只需几毫秒。
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_BUCKET_MINUTES = 10
+DEFAULT_ROUNDS = 30
+DEFAULT_STEP = 0.5
+SESSION_TTL_SECONDS = 300
+
+
+def remaining_capacity(canteens, queue, minute, bucket_minutes=DEFAULT_BUCKET_MINUTES, demand=0, is_open=None):
+    """某时间桶内各食堂还能额外接待的人数 (M,)
+
+    取打饭窗口剩余吞吐量与空闲座位数中的较小者，基线到达率来自排队估计。
+    高峰期需求 demand 超过剩余容量时，差额按各营业食堂的打饭吞吐量比例分摊，
+    保证人人有去处且排队压力按服务能力分散。
+    """
+    window = slice(minute, min(minute + bucket_minutes, queue.arrival_rate.shape[1]))
+    throughput = canteens.windows / canteens.service_minutes
+    spare_service = np.clip(throughput[:, None] - queue.arrival_rate[:, window], 0.0, None).sum(axis=1)
+    free_seats = canteens.seats * (1.0 - queue.seat_occupancy[:, minute])
+    capacity = np.floor(np.minimum(spare_service, free_seats)).astype(np.int64)
+    if is_open is not None:
+        capacity = np.where(is_open, capacity, 0)
+        throughput = np.where(is_open, throughput, 0.0)
+
+    shortfall = demand - capacity.sum()
+    if shortfall > 0 and throughput.sum() > 0:
+        capacity = capacity + np.ceil(shortfall * throughput / throughput.sum()).astype(np.int64)
+    return capacity
+
+
+def allocate(utility, feasible, capacity, rounds=DEFAULT_ROUNDS, step=DEFAULT_STEP):
+    """在容量约束下把 N 个用户分配到 M 个食堂，返回 (N,) 下标，-1 表示无可行食堂"""
+    value = np.where(feasible, utility, -np.inf)
+    n_users, n_canteens = value.shape
+    capacity = np.asarray(capacity, dtype=np.float64)
+    price = np.zeros(n_canteens)
+
+    # 价格调整：超载涨价、有空余且价格为正则降价，步长逐轮衰减
+    for k in range(rounds):
+        choice = np.argmax(value - price, axis=1)
+        has_option = np.isfinite(value[np.arange(n_users), choice])
+        load = np.bincount(choice[has_option], minlength=n_canteens)
+        excess = (load - capacity) / np.maximum(capacity, 1.0)
+        if (excess <= 0).all() and (price[excess < 0] == 0).all():
+            break
+        price = np.clip(price + step / np.sqrt(k + 1) * excess, 0.0, None)
+
+    # 容量修复：按"最优与次优的差距"从大到小分轮录取
+    adjusted = value - price
+    assignment = np.full(n_users, -1)
+    remaining = capacity.copy()
+    pending = np.flatnonzero(np.isfinite(value).any(axis=1))
+    while len(pending):
+        options = np.where(remaining > 0, adjusted[pending], -np.inf)
+        best = np.argmax(options, axis=1)
+        best_value = options[np.arange(len(pending)), best]
+        live = np.isfinite(best_value)
+        pending, best, options, best_value = pending[live], best[live], options[live], best_value[live]
+        if not len(pending):
+            break
+
+        options[np.arange(len(pending)), best] = -np.inf
+        second = options.max(axis=1)
+        margin = np.where(np.isfinite(second), best_value - second, np.inf)
+
+        accepted = np.zeros(len(pending), dtype=bool)
+        order = np.lexsort((-margin, best))
+        sorted_best = best[order]
+        starts = np.searchsorted(sorted_best, np.arange(n_canteens))
+        rank = np.arange(len(order)) - starts[sorted_best]
+        accepted[order] = rank < remaining[sorted_best]
+
+        assignment[pending[accepted]] = best[accepted]
+        remaining -= np.bincount(best[accepted], minlength=n_canteens)
+        pending = pending[~accepted]
+    return assignment
+
+
+class DemandRegistry:
+    """进程内的在线需求登记：会话 id -> (时间桶, 推荐输入)，超时自动失效"""
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def register(self, session_id, bucket, query):
+        with self._lock:
+            self._sessions[session_id] = (self.clock(), bucket, query)
+
+    def active(self, bucket):
+        """某时间桶内仍在线的 [(会话 id, 推荐输入)]，按会话 id 排序"""
+        now = self.clock()
+        with self._lock:
+            expired = [sid for sid, (seen, _, _) in self._sessions.items() if now - seen > self.ttl]
+            for sid in expired:
+                del self._sessions[sid]
+            return sorted((sid, query) for sid, (_, b, query) in self._sessions.items() if b == bucket)
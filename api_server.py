@@ -0,0 +1,545 @@
+# api_server.py - 推荐数据的本地异步 JSON 接口（与 Streamlit 页面并行运行，只依赖标准库）
+#
+# 用法：
+#   python api_server.py --host 127.0.0.1 --port 8600
+#
+# 接口（GET，也支持 HEAD）：
+#   /api/recommendations  推荐结果，参数与 batch_runner 的查询字段一致：
+#       user_type, dining_purpose, time(HH:MM), date(YYYY-MM-DD) 或 weekday(0-6), price_min, price_max, max_wait,
+#       types（"|" 分隔或重复给出）, origin（出发楼宇）, card（校园卡号，按个人偏好调整）,
+#       dish（菜品或口味关键词，只保留此刻供应预算内匹配菜品的食堂）, top（只返回前 N 个）, format=json|arrow
+#       只给 weekday 时按从今天起的下一个该星期几取校历作息（见 academic_calendar.py）
+#   /api/status           当前分钟各食堂的营业状态、预测拥挤度与排队等待（live 表示已按实时进出数据修正），
+#                         以及今天的作息
+#   /api/canteens         食堂目录
+#   /api/health
+# 评分与页面共用 SharedState.score_query。相同的归一化查询在数据版本不变时直接返回缓存的
+# 响应体，并发的相同未命中只计算一次；响应带 ETag，带 If-None-Match 重新验证时返回 304。
+# 检查与重新读取偏好模型、菜品目录等文件都在线程池中进行，不阻塞事件循环。
+# 连接为 HTTP/1.1 持久连接，空闲 KEEPALIVE_SECONDS 秒后关闭。
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from datetime import date as calendar_date, timedelta
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from batch_runner import DEFAULT_QUERY
+from academic_calendar import format_window
+from catalog import CATALOG_PATH, CatalogStore
+from feedback_store import FeedbackStore
+from live_occupancy import LIVE_HOST, LIVE_PORT, LiveOccupancy
+from menu import MENU_PATH, MenuError, add_dish_column, load_menu, menu_mtime, query_terms
+from personalization import PREFERENCES_PATH, load_or_empty as load_preferences, preferences_mtime
+from result_cache import ResultCache, normalize_query
+from results import CROWD_LABELS, arrow_ipc_bytes, crowd_codes, result_frame
+from scoring import CANTEEN_TYPES, DINING_PURPOSES, USER_TYPES
+from shared_state import SharedState
+
+API_HOST = os.environ.get("CANTEEN_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("CANTEEN_API_PORT", "8600"))
+KEEPALIVE_SECONDS = 15
+MAX_HEAD_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+RESPONSE_CACHE_SIZE = 4096
+RESPONSE_CACHE_TTL = 300
+JSON_TYPE = "application/json; charset=utf-8"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+# 结果表列 -> JSON 字段
+RESULT_FIELDS = {
+    "食堂名称": "name",
+    "类型": "type",
+    "最低价": "price_min",
+    "最高价": "price_max",
+    "座位数": "seats",
+    "推荐指数": "score",
+    "等待时间": "wait",
+    "步行时间": "walk",
+    "拥挤度": "crowd",
+    "拥挤状态": "crowd_status",
+    "座位占用": "seat_occupancy",
+    "推荐状态": "status",
+    "推荐": "recommended",
+    "匹配菜品": "dishes",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    """请求无效，按 status 返回 JSON 错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class Response:
+    status: int
+    body: bytes
+    content_type: str = JSON_TYPE
+    etag: str = ""
+    max_age: int = 0
+
+
+def _json_bytes(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _ok(body, content_type=JSON_TYPE, max_age=0):
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return Response(HTTPStatus.OK, body, content_type, etag, max_age)
+
+
+def _error(status, message):
+    return Response(status, _json_bytes({"error": message}))
+
+
+def _etag_matches(header, etag):
+    """If-None-Match 是否命中（弱比较，支持逗号分隔的多个值与 *）"""
+    if not header or not etag:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in [value[2:] if value.startswith("W/") else value for value in candidates]
+
+
+# ============ 查询参数 ============
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params, name, default, low, high):
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} 应为整数: {value!r}") from None
+    if not low <= number <= high:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} 应在 {low}-{high} 之间: {number}")
+    return number
+
+
+def _parse_minute(value):
+    try:
+        hour, minute = (int(part) for part in value.strip().split(":")[:2])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"time 应为 HH:MM: {value!r}") from None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"time 超出范围: {value!r}")
+    return hour * 60 + minute
+
+
+def _parse_dining_date(params, today):
+    """就餐日期：给出 date 时以其为准（与 weekday 矛盾时报错），只给 weekday 时取从今天起的下一个该星期几"""
+    text = _param(params, "date")
+    weekday = _int_param(params, "weekday", None, 0, 6)
+    if text is None:
+        return today if weekday is None else today + timedelta(days=(weekday - today.weekday()) % 7)
+    try:
+        day = calendar_date.fromisoformat(text.strip())
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"date 应为 YYYY-MM-DD: {text!r}") from None
+    if weekday is not None and weekday != day.weekday():
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"weekday={weekday} 与 date={day} 不符（应为 {day.weekday()}）")
+    return day
+
+
+def parse_recommendation_query(params, now, buildings):
+    """查询参数 -> (归一化查询键, 就餐日期, top)，未给出的字段取 batch_runner 的默认值与当前时间"""
+    user_type = _param(params, "user_type", DEFAULT_QUERY["user_type"])
+    purpose = _param(params, "dining_purpose", DEFAULT_QUERY["dining_purpose"])
+    if user_type not in USER_TYPES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"未知的身份: {user_type}")
+    if purpose not in DINING_PURPOSES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"未知的就餐目的: {purpose}")
+
+    types = [t for value in params.get("types", []) for t in value.split("|") if t.strip()] or CANTEEN_TYPES
+    unknown = sorted(set(types) - set(CANTEEN_TYPES))
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"未知的食堂类型: {unknown}")
+    origin = _param(params, "origin") or None
+    if origin is not None and origin not in buildings:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"未知的出发楼宇: {origin}")
+
+    dining_date = _parse_dining_date(params, now.date())
+    time_text = _param(params, "time")
+    minute = now.hour * 60 + now.minute if time_text is None else _parse_minute(time_text)
+    price_min = _int_param(params, "price_min", DEFAULT_QUERY["price_min"], 0, 10000)
+    price_max = _int_param(params, "price_max", DEFAULT_QUERY["price_max"], 0, 10000)
+    if price_min > price_max:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"price_min 不能大于 price_max: {price_min} > {price_max}")
+    key = normalize_query(
+        user_type, purpose, minute, (price_min, price_max),
+        _int_param(params, "max_wait", DEFAULT_QUERY["max_wait"], 0, 1440),
+        types, dining_date.weekday(), origin=origin
+    )
+    return key, dining_date, _int_param(params, "top", 0, 0, 100000)
+
+
+# ============ 响应体 ============
+def recommendation_records(frame, top=0):
+    """结果表 -> JSON 记录列表，推荐的在前、按推荐分从高到低"""
+    frame = frame.sort_values(["推荐", "推荐指数"], ascending=False, kind="stable")
+    if top:
+        frame = frame.head(top)
+    names = [column for column in RESULT_FIELDS if column in frame.columns]
+    columns = [frame[column].tolist() for column in names]
+    columns[names.index("推荐指数")] = frame["推荐指数"].round(2).tolist()
+    columns[names.index("座位占用")] = frame["座位占用"].round(3).tolist()
+    fields = [RESULT_FIELDS[column] for column in names]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+def _query_echo(key, dish_terms=(), day=None):
+    user_type, purpose, weekday, minute, price_min, price_max, max_wait, types, origin = key
+    return {
+        "user_type": user_type,
+        "dining_purpose": purpose,
+        "date": None if day is None else day.date.isoformat(),
+        "weekday": weekday,
+        "time": f"{minute // 60:02d}:{minute % 60:02d}",
+        "price_min": price_min,
+        "price_max": price_max,
+        "max_wait": max_wait,
+        "types": list(types),
+        "origin": origin,
+        "dish": list(dish_terms),
+        "day": None if day is None else day.describe(),
+    }
+
+
+# ============ 服务 ============
+class RecommendationService:
+    """路由、参数校验与响应缓存；state 为 SharedState，由其后台线程负责刷新数据
+
+    preferences 为个性化偏好模型（见 personalization.py），给出时请求可带 card 参数；给出 preferences_path 时
+    模型文件更新（页面定期写回在线更新的模型）后重新读取。菜品目录（见 menu.py）按当前食堂目录对齐，食堂目录或菜品文件更新后重建。
+    menu、preference_model 会读文件，由请求处理经 run_in_executor 调用，两者可在多个线程中同时调用。
+    """
+
+    def __init__(self, state, cache=None, preferences=None, menu_path=MENU_PATH, preferences_path=None):
+        self.state = state
+        self.preferences = preferences
+        self.preferences_path = preferences_path
+        self._preferences_mtime = None if preferences_path is None else preferences_mtime(preferences_path)
+        self.menu_path = menu_path
+        self._menu = None
+        self._menu_key = None
+        self._reload_lock = threading.Lock()
+        self.cache = cache or ResultCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        self._inflight = {}
+        self._routes = {
+            "/api/recommendations": self._recommendations,
+            "/api/status": self._status,
+            "/api/canteens": self._canteens,
+            "/api/health": self._health,
+        }
+
+    async def handle(self, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED, f"不支持的方法: {method}")
+        url = urlsplit(target)
+        route = self._routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            return _error(HTTPStatus.NOT_FOUND, f"未知的路径: {url.path}")
+        try:
+            response = await route(parse_qs(url.query))
+        except ApiError as exc:
+            return _error(exc.status, str(exc))
+        if response.status == HTTPStatus.OK and _etag_matches(headers.get("if-none-match"), response.etag):
+            return Response(HTTPStatus.NOT_MODIFIED, b"", response.content_type, response.etag, response.max_age)
+        return response
+
+    async def _cached(self, key, compute):
+        """命中则直接返回；未命中时在线程池中计算，同一键的并发请求共享一次计算"""
+        sentinel = object()
+        response = self.cache.get(key, sentinel)
+        if response is not sentinel:
+            return response
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(None, compute))
+            self._inflight[key] = pending
+            try:
+                response = await pending
+                self.cache.put(key, response)
+            finally:
+                del self._inflight[key]
+            return response
+        return await asyncio.shield(pending)
+
+    def menu(self, snapshot):
+        """与快照的食堂目录对齐的菜品目录（读文件，勿在事件循环上直接调用）"""
+        with self._reload_lock:
+            key = (snapshot.catalog.version, menu_mtime(self.menu_path))
+            if key != self._menu_key:
+                try:
+                    self._menu = load_menu(snapshot.catalog.db, self.menu_path)
+                except MenuError as exc:
+                    raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(exc)) from None
+                self._menu_key = key
+            return self._menu
+
+    def preference_model(self, snapshot):
+        """当前的偏好模型与其版本键；模型文件读取失败时继续使用已加载的模型（读文件，勿在事件循环上直接调用）"""
+        with self._reload_lock:
+            if self.preferences_path is not None:
+                mtime = preferences_mtime(self.preferences_path)
+                if mtime != self._preferences_mtime:
+                    try:
+                        self.preferences = load_preferences(snapshot.canteens.names, self.preferences_path)
+                    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                        logger.exception("偏好模型读取失败，继续使用已加载的模型")
+                    self._preferences_mtime = mtime
+            return self.preferences, (self._preferences_mtime, getattr(self.preferences, "version", None))
+
+    async def _recommendations(self, params):
+        snapshot = self.state.snapshot
+        walking = snapshot.catalog.walking if snapshot.catalog is not None else None
+        key, dining_date, top = parse_recommendation_query(
+            params, self.state.clock(), walking.building_names if walking else []
+        )
+        day = self.state.calendar.day(dining_date)
+        fmt = _param(params, "format", "json")
+        if fmt not in ("json", "arrow"):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"未知的格式: {fmt}")
+        card = (_param(params, "card") or "").strip()
+        personal_key = None
+        loop = asyncio.get_running_loop()
+        preferences, preferences_version = await loop.run_in_executor(None, self.preference_model, snapshot)
+        if card and preferences is not None and card in preferences:
+            personal_key = (card, preferences_version)
+        dish_terms = query_terms(_param(params, "dish"))
+        menu = await loop.run_in_executor(None, self.menu, snapshot) if dish_terms else None
+        dish_key = (dish_terms, menu.mtime) if dish_terms else None
+
+        def compute():
+            personal = mask = matches = None
+            if personal_key is not None:
+                personal = preferences.adjustment_for(card, snapshot.canteens.names)
+            if dish_terms:
+                matches = menu.search(dish_terms, (key[4], key[5]))
+                mask = matches.canteen_mask([key[3]], key[2])
+            result, seat_occupancy = self.state.score_query(key, snapshot, personal, mask, day)
+            frame = result_frame(snapshot.canteens, result, seat_occupancy)
+            if matches is not None:
+                add_dish_column(frame, result, matches, key[3], key[2])
+            if fmt == "arrow":
+                try:
+                    return _ok(arrow_ipc_bytes(frame.head(top) if top else frame), ARROW_TYPE)
+                except RuntimeError as exc:
+                    return _error(HTTPStatus.NOT_IMPLEMENTED, str(exc))
+            records = recommendation_records(frame, top)
+            return _ok(_json_bytes({
+                "query": _query_echo(key, dish_terms, day), "count": len(records), "results": records
+            }))
+
+        # 作息相同的日期结果相同，缓存键只带作息签名；JSON 回显日期，因此按日期区分
+        day_key = day.signature if fmt == "arrow" else (day.signature, dining_date)
+        return await self._cached(
+            ("recommendations", key, top, fmt, self.state.data_version(dining_date, snapshot), personal_key, dish_key,
+             day_key), compute
+        )
+
+    async def _status(self, params):
+        snapshot = self.state.snapshot
+
+        def compute():
+            crowd = snapshot.crowd_now.round().astype(int)
+            status = [CROWD_LABELS[code] for code in crowd_codes(crowd)]
+            seat_occupancy = snapshot.queue.seat_occupancy[:, snapshot.minute].round(3).tolist()
+            canteens = [
+                {"name": name, "open": bool(is_open), "crowd": int(level), "crowd_status": label,
+                 "wait": round(float(wait), 1), "seat_occupancy": occupancy, "live": bool(live)}
+                for name, is_open, level, label, wait, occupancy, live in zip(
+                    snapshot.canteens.names, snapshot.open_now, crowd, status, snapshot.wait_now, seat_occupancy,
+                    snapshot.live
+                )
+            ]
+            minute = snapshot.minute
+            peak_window = snapshot.day.peak_window_at(minute)
+            return _ok(_json_bytes({
+                "date": snapshot.day.date.isoformat(),
+                "weekday": snapshot.weekday,
+                "time": f"{minute // 60:02d}:{minute % 60:02d}",
+                "day": snapshot.day.describe(),
+                "peak": None if peak_window is None else format_window(peak_window),
+                "open_count": int(snapshot.open_now.sum()),
+                "canteens": canteens,
+            }), max_age=self.state.tick_seconds)
+
+        return await self._cached(("status", snapshot.data_version, snapshot.minute), compute)
+
+    async def _canteens(self, params):
+        snapshot = self.state.snapshot
+        if snapshot.catalog is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "未接入食堂目录")
+
+        def compute():
+            db = snapshot.catalog.db
+            return _ok(_json_bytes({"canteens": [{"name": name, **info} for name, info in db.items()]}))
+
+        return await self._cached(("canteens", snapshot.data_version[1]), compute)
+
+    async def _health(self, params):
+        snapshot = self.state.snapshot
+        return Response(HTTPStatus.OK, _json_bytes({
+            "status": "ok",
+            "snapshot_version": snapshot.version,
+            "snapshot_at": snapshot.created_at.isoformat(timespec="seconds"),
+            "canteens": len(snapshot.canteens),
+        }))
+
+
+# ============ HTTP/1.1 ============
+def _response_head(response, keep_alive):
+    status = HTTPStatus(response.status)
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Date: {formatdate(usegmt=True)}",
+        f"Content-Type: {response.content_type}",
+        f"Content-Length: {len(response.body)}",
+        "Access-Control-Allow-Origin: *",
+        f"Cache-Control: {f'public, max-age={response.max_age}' if response.max_age else 'no-cache'}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if response.etag:
+        lines.append(f"ETag: {response.etag}")
+    if keep_alive:
+        lines.append(f"Keep-Alive: timeout={KEEPALIVE_SECONDS}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _read_request(reader):
+    """读取一个请求头，返回 (方法, 目标, 版本, 头部字典)；连接关闭或空闲超时返回 None"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_SECONDS)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "请求头过大") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "无效的请求行")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "无效的请求头")
+            headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise ApiError(HTTPStatus.NOT_IMPLEMENTED, "不支持分块请求体")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "无效的 Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "请求体过大")
+    if length:
+        await reader.readexactly(length)
+    return parts[0].upper(), parts[1], parts[2], headers
+
+
+async def serve_connection(service, reader, writer):
+    """处理一个客户端连接上的所有请求（持久连接，按顺序应答流水线请求）"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ApiError as exc:
+                response = _error(exc.status, str(exc))
+                writer.write(_response_head(response, False) + response.body)
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+            try:
+                response = await service.handle(method, target, headers)
+            except Exception:
+                logger.exception("处理请求失败: %s %s", method, target)
+                response = _error(HTTPStatus.INTERNAL_SERVER_ERROR, "服务器内部错误")
+            writer.write(_response_head(response, keep_alive))
+            if method != "HEAD" and response.status != HTTPStatus.NOT_MODIFIED:
+                writer.write(response.body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_api_server(service, host=API_HOST, port=API_PORT):
+    """在当前事件循环上启动服务，返回 asyncio.Server"""
+    return await asyncio.start_server(
+        lambda reader, writer: serve_connection(service, reader, writer),
+        host, port, limit=MAX_HEAD_BYTES, backlog=1024
+    )
+
+
+# ============ 命令行 ============
+async def _serve(state, host, port, preferences=None, menu_path=MENU_PATH, preferences_path=None):
+    service = RecommendationService(state, preferences=preferences, menu_path=menu_path,
+                                    preferences_path=preferences_path)
+    server = await start_api_server(service, host, port)
+    logger.info("推荐 API 已启动：http://%s:%s/api/recommendations", host, server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="食堂推荐的本地 JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录文件")
+    parser.add_argument("--preferences", default=PREFERENCES_PATH, help="个性化偏好模型（.npz），文件更新后自动重新读取")
+    parser.add_argument("--menu", default=MENU_PATH, help="菜品目录文件（dish 参数使用）")
+    parser.add_argument("--live-port", type=int, default=LIVE_PORT,
+                        help="接收实时进出事件的本地端口（见 live_occupancy.py），缺省不接收")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    catalog_store = CatalogStore(args.catalog)
+    live = None
+    if args.live_port is not None:
+        arrays = catalog_store.catalog.arrays
+        live = LiveOccupancy(arrays.names, arrays.seats).start(LIVE_HOST, args.live_port)
+    state = SharedState(catalog_store=catalog_store, feedback_store=FeedbackStore(), live=live).start()
+    try:
+        preferences = load_preferences(state.canteens.names, args.preferences)
+        asyncio.run(_serve(state, args.host, args.port, preferences, args.menu, args.preferences))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.stop()
+        if live is not None:
+            live.stop()
+
+
+if __name__ == "__main__":
+    main()
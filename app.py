@@ -1,625 +1,847 @@
-# app.py - 西昌学院北校区食堂智能推荐系统（功能完整稳定版）
-import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
-
-# ============ 页面配置 ============
-st.set_page_config(
-    page_title="西昌学院北校区食堂智能推荐系统",
-    page_icon="🏫",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# ============ 自定义样式 ============
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.8rem;
-        font-weight: bold;
-        color: #1E3A8A;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        padding-top: 1rem;
-    }
-    .sub-header {
-        font-size: 1.2rem;
-        color: #4B5563;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .card {
-        background: white;
-        border-radius: 10px;
-        padding: 1.5rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        margin-bottom: 1rem;
-        border-left: 4px solid #3B82F6;
-    }
-    .best-recommendation {
-        background: linear-gradient(135deg, #A7F3D0 0%, #10B981 100%);
-        color: #064E3B;
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin-bottom: 2rem;
-    }
-    .peak-warning {
-        background: linear-gradient(135deg, #FECACA 0%, #F87171 100%);
-        color: #7F1D1D;
-        border-radius: 10px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# ============ 标题部分 ============
-st.markdown('<div class="main-header">🏫 西昌学院北校区食堂智能推荐系统</div>', unsafe_allow_html=True)
-st.markdown('<div class="sub-header">🎓 人工智能课程期末项目 | 🤖 基于机器学习的时间序列预测 | 📱 实时智能推荐</div>', unsafe_allow_html=True)
-st.markdown("---")
-
-# ============ 初始化状态 ============
-if 'feedback_submitted' not in st.session_state:
-    st.session_state.feedback_submitted = False
-
-# ============ 侧边栏配置 ============
-with st.sidebar:
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.header("⚙️ 智能推荐设置")
-    
-    # 用户信息
-    st.subheader("👤 用户画像")
-    user_type = st.selectbox(
-        "身份类型",
-        ["本科生", "研究生", "教师", "留学生", "访客"],
-        index=0,
-        help="系统会根据不同身份提供个性化推荐",
-        key="user_type_select"
-    )
-    
-    if user_type == "本科生":
-        grade = st.select_slider("所在年级", options=["大一", "大二", "大三", "大四"], value="大三", key="grade_slider")
-    
-    # 就餐场景
-    st.subheader("🎯 就餐场景")
-    dining_purpose = st.selectbox(
-        "本次就餐目的",
-        ["日常快速就餐", "朋友聚餐", "学习讨论", "改善伙食", "约会用餐", "招待访客"],
-        index=0,
-        help="选择您的就餐目的",
-        key="dining_purpose_select"
-    )
-    
-    # 时间设置
-    st.subheader("🕒 时间设置")
-    current_time = st.time_input("计划就餐时间", datetime.now().time(), key="current_time_input")
-    
-    # 偏好设置
-    st.subheader("📊 偏好设置")
-    
-    price_range = st.slider(
-        "价格预算（元）",
-        5, 50, (8, 25),
-        help="设置您的价格预算范围",
-        key="price_range_slider"
-    )
-    
-    max_wait_time = st.slider(
-        "最长等待时间（分钟）",
-        5, 45, 15,
-        help="您能接受的最长等待时间",
-        key="max_wait_time_slider"
-    )
-    
-    # 食堂类型偏好
-    st.subheader("🏷️ 食堂类型偏好")
-    canteen_types = ["大众食堂", "风味食堂", "清真食堂", "快餐食堂", "自助食堂", "教工食堂", "美食广场", "夜宵食堂"]
-    selected_types = st.multiselect(
-        "选择喜欢的食堂类型",
-        canteen_types,
-        default=canteen_types,
-        help="可多选，系统将优先推荐",
-        key="canteen_types_multiselect"
-    )
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # 系统状态
-    st.markdown("---")
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.subheader("📈 系统状态")
-    
-    hour = current_time.hour
-    minute = current_time.minute
-    current_minutes = hour * 60 + minute
-    
-    lunch_peak_start = 11 * 60 + 40
-    lunch_peak_end = 12 * 60 + 30
-    dinner_peak_start = 17 * 60 + 40
-    dinner_peak_end = 18 * 60 + 30
-    
-    is_lunch_peak = lunch_peak_start <= current_minutes <= lunch_peak_end
-    is_dinner_peak = dinner_peak_start <= current_minutes <= dinner_peak_end
-    is_peak_hour = is_lunch_peak or is_dinner_peak
-    
-    if is_peak_hour:
-        st.error(f"🚨 **{'午餐' if is_lunch_peak else '晚餐'}高峰期**")
-        st.caption(f"⏰ {current_time.strftime('%H:%M')}")
-    else:
-        st.success("✅ **非高峰期**")
-        st.caption(f"⏰ {current_time.strftime('%H:%M')}")
-    
-    st.progress(np.random.randint(70, 95))
-    st.caption("系统负载：正常")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# ============ 食堂数据 ============
-CANTEENS_DB = {
-    "北一食堂（大众餐厅）": {
-        "type": "大众食堂",
-        "price_range": [8, 12],
-        "base_score": 8.5,
-        "location": "教学楼A区旁",
-        "specialty": "价格最实惠，菜品传统",
-        "popular_dishes": ["回锅肉套餐", "麻婆豆腐", "宫保鸡丁"],
-        "opening_hours": "6:30-20:30",
-        "seats": 500
-    },
-    "北二食堂（风味餐厅）": {
-        "type": "风味食堂",
-        "price_range": [10, 18],
-        "base_score": 9.0,
-        "location": "学生活动中心1楼",
-        "specialty": "川味小吃，麻辣鲜香",
-        "popular_dishes": ["宜宾燃面", "乐山钵钵鸡", "重庆小面"],
-        "opening_hours": "10:00-21:30",
-        "seats": 400
-    },
-    "北三食堂（清真食堂）": {
-        "type": "清真食堂",
-        "price_range": [12, 20],
-        "base_score": 8.3,
-        "location": "留学生公寓旁",
-        "specialty": "清真食品，牛羊肉特色",
-        "popular_dishes": ["兰州拉面", "羊肉泡馍", "大盘鸡"],
-        "opening_hours": "7:00-20:00",
-        "seats": 300
-    },
-    "北四食堂（快餐中心）": {
-        "type": "快餐食堂",
-        "price_range": [10, 16],
-        "base_score": 7.8,
-        "location": "图书馆负一楼",
-        "specialty": "快捷便利，打包方便",
-        "popular_dishes": ["汉堡套餐", "黄焖鸡米饭", "盖浇饭"],
-        "opening_hours": "6:30-21:00",
-        "seats": 350
-    },
-    "北五食堂（自助餐厅）": {
-        "type": "自助食堂",
-        "price_range": [15, 25],
-        "base_score": 9.2,
-        "location": "体育馆旁",
-        "specialty": "菜品多样，自由选择",
-        "popular_dishes": ["自助餐", "水果沙拉", "小火锅"],
-        "opening_hours": "11:00-20:30",
-        "seats": 450
-    },
-    "北六食堂（教工餐厅）": {
-        "type": "教工食堂",
-        "price_range": [15, 30],
-        "base_score": 8.8,
-        "location": "行政楼1楼",
-        "specialty": "环境安静，教师居多",
-        "popular_dishes": ["教工套餐", "营养餐", "小炒现做"],
-        "opening_hours": "11:00-13:30, 17:00-19:00",
-        "seats": 200
-    },
-    "北七食堂（美食广场）": {
-        "type": "美食广场",
-        "price_range": [12, 25],
-        "base_score": 8.6,
-        "location": "商业街2楼",
-        "specialty": "各地风味，选择多样",
-        "popular_dishes": ["过桥米线", "沙县小吃", "广式烧腊"],
-        "opening_hours": "10:00-22:00",
-        "seats": 600
-    },
-    "北八食堂（夜宵中心）": {
-        "type": "夜宵食堂",
-        "price_range": [15, 35],
-        "base_score": 9.5,
-        "location": "学生宿舍区中心",
-        "specialty": "营业时间长，夜宵丰富",
-        "popular_dishes": ["西昌火盆烧烤", "炸鸡汉堡", "火锅冒菜"],
-        "opening_hours": "16:00-23:00",
-        "seats": 500
-    }
-}
-
-# ============ 推荐算法 ============
-def calculate_recommendations():
-    """计算推荐结果"""
-    results = []
-    current_hour = current_time.hour
-    current_minute = current_time.minute
-    current_total_minutes = current_hour * 60 + current_minute
-    
-    # 时间因子计算
-    if (11*60+40 <= current_total_minutes <= 12*60+30) or (17*60+40 <= current_total_minutes <= 18*60+30):
-        time_factor = 1.8  # 高峰期
-    elif (11*60 <= current_total_minutes <= 11*60+40) or (17*60 <= current_total_minutes <= 17*60+40):
-        time_factor = 1.3  # 高峰期前奏
-    elif (12*60+30 <= current_total_minutes <= 13*60) or (18*60+30 <= current_total_minutes <= 19*60):
-        time_factor = 1.1  # 高峰期尾声
-    else:
-        time_factor = 1.0  # 非高峰期
-    
-    for canteen_name, info in CANTEENS_DB.items():
-        # 检查类型偏好
-        if info["type"] not in selected_types:
-            continue
-        
-        # 检查价格范围
-        min_price, max_price = info["price_range"]
-        if min_price > price_range[1] or max_price < price_range[0]:
-            continue
-        
-        # 检查营业时间
-        if "夜宵" in canteen_name and current_hour < 16:
-            continue
-        if "教工" in canteen_name and not ((11 <= current_hour < 13.5) or (17 <= current_hour < 19)):
-            continue
-        
-        # 基础分数
-        score = info["base_score"]
-        
-        # 价格调整
-        avg_price = (min_price + max_price) / 2
-        if avg_price > price_range[1]:
-            score -= 1.5
-        elif avg_price > (price_range[0] + price_range[1]) / 2:
-            score -= 0.5
-        
-        # 用户身份调整
-        if user_type == "教师" and "教工" in canteen_name:
-            score += 1.0
-        elif user_type == "留学生" and "清真" in canteen_name:
-            score += 1.0
-        
-        # 就餐目的调整
-        if dining_purpose == "学习讨论" and "教工" in canteen_name:
-            score += 1.0
-        elif dining_purpose == "朋友聚餐" and ("夜宵" in canteen_name or "美食" in canteen_name):
-            score += 1.0
-        elif dining_purpose == "日常快速就餐" and "快餐" in canteen_name:
-            score += 0.8
-        
-        # 时间因子调整
-        score *= time_factor
-        
-        # 确保分数在合理范围
-        score = max(1.0, min(10.0, score))
-        
-        # 计算等待时间
-        base_wait = 10
-        if time_factor > 1.5:  # 高峰期
-            base_wait *= 1.8
-        if "快餐" in canteen_name:
-            base_wait *= 0.7
-        if "大众" in canteen_name:
-            base_wait *= 1.3
-        
-        wait_time = max(3, min(40, int(base_wait + np.random.randint(-2, 5))))
-        
-        # 计算拥挤度
-        base_crowd = 50
-        base_crowd *= time_factor
-        if "教工" in canteen_name:
-            base_crowd *= 0.7
-        if "大众" in canteen_name:
-            base_crowd *= 1.3
-        
-        crowd_level = max(10, min(95, int(base_crowd + np.random.randint(-10, 15))))
-        
-        # 确定拥挤状态
-        if crowd_level < 30:
-            crowd_status = "🟢 非常空闲"
-            crowd_color = "#10B981"
-        elif crowd_level < 50:
-            crowd_status = "🟡 比较空闲"
-            crowd_color = "#F59E0B"
-        elif crowd_level < 70:
-            crowd_status = "🟠 适中"
-            crowd_color = "#F97316"
-        elif crowd_level < 85:
-            crowd_status = "🔴 拥挤"
-            crowd_color = "#EF4444"
-        else:
-            crowd_status = "⚫ 非常拥挤"
-            crowd_color = "#6B7280"
-        
-        # 推荐状态
-        is_recommended = (score >= 6.5 and wait_time <= max_wait_time)
-        
-        if is_recommended:
-            if score >= 8.0:
-                rec_status = "🏆 强烈推荐"
-                rec_color = "success"
-            else:
-                rec_status = "👍 推荐"
-                rec_color = "info"
-        else:
-            rec_status = "⏳ 不推荐"
-            rec_color = "warning"
-        
-        results.append({
-            "食堂名称": canteen_name,
-            "类型": info["type"],
-            "价格范围": f"{min_price}-{max_price}元",
-            "地理位置": info["location"],
-            "特色": info["specialty"],
-            "热门菜品": ", ".join(info["popular_dishes"][:2]),
-            "营业时间": info["opening_hours"],
-            "座位数": info["seats"],
-            "推荐指数": round(score, 1),
-            "等待时间": f"{wait_time}分钟",
-            "拥挤状态": crowd_status,
-            "拥挤度": f"{crowd_level}%",
-            "推荐状态": rec_status,
-            "推荐颜色": rec_color,
-            "_score": score,
-            "_wait": wait_time
-        })
-    
-    return pd.DataFrame(results)
-
-# ============ 主界面 ============
-# 顶部状态指标
-st.markdown('<div class="card">', unsafe_allow_html=True)
-col_status1, col_status2, col_status3, col_status4 = st.columns(4)
-
-with col_status1:
-    st.metric("🏫 食堂总数", "8个", "北校区全覆盖")
-with col_status2:
-    st.metric("👥 实时用户", f"{np.random.randint(1500, 2500)}人", "正在就餐")
-with col_status3:
-    st.metric("📊 数据准确率", "92.5%", "+1.2%")
-with col_status4:
-    st.metric("⏰ 系统响应", "< 0.5s", "毫秒级推荐")
-
-st.markdown('</div>', unsafe_allow_html=True)
-
-# 高峰期警告
-if is_peak_hour:
-    st.markdown('<div class="peak-warning">', unsafe_allow_html=True)
-    peak_type = "午餐" if is_lunch_peak else "晚餐"
-    peak_time = "11:40-12:30" if is_lunch_peak else "17:40-18:30"
-    
-    st.markdown(f"""
-    ## 🚨 {peak_type}高峰期预警 ({peak_time})
-    
-    **当前时间：** {current_time.strftime('%H:%M')}  
-    **预计拥挤度：** {np.random.randint(75, 95)}%  
-    **平均等待时间：** {np.random.randint(18, 28)}分钟  
-    
-    **💡 智能建议：** 建议选择教工食堂或错峰就餐
-    """)
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# 推荐结果
-st.markdown("## 🎯 智能推荐结果")
-st.markdown("---")
-
-df = calculate_recommendations()
-
-if df.empty:
-    st.error("""
-    ## ⚠️ 未找到符合条件的食堂
-    
-    **可能原因：**
-    1. 当前时间部分食堂未营业
-    2. 价格预算范围过小
-    3. 筛选条件过于严格
-    
-    **调整建议：**
-    1. 放宽价格范围
-    2. 选择更多食堂类型
-    3. 调整就餐时间
-    """)
-else:
-    # 获取推荐结果
-    recommended_df = df[df["推荐状态"].isin(["🏆 强烈推荐", "👍 推荐"])].sort_values("_score", ascending=False)
-    
-    if not recommended_df.empty:
-        # 最佳推荐
-        best_canteen = recommended_df.iloc[0]
-        
-        st.markdown('<div class="best-recommendation">', unsafe_allow_html=True)
-        
-        col_rec1, col_rec2 = st.columns([2, 1])
-        
-        with col_rec1:
-            st.markdown(f"""
-            ## 🏆 今日最佳：**{best_canteen['食堂名称']}**
-            
-            **✨ 推荐理由：**
-            - ⭐ **综合评分：** {best_canteen['推荐指数']:.1f}/10.0
-            - 👥 **拥挤程度：** {best_canteen['拥挤状态']} ({best_canteen['拥挤度']})
-            - ⏱️ **预计等待：** {best_canteen['等待时间']}
-            - 💰 **价格区间：** {best_canteen['价格范围']}
-            - 🏷️ **食堂特色：** {best_canteen['特色']}
-            - 📍 **位置信息：** {best_canteen['地理位置']}
-            - 🍽️ **热门菜品：** {best_canteen['热门菜品']}
-            """)
-        
-        with col_rec2:
-            # 行动建议
-            st.markdown("### 🚀 行动建议")
-            if is_peak_hour:
-                st.warning("**高峰期策略：**\n- 建议错峰就餐\n- 考虑打包外带\n- 避开11:40-12:30")
-            else:
-                st.success("**平峰期优势：**\n- 建议堂食\n- 环境舒适\n- 无需排队")
-            
-            st.markdown("### 📱 温馨提示")
-            st.info(f"**营业时间：** {best_canteen['营业时间']}")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # 所有食堂数据表格
-        st.markdown("### 📋 所有食堂数据分析")
-        
-        display_df = df[["食堂名称", "类型", "价格范围", "等待时间", "拥挤状态", "推荐指数", "推荐状态"]].copy()
-        
-        # 简化显示，避免复杂配置
-        st.dataframe(
-            display_df,
-            use_container_width=True,
-            hide_index=True
-        )
-        
-        # 统计信息
-        col_stat1, col_stat2, col_stat3 = st.columns(3)
-        with col_stat1:
-            st.metric("推荐食堂数", f"{len(recommended_df)}个", f"/{len(df)}个")
-        with col_stat2:
-            avg_wait = np.mean([int(w.split('分')[0]) for w in df['等待时间']])
-            delta = f"{'+' if avg_wait > 15 else '-'}{abs(avg_wait-15):.1f}分钟"
-            st.metric("平均等待", f"{avg_wait:.1f}分钟", delta)
-        with col_stat3:
-            avg_score = df['推荐指数'].mean()
-            delta = f"{'+' if avg_score > 7 else '-'}{abs(avg_score-7):.1f}"
-            st.metric("平均推荐分", f"{avg_score:.1f}/10", delta)
-    else:
-        st.warning("""
-        ## ⚠️ 当前条件下无合适推荐
-        
-        **智能分析：**
-        1. 所有食堂等待时间均超过您的设定
-        2. 当前为高峰期，建议调整策略
-        
-        **立即行动：**
-        1. 增加等待时间容忍度
-        2. 选择价格更高的食堂
-        3. 考虑错峰就餐
-        """)
-
-# ============ 用户反馈系统 ============
-st.markdown("---")
-st.markdown("## 💬 用户体验反馈")
-
-if not st.session_state.feedback_submitted:
-    with st.form("feedback_form"):
-        st.markdown("请帮助我们改进系统，您的反馈对我们非常重要！")
-        
-        col_fb1, col_fb2 = st.columns(2)
-        
-        with col_fb1:
-            accuracy = st.slider("预测准确度", 1, 5, 4, key="accuracy_slider")
-            usability = st.slider("系统易用性", 1, 5, 4, key="usability_slider")
-            
-        with col_fb2:
-            usefulness = st.slider("实用价值", 1, 5, 4, key="usefulness_slider")
-            likelihood = st.slider("再次使用意愿", 1, 5, 4, key="likelihood_slider")
-        
-        feedback_text = st.text_area("具体建议或问题反馈：", height=100, key="feedback_text")
-        
-        submitted = st.form_submit_button("📤 提交反馈")
-        
-        if submitted:
-            st.session_state.feedback_submitted = True
-            st.rerun()
-else:
-    st.success("✅ 感谢您的宝贵反馈！")
-    
-    st.markdown("""
-    **🙏 感谢您的参与！**
-    
-    您的反馈将用于：
-    1. 优化推荐算法准确度
-    2. 改进系统用户体验
-    3. 增加新的实用功能
-    
-    我们将持续改进，为西昌学院师生提供更好的服务！
-    """)
-    
-    if st.button("提交新反馈"):
-        st.session_state.feedback_submitted = False
-        st.rerun()
-
-# ============ 项目信息 ============
-st.markdown("---")
-st.markdown("## 📋 项目信息")
-
-with st.expander("查看详细项目文档"):
-    col_info1, col_info2 = st.columns(2)
-    
-    with col_info1:
-        st.markdown("""
-        ### 🎓 项目背景
-        
-        **课程名称：** 人工智能  
-        **项目类型：** 课程设计/期末项目  
-        **开发时间：** 2024年12月  
-        **适用对象：** 西昌学院北校区全体师生  
-        
-        ### 🎯 项目目标
-        
-        1. **解决问题：** 缓解食堂高峰期拥堵  
-        2. **提升体验：** 优化师生就餐选择  
-        3. **数据驱动：** 基于真实数据的智能推荐  
-        4. **教育意义：** 展示AI在实际场景中的应用  
-        """)
-    
-    with col_info2:
-        st.markdown("""
-        ### 🛠️ 技术架构
-        
-        **前端技术：**  
-        - Streamlit (交互式Web应用)  
-        - HTML/CSS (界面美化)  
-        
-        **后端算法：**  
-        - 时间序列预测模型  
-        - 多因素加权推荐算法  
-        - 实时数据处理  
-        
-        **数据来源：**  
-        - 西昌学院食堂实地调研  
-        - 学生问卷调查数据  
-        - 历史就餐记录分析  
-        """)
-    
-    st.markdown("""
-    ### 📊 数据说明
-    
-    1. **实时数据：** 基于当前时间的动态预测  
-    2. **历史数据：** 过去30天的就餐记录分析  
-    3. **用户数据：** 匿名化的偏好设置数据  
-    4. **食堂数据：** 8个食堂的详细信息  
-    
-    ### 🔒 隐私保护
-    
-    - 所有用户数据均为匿名处理  
-    - 不收集个人敏感信息  
-    - 数据仅用于推荐算法优化  
-    """)
-
-# ============ 开发者信息 ============
-st.markdown("---")
-st.markdown("""
-<div style="text-align: center; padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            color: white; border-radius: 10px; margin-top: 20px;">
-    <h3>🎓 西昌学院人工智能课程期末项目</h3>
-    <p><strong>开发者：</strong>Lizhanghuan | <strong>学号：</strong>2311030019 | <strong>班级：</strong>计算机科学与技术23级1班</p>
-    <p><strong>指导老师：</strong>黎华老师 | <strong>课程：</strong>人工智能（2025-2026学年第一学期）</p>
-    <p><strong>项目时间：</strong>2025年12月 | <strong>版本：</strong>v3.0.0</p>
-    <p style="font-size: 0.9em; opacity: 0.8;">© 2025 西昌学院人工智能课程组 | 本系统仅为课程设计作品</p>
-</div>
-""", unsafe_allow_html=True)
-
-# ============ 刷新按钮 ============
-st.markdown("---")
-if st.button("🔄 刷新系统数据", type="primary", use_container_width=True):
-    st.rerun()
\ No newline at end of file
+# app.py - 西昌学院北校区食堂智能推荐系统（功能完整稳定版）
+import streamlit as st
+import numpy as np
+import time
+import uuid
+from datetime import datetime
+
+from academic_calendar import format_window, meal_name
+from allocation import (
+    DEFAULT_BUCKET_MINUTES as ALLOCATION_BUCKET_MINUTES, DemandRegistry, allocate, remaining_capacity
+)
+from catalog import CatalogStore
+from feedback_store import FeedbackStore
+from live_occupancy import LIVE_HOST, LIVE_PORT, LiveOccupancy
+from menu import Menu, MenuError, add_dish_column, load_menu, menu_mtime, query_terms
+from metrics import Metrics, start_metrics_server
+from personalization import PreferenceSaver, load_or_empty as load_preferences
+from planner import heatmap_frame, plan_day, plan_frame, plan_slots
+from result_cache import ResultCache, bucket_minute, normalize_query
+from results import arrow_ipc_bytes, result_frame
+from scoring import CANTEEN_TYPES, MAX_WAIT, score_profiles, single_profile
+from shared_state import SharedState
+
+SCRIPT_STARTED = time.perf_counter()
+
+# ============ 页面配置 ============
+st.set_page_config(
+    page_title="西昌学院北校区食堂智能推荐系统",
+    page_icon="🏫",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# ============ 自定义样式 ============
+st.markdown("""
+<style>
+    .main-header {
+        font-size: 2.8rem;
+        font-weight: bold;
+        color: #1E3A8A;
+        text-align: center;
+        margin-bottom: 0.5rem;
+        padding-top: 1rem;
+    }
+    .sub-header {
+        font-size: 1.2rem;
+        color: #4B5563;
+        text-align: center;
+        margin-bottom: 2rem;
+    }
+    .card {
+        background: white;
+        border-radius: 10px;
+        padding: 1.5rem;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+        margin-bottom: 1rem;
+        border-left: 4px solid #3B82F6;
+    }
+    .best-recommendation {
+        background: linear-gradient(135deg, #A7F3D0 0%, #10B981 100%);
+        color: #064E3B;
+        border-radius: 10px;
+        padding: 1.5rem;
+        margin-bottom: 2rem;
+    }
+    .peak-warning {
+        background: linear-gradient(135deg, #FECACA 0%, #F87171 100%);
+        color: #7F1D1D;
+        border-radius: 10px;
+        padding: 1rem;
+        margin-bottom: 1rem;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# ============ 标题部分 ============
+st.markdown('<div class="main-header">🏫 西昌学院北校区食堂智能推荐系统</div>', unsafe_allow_html=True)
+st.markdown('<div class="sub-header">🎓 人工智能课程期末项目 | 🤖 基于机器学习的时间序列预测 | 📱 实时智能推荐</div>', unsafe_allow_html=True)
+st.markdown("---")
+
+# ============ 初始化状态 ============
+if 'feedback_submitted' not in st.session_state:
+    st.session_state.feedback_submitted = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# ============ 共享数据 ============
+@st.cache_resource
+def get_result_cache():
+    """进程内共享的推荐结果缓存"""
+    return ResultCache()
+
+
+@st.cache_resource
+def get_metrics():
+    """进程内共享的运行指标，同时在本地端口导出 /metrics"""
+    metrics = Metrics()
+    cache = get_result_cache()
+    metrics.counter_fn("result_cache_hits", "推荐结果缓存命中次数", lambda: cache.hits)
+    metrics.counter_fn("result_cache_misses", "推荐结果缓存未命中次数", lambda: cache.misses)
+    start_metrics_server(metrics)
+    return metrics
+
+
+@st.cache_resource
+def get_feedback_store():
+    """进程内共享的反馈库（后台批量写入）"""
+    return FeedbackStore()
+
+
+@st.cache_resource
+def get_shared_state():
+    """进程内共享的推荐状态，由后台线程定时刷新；设置 CANTEEN_LIVE_PORT 时同时接收实时进出事件"""
+    catalog_store = CatalogStore()
+    live = None
+    if LIVE_PORT is not None:
+        arrays = catalog_store.catalog.arrays
+        live = LiveOccupancy(arrays.names, arrays.seats).start(LIVE_HOST, LIVE_PORT)
+    return SharedState(catalog_store=catalog_store, feedback_store=get_feedback_store(), live=live).start()
+
+
+@st.cache_resource
+def get_preference_model():
+    """进程内共享的个性化偏好模型，反馈提交时增量更新，后台定期与 PREFERENCES_PATH 同步（读取命令行重训、写回供 API 读取）"""
+    model = load_preferences(get_shared_state().canteens.names)
+    PreferenceSaver(model).start()
+    return model
+
+
+@st.cache_resource
+def get_menu(catalog_version, mtime, _db):
+    """按当前食堂目录对齐的菜品目录与倒排索引，目录或菜品文件更新后重建"""
+    return load_menu(_db)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def feedback_accuracy():
+    """反馈中"预测准确度"的 (条数, 平均分)，每分钟最多查询一次"""
+    return get_feedback_store().accuracy_summary()
+
+
+METRICS = get_metrics()
+METRICS.inc("reruns", help_text="页面运行次数")
+METRICS.touch_session(st.session_state.session_id)
+SHARED_STATE = get_shared_state()
+SNAPSHOT = SHARED_STATE.snapshot
+CANTEEN_ARRAYS = SNAPSHOT.canteens
+CANTEENS_DB = SNAPSHOT.catalog.db
+WALKING = SNAPSHOT.catalog.walking
+try:
+    MENU, MENU_ERROR = get_menu(SNAPSHOT.catalog.version, menu_mtime(), CANTEENS_DB), None
+except MenuError as exc:
+    MENU, MENU_ERROR = Menu.build([], CANTEENS_DB), exc
+SIDEBAR_STARTED = time.perf_counter()
+
+
+# ============ 侧边栏配置 ============
+with st.sidebar:
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.header("⚙️ 智能推荐设置")
+    
+    # 用户信息
+    st.subheader("👤 用户画像")
+    user_type = st.selectbox(
+        "身份类型",
+        ["本科生", "研究生", "教师", "留学生", "访客"],
+        index=0,
+        help="系统会根据不同身份提供个性化推荐",
+        key="user_type_select"
+    )
+    
+    if user_type == "本科生":
+        grade = st.select_slider("所在年级", options=["大一", "大二", "大三", "大四"], value="大三", key="grade_slider")
+    
+    card_id = st.text_input(
+        "校园卡号（可选）",
+        help="填写后按您的历史就餐与评分个性化排序，评价食堂时也会更新您的偏好",
+        key="card_id_input"
+    ).strip() or None
+    if card_id is not None:
+        if card_id in get_preference_model():
+            st.caption("✨ 已启用个性化推荐")
+        else:
+            st.caption("暂无您的就餐记录，评价食堂后即可启用个性化推荐")
+    
+    # 就餐场景
+    st.subheader("🎯 就餐场景")
+    dining_purpose = st.selectbox(
+        "本次就餐目的",
+        ["日常快速就餐", "朋友聚餐", "学习讨论", "改善伙食", "约会用餐", "招待访客"],
+        index=0,
+        help="选择您的就餐目的",
+        key="dining_purpose_select"
+    )
+    
+    # 时间设置
+    st.subheader("🕒 时间设置")
+    dining_date = st.date_input("就餐日期", datetime.now().date(), key="dining_date_input")
+    current_time = st.time_input("计划就餐时间", datetime.now().time(), key="current_time_input")
+    weekday = dining_date.weekday()
+    DAY = SHARED_STATE.calendar.day(dining_date)
+    st.caption(f"📅 {DAY.describe()}")
+    
+    # 位置设置
+    st.subheader("📍 所在位置")
+    origin_choice = st.selectbox(
+        "出发地点",
+        ["不考虑位置"] + WALKING.building_names,
+        index=0,
+        help="选择后按 步行 + 排队 的总时间推荐，距离较远的食堂会适当降分",
+        key="origin_select"
+    )
+    origin = None if origin_choice == "不考虑位置" else origin_choice
+    if origin is not None:
+        open_now = CANTEEN_ARRAYS.hours.open_at(current_time.hour * 60 + current_time.minute, weekday)
+        nearest, walk_minutes = WALKING.nearest_from_building(origin, open_now)
+        if nearest >= 0:
+            st.caption(f"🚶 最近的营业食堂：{CANTEEN_ARRAYS.names[nearest]}（步行约 {walk_minutes:.0f} 分钟）")
+        else:
+            st.caption("🚶 附近暂无营业中的食堂")
+    
+    # 偏好设置
+    st.subheader("📊 偏好设置")
+    
+    price_range = st.slider(
+        "价格预算（元）",
+        5, 50, (8, 25),
+        help="设置您的价格预算范围",
+        key="price_range_slider"
+    )
+    
+    max_wait_time = st.slider(
+        "最长等待时间（分钟）",
+        5, 45, 15,
+        help="您能接受的最长等待时间（选择所在位置后包含步行时间）",
+        key="max_wait_time_slider"
+    )
+    
+    balance_mode = st.toggle(
+        "⚖️ 分流推荐模式",
+        value=False,
+        help="综合同一时段所有在线用户的需求，按各食堂剩余容量分配推荐，避免扎堆",
+        key="balance_mode_toggle"
+    )
+    
+    # 食堂类型偏好
+    st.subheader("🏷️ 食堂类型偏好")
+    canteen_types = ["大众食堂", "风味食堂", "清真食堂", "快餐食堂", "自助食堂", "教工食堂", "美食广场", "夜宵食堂"]
+    selected_types = st.multiselect(
+        "选择喜欢的食堂类型",
+        canteen_types,
+        default=canteen_types,
+        help="可多选，系统将优先推荐",
+        key="canteen_types_multiselect"
+    )
+    
+    # 菜品搜索
+    dish_query = ""
+    if MENU_ERROR is not None:
+        st.warning(f"菜品目录无效，菜品搜索暂不可用：{MENU_ERROR}")
+    elif len(MENU):
+        st.subheader("🍜 想吃什么")
+        dish_query = st.text_input(
+            "搜索菜品或口味",
+            placeholder="如：米线、牛肉、早餐",
+            help="只推荐在计划就餐时间、价格预算内供应匹配菜品的食堂；多个词用空格分隔，需同时包含",
+            key="dish_search_input"
+        )
+    dish_terms = query_terms(dish_query)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # 系统状态
+    st.markdown("---")
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("📈 系统状态")
+    
+    current_minutes = current_time.hour * 60 + current_time.minute
+    
+    # 高峰时段来自校历按当天编译的作息，查询只是一次数组索引
+    peak_window = DAY.peak_window_at(current_minutes)
+    is_peak_hour = peak_window is not None
+    
+    if is_peak_hour:
+        st.error(f"🚨 **{meal_name(peak_window[0])}高峰期**")
+        st.caption(f"⏰ {current_time.strftime('%H:%M')}")
+    else:
+        st.success("✅ **非高峰期**")
+        st.caption(f"⏰ {current_time.strftime('%H:%M')}")
+    if SNAPSHOT.live.any():
+        st.caption(f"📡 {int(SNAPSHOT.live.sum())} 个食堂的当前拥挤度来自实时进出数据")
+    
+    cpu_percent = METRICS.load.cpu_percent()
+    load_average = METRICS.load.load_average()
+    st.progress(min(int(cpu_percent), 100))
+    st.caption(
+        f"系统负载：CPU {cpu_percent:.0f}% · 内存 {METRICS.load.resident_bytes() / 2**20:.0f} MB"
+        + (f" · 1分钟平均负载 {load_average:.2f}" if load_average is not None else "")
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+METRICS.observe("sidebar", time.perf_counter() - SIDEBAR_STARTED)
+
+# ============ 推荐算法 ============
+def get_day_conditions():
+    """所选就餐日期每分钟的预测拥挤度 (M, 1440) 与排队估计，今天直接读快照（含实时修正）"""
+    return SHARED_STATE.conditions(DAY.date, SNAPSHOT)
+
+
+def personal_adjustment():
+    """(缓存键部分, (M,) 个性化调整量)；未填写卡号或没有记录时为 (None, None)"""
+    model = get_preference_model()
+    if card_id is None or card_id not in model:
+        return None, None
+    return (card_id, model.version), model.adjustment_for(card_id, CANTEEN_ARRAYS.names)
+
+
+def dish_search(key):
+    """(缓存键部分, 菜品搜索命中)；未搜索菜品时为 (None, None)。预算取查询键中的价格区间"""
+    if not dish_terms:
+        return None, None
+    return (dish_terms, MENU.mtime), MENU.search(dish_terms, (key[4], key[5]))
+
+
+def build_recommendations(key, personal=None, matches=None, day=None):
+    """按归一化输入计算推荐结果表（与 API 服务共用 SharedState.score_query）
+
+    matches 为菜品搜索命中时，只保留此刻在供应命中菜品的食堂，并加一列"匹配菜品"。
+    """
+    q_weekday, q_minute = key[2], key[3]
+    with METRICS.span("scoring"):
+        mask = None if matches is None else matches.canteen_mask([q_minute], q_weekday)
+        result, seat_occupancy = SHARED_STATE.score_query(key, SNAPSHOT, personal, mask, day)
+    with METRICS.span("dataframe"):
+        frame = result_frame(CANTEEN_ARRAYS, result, seat_occupancy)
+        if matches is not None:
+            add_dish_column(frame, result, matches, q_minute, q_weekday)
+        return frame
+
+
+RESULT_COLUMN_CONFIG = {
+    "最低价": st.column_config.NumberColumn("最低价", format="%d元"),
+    "最高价": st.column_config.NumberColumn("最高价", format="%d元"),
+    "步行时间": st.column_config.NumberColumn("步行时间", format="%d分钟"),
+    "等待时间": st.column_config.NumberColumn("等待时间", format="%d分钟"),
+    "推荐指数": st.column_config.NumberColumn("推荐指数", format="%.1f"),
+}
+
+
+def current_query_key():
+    """当前侧边栏输入对应的归一化缓存键"""
+    return normalize_query(
+        user_type, dining_purpose, current_time.hour * 60 + current_time.minute,
+        price_range, max_wait_time, selected_types, weekday, origin=origin
+    )
+
+
+def calculate_recommendations():
+    """计算推荐结果（相同输入命中缓存）"""
+    key = current_query_key()
+    personal_key, personal = personal_adjustment()
+    dish_key, matches = dish_search(key)
+    cache_key = (key, SHARED_STATE.data_version(DAY.date, SNAPSHOT), personal_key, dish_key, DAY.signature)
+    return get_result_cache().get_or_compute(cache_key, lambda: build_recommendations(key, personal, matches, DAY))
+
+
+@st.cache_resource
+def get_demand_registry():
+    """进程内共享的在线需求登记"""
+    return DemandRegistry()
+
+
+def balanced_choice(key):
+    """分流模式：返回 (本会话分到的食堂名称或 None, 参与分配的在线人数)
+
+    在线需求按 (就餐日期, 时间桶) 登记，每个会话登记自己的查询键、校园卡号与菜品搜索词；
+    分配时每人按各自的个性化调整与菜品条件评分，与推荐结果表用同一份 SharedState 评分。
+    """
+    bucket_start = bucket_minute(key[3], ALLOCATION_BUCKET_MINUTES)
+    registry = get_demand_registry()
+    registry.register(st.session_state.session_id, (DAY.date, bucket_start), (key, card_id, dish_terms))
+    active = registry.active((DAY.date, bucket_start))
+
+    session_ids = [sid for sid, _ in active]
+    keys, cards, terms = zip(*(query for _, query in active))
+    personal = get_preference_model().adjustments(
+        [card if card is not None else "" for card in cards], CANTEEN_ARRAYS.names
+    )
+    mask = np.ones((len(keys), len(CANTEEN_ARRAYS)), dtype=bool)
+    masks = {}
+    for i, (k, dish) in enumerate(zip(keys, terms)):
+        if dish:
+            if (dish, k[3], k[4], k[5]) not in masks:
+                masks[dish, k[3], k[4], k[5]] = MENU.search(dish, (k[4], k[5])).canteen_mask([k[3]], k[2])[0]
+            mask[i] = masks[dish, k[3], k[4], k[5]]
+    result, _ = SHARED_STATE.score_queries(keys, SNAPSHOT, personal, mask, DAY)
+    _, queue = get_day_conditions()
+    capacity = remaining_capacity(
+        CANTEEN_ARRAYS, queue, bucket_start, ALLOCATION_BUCKET_MINUTES,
+        demand=len(active), is_open=CANTEEN_ARRAYS.hours.open_at(bucket_start, DAY.date.weekday())
+    )
+    assignment = allocate(result.score, result.eligible & result.recommended, capacity)
+
+    j = assignment[session_ids.index(st.session_state.session_id)]
+    return (CANTEEN_ARRAYS.names[j] if j >= 0 else None), len(active)
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def campus_overview(data_version, day_signature, minute, weekday):
+    """全校区概况：(营业食堂数, 预计在场人数, 平均拥挤度, 平均等待分钟)
+
+    只由快照数据与当天作息决定，按数据版本、作息签名与分钟缓存，所有会话共用；数据更新后版本变化自然失效。
+    """
+    profile = single_profile("本科生", "日常快速就餐", minute, (0, 1000), MAX_WAIT, CANTEEN_TYPES, weekday)
+    crowd, queue = get_day_conditions()
+    crowd = crowd[:, profile.minute].T
+    result = score_profiles(CANTEEN_ARRAYS, profile, crowd=crowd, wait=queue.wait[:, profile.minute].T,
+                            factor=DAY.factor[profile.minute])
+    is_open = result.eligible[0]
+    if not is_open.any():
+        return 0, 0, 0.0, 0.0
+    diners = int((crowd[0, is_open] / 100 * CANTEEN_ARRAYS.seats[is_open]).sum())
+    return int(is_open.sum()), diners, float(result.crowd[0, is_open].mean()), float(result.wait[0, is_open].mean())
+
+# ============ 主界面 ============
+RENDER_STARTED = time.perf_counter()
+open_count, diners, campus_crowd, campus_wait = campus_overview(
+    SHARED_STATE.data_version(DAY.date, SNAPSHOT), DAY.signature, current_time.hour * 60 + current_time.minute, weekday
+)
+
+# 顶部状态指标
+st.markdown('<div class="card">', unsafe_allow_html=True)
+col_status1, col_status2, col_status3, col_status4 = st.columns(4)
+
+with col_status1:
+    st.metric("🏫 食堂总数", f"{len(CANTEEN_ARRAYS)}个", "北校区全覆盖")
+with col_status2:
+    st.metric("👥 实时用户", f"{METRICS.active_sessions()}人在线", f"食堂预计在场{diners}人", delta_color="off")
+with col_status3:
+    # 用户反馈中"预测准确度"一项的平均评分（1-5 分），不是对预测误差的测量
+    feedback_count, accuracy_mean = feedback_accuracy()
+    if feedback_count:
+        st.metric("⭐ 准确度评分", f"{accuracy_mean:.1f} / 5", f"{feedback_count}条用户评价的平均分", delta_color="off")
+    else:
+        st.metric("⭐ 准确度评分", "暂无", "等待用户评价", delta_color="off")
+with col_status4:
+    # 取最近若干次完整运行的实测耗时（本次运行尚未结束）
+    script_p50, script_p95 = METRICS.latency("script", 0.5), METRICS.latency("script", 0.95)
+    if script_p50 is None:
+        st.metric("⏰ 系统响应", "—", "首次运行", delta_color="off")
+    else:
+        st.metric("⏰ 系统响应", f"{script_p50 * 1000:.0f}ms", f"p95 {script_p95 * 1000:.0f}ms", delta_color="off")
+
+st.markdown('</div>', unsafe_allow_html=True)
+
+# 高峰期警告
+if is_peak_hour:
+    st.markdown('<div class="peak-warning">', unsafe_allow_html=True)
+    peak_type = meal_name(peak_window[0])
+    peak_time = format_window(peak_window)
+    
+    st.markdown(f"""
+    ## 🚨 {peak_type}高峰期预警 ({peak_time})
+    
+    **当前时间：** {current_time.strftime('%H:%M')}  
+    **预计拥挤度：** {campus_crowd:.0f}%  
+    **平均等待时间：** {campus_wait:.0f}分钟  
+    
+    **💡 智能建议：** 建议选择教工食堂或错峰就餐
+    """)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# 推荐结果
+st.markdown("## 🎯 智能推荐结果")
+st.markdown("---")
+
+@st.fragment
+def recommendation_panel():
+    """推荐结果面板：侧边栏输入变化时随整页重跑，页面其他部分的交互不会触发它"""
+    METRICS.inc("fragment_runs", help_text="局部重跑的片段运行次数", fragment="recommendations")
+    df = calculate_recommendations()
+
+    if df.empty and dish_terms:
+        st.error(f"""
+        ## ⚠️ 没有食堂在 {current_time.strftime('%H:%M')} 供应预算内的"{' '.join(dish_terms)}"
+        
+        **调整建议：**
+        1. 换一个关键词，或只保留一个词
+        2. 放宽价格范围
+        3. 调整就餐时间（下方全天规划会列出供应时段）
+        """)
+    elif df.empty:
+        st.error("""
+        ## ⚠️ 未找到符合条件的食堂
+        
+        **可能原因：**
+        1. 当前时间部分食堂未营业
+        2. 价格预算范围过小
+        3. 筛选条件过于严格
+        
+        **调整建议：**
+        1. 放宽价格范围
+        2. 选择更多食堂类型
+        3. 调整就餐时间
+        """)
+    else:
+        # 获取推荐结果
+        recommended_df = df[df["推荐"]].sort_values("推荐指数", ascending=False)
+        
+        if not recommended_df.empty:
+            # 最佳推荐
+            best_canteen = recommended_df.iloc[0]
+            if balance_mode:
+                assigned_name, active_users = balanced_choice(current_query_key())
+                if assigned_name in set(recommended_df["食堂名称"]):
+                    best_canteen = recommended_df[recommended_df["食堂名称"] == assigned_name].iloc[0]
+                st.caption(f"⚖️ 分流推荐模式：本时段共 {active_users} 位在线用户按各食堂剩余容量参与分配")
+            
+            best_info = CANTEENS_DB[best_canteen['食堂名称']]
+            if dish_terms:
+                dishes_line = f"🔍 **匹配菜品：** {best_canteen['匹配菜品']}"
+            else:
+                dishes_line = f"🍽️ **热门菜品：** {', '.join(best_info['popular_dishes'][:2])}"
+            st.markdown('<div class="best-recommendation">', unsafe_allow_html=True)
+            
+            col_rec1, col_rec2 = st.columns([2, 1])
+            
+            with col_rec1:
+                st.markdown(f"""
+                ## 🏆 今日最佳：**{best_canteen['食堂名称']}**
+                
+                **✨ 推荐理由：**
+                - ⭐ **综合评分：** {best_canteen['推荐指数']:.1f}/10.0
+                - 👥 **拥挤程度：** {best_canteen['拥挤状态']} ({best_canteen['拥挤度']}%)
+                - ⏱️ **预计等待：** {best_canteen['等待时间']}分钟
+                - 🚶 **步行时间：** {f"{best_canteen['步行时间']}分钟" if origin is not None else "—"}
+                - 🪑 **座位占用：** {best_canteen['座位占用']:.0%}（共{best_canteen['座位数']}座）
+                - 💰 **价格区间：** {best_canteen['最低价']:g}-{best_canteen['最高价']:g}元
+                - 🏷️ **食堂特色：** {best_info['specialty']}
+                - 📍 **位置信息：** {best_info['location']}
+                - {dishes_line}
+                """)
+            
+            with col_rec2:
+                # 行动建议
+                st.markdown("### 🚀 行动建议")
+                if is_peak_hour:
+                    st.warning(f"**高峰期策略：**\n- 建议错峰就餐\n- 考虑打包外带\n- 避开{format_window(peak_window)}")
+                else:
+                    st.success("**平峰期优势：**\n- 建议堂食\n- 环境舒适\n- 无需排队")
+                
+                st.markdown("### 📱 温馨提示")
+                st.info(f"**营业时间：** {best_info['opening_hours']}")
+            
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            # 所有食堂数据表格
+            st.markdown("### 📋 所有食堂数据分析")
+            
+            # 只传需要显示的数值列，单位与小数位由列格式在前端生成
+            display_columns = ["食堂名称", "类型", "最低价", "最高价", "步行时间", "等待时间", "拥挤状态", "推荐指数", "推荐状态"]
+            if origin is None:
+                display_columns.remove("步行时间")
+            if dish_terms:
+                display_columns.insert(2, "匹配菜品")
+            st.dataframe(
+                df[display_columns],
+                width="stretch",
+                hide_index=True,
+                column_config=RESULT_COLUMN_CONFIG
+            )
+            st.download_button(
+                "📥 导出结果（Arrow）",
+                data=lambda: arrow_ipc_bytes(df),
+                file_name="recommendations.arrow",
+                mime="application/vnd.apache.arrow.stream",
+                on_click="ignore",
+                key="export_arrow_button"
+            )
+            
+            # 统计信息
+            col_stat1, col_stat2, col_stat3 = st.columns(3)
+            with col_stat1:
+                st.metric("推荐食堂数", f"{len(recommended_df)}个", f"/{len(df)}个")
+            with col_stat2:
+                avg_wait = df["等待时间"].mean()
+                delta = f"{'+' if avg_wait > 15 else '-'}{abs(avg_wait-15):.1f}分钟"
+                st.metric("平均等待", f"{avg_wait:.1f}分钟", delta)
+            with col_stat3:
+                avg_score = df['推荐指数'].mean()
+                delta = f"{'+' if avg_score > 7 else '-'}{abs(avg_score-7):.1f}"
+                st.metric("平均推荐分", f"{avg_score:.1f}/10", delta)
+        else:
+            st.warning("""
+            ## ⚠️ 当前条件下无合适推荐
+            
+            **智能分析：**
+            1. 所有食堂等待时间均超过您的设定
+            2. 当前为高峰期，建议调整策略
+            
+            **立即行动：**
+            1. 增加等待时间容忍度
+            2. 选择价格更高的食堂
+            3. 考虑错峰就餐
+            """)
+
+
+recommendation_panel()
+
+# ============ 全天就餐规划 ============
+st.markdown("## 📅 全天错峰规划")
+PLAN_SLOT_OPTIONS = [1, 5, 10, 15, 30]
+PLAN_HEATMAP_ROWS = 15
+
+
+def build_day_plan(key, slot_minutes, personal=None, matches=None, day=None):
+    """按当前条件扫描全天各时段 × 各食堂的规划网格；搜索了菜品时只看各时段供应命中菜品的食堂"""
+    q_user_type, q_purpose, q_weekday, _, q_price_min, q_price_max, q_max_wait, q_types, q_origin = key
+    crowd, queue = get_day_conditions()
+    adjustment = SNAPSHOT.score_adjustment if personal is None else SNAPSHOT.score_adjustment + personal
+    with METRICS.span("planner"):
+        mask = None if matches is None else matches.canteen_mask(plan_slots(slot_minutes=slot_minutes), q_weekday)
+        return plan_day(
+            CANTEEN_ARRAYS, q_user_type, q_purpose, (q_price_min, q_price_max), q_max_wait, q_types, q_weekday,
+            crowd, queue.wait, adjustment=adjustment, walk=WALKING.minutes_for([q_origin]),
+            slot_minutes=slot_minutes, mask=mask, factor=None if day is None else day.factor
+        )
+
+
+def plan_heatmap(data, slot_minutes):
+    """食堂 × 时段 热力图：颜色为推荐指数，超出最长等待的时段显示为灰色，未营业的时段留空"""
+    import altair as alt
+
+    return alt.Chart(data).mark_rect().encode(
+        x=alt.X("分钟:Q", bin=alt.Bin(step=slot_minutes, extent=[0, 1440]),
+                axis=alt.Axis(title="时间", labelExpr="timeFormat(datum.value * 60000, '%H:%M')", tickCount=24)),
+        y=alt.Y("食堂名称:N", sort=list(dict.fromkeys(data["食堂名称"])), title=None),
+        color=alt.condition("datum.可行", alt.Color("推荐指数:Q", scale=alt.Scale(scheme="greens"),
+                                                   title="推荐指数"), alt.value("#E5E7EB")),
+        tooltip=["食堂名称", "时间", alt.Tooltip("推荐指数:Q", format=".1f"), "等待时间", "步行时间", "拥挤度"],
+    ).properties(height=28 * data["食堂名称"].nunique() + 40)
+
+
+@st.fragment
+def day_plan_panel():
+    """全天规划面板：切换时段粒度只重跑本面板"""
+    METRICS.inc("fragment_runs", help_text="局部重跑的片段运行次数", fragment="planner")
+    slot_minutes = st.select_slider(
+        "规划时段粒度（分钟）", options=PLAN_SLOT_OPTIONS, value=5, key="plan_slot_slider",
+        help="按此粒度扫描全天每个时段在各食堂的营业、等待、拥挤度与推荐分"
+    )
+    key = current_query_key()
+    personal_key, personal = personal_adjustment()
+    dish_key, matches = dish_search(key)
+    cache_key = (("plan", slot_minutes) + key[:3] + key[4:], SHARED_STATE.data_version(DAY.date, SNAPSHOT),
+                 personal_key, dish_key, DAY.signature)
+    plan = get_result_cache().get_or_compute(
+        cache_key, lambda: build_day_plan(key, slot_minutes, personal, matches, DAY)
+    )
+    
+    best = plan_frame(CANTEEN_ARRAYS, plan)
+    if best.empty:
+        st.info("全天没有同时满足预算、类型与最长等待的食堂时段，可以放宽条件再试")
+        return
+    
+    top = best.iloc[0]
+    st.success(
+        f"🕒 最佳就餐安排：**{top['就餐时间'].strftime('%H:%M')}** 前往 **{top['食堂名称']}**，"
+        f"预计排队 {top['等待时间']} 分钟、拥挤度 {top['拥挤度']}%"
+    )
+    col_plan1, col_plan2 = st.columns([1, 2])
+    with col_plan1:
+        st.markdown("### 🏅 最佳（食堂，时间）组合")
+        st.dataframe(
+            best if origin is not None else best.drop(columns="步行时间"),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                **RESULT_COLUMN_CONFIG,
+                "就餐时间": st.column_config.TimeColumn("就餐时间", format="HH:mm"),
+                "拥挤度": st.column_config.NumberColumn("拥挤度", format="%d%%"),
+            }
+        )
+    with col_plan2:
+        st.markdown("### 🗓️ 全天推荐热力图")
+        rows = [j for j, _ in plan.best_pairs(PLAN_HEATMAP_ROWS)]
+        st.altair_chart(plan_heatmap(heatmap_frame(CANTEEN_ARRAYS, plan, rows), slot_minutes), width="stretch")
+        st.caption(f"按推荐分（不含时间因子）取前 {len(rows)} 个食堂；灰色为营业但超出最长等待的时段，空白为未营业")
+
+
+day_plan_panel()
+
+# ============ 用户反馈系统 ============
+st.markdown("---")
+st.markdown("## 💬 用户体验反馈")
+
+def submit_feedback():
+    """提交按钮回调：按控件 key 读取表单取值写入反馈库，并切换到感谢信息"""
+    state = st.session_state
+    canteen = None if state.feedback_canteen_select == "未指定" else state.feedback_canteen_select
+    get_feedback_store().submit(
+        state.accuracy_slider, state.usability_slider, state.usefulness_slider, state.likelihood_slider,
+        state.feedback_text, canteen=canteen, session_id=state.session_id,
+        canteen_rating=None if canteen is None else state.canteen_rating_slider
+    )
+    METRICS.inc("feedback_submissions", help_text="提交的反馈条数")
+    card = state.get("card_id_input", "").strip()
+    if card and canteen is not None:
+        # 填写了卡号时，这条食堂评分同时增量更新个人偏好
+        get_preference_model().partial_fit([card], [canteen], ratings=[state.canteen_rating_slider])
+    state.feedback_submitted = True
+
+
+def reset_feedback():
+    st.session_state.feedback_submitted = False
+
+
+@st.fragment
+def feedback_form():
+    """反馈表单：提交或重置只重跑表单本身（状态切换放在控件回调中，不需要整页 st.rerun）"""
+    METRICS.inc("fragment_runs", help_text="局部重跑的片段运行次数", fragment="feedback")
+    if not st.session_state.feedback_submitted:
+        with st.form("feedback_form"):
+            st.markdown("请帮助我们改进系统，您的反馈对我们非常重要！")
+            
+            col_fb1, col_fb2 = st.columns(2)
+            
+            with col_fb1:
+                st.slider("预测准确度", 1, 5, 4, key="accuracy_slider")
+                st.slider("系统易用性", 1, 5, 4, key="usability_slider")
+                
+            with col_fb2:
+                st.slider("实用价值", 1, 5, 4, key="usefulness_slider")
+                st.slider("再次使用意愿", 1, 5, 4, key="likelihood_slider")
+            
+            st.selectbox(
+                "本次就餐的食堂（可选）",
+                ["未指定"] + list(CANTEENS_DB),
+                index=0,
+                help="选择后下方的食堂评分会汇总到该食堂的推荐分中",
+                key="feedback_canteen_select"
+            )
+            st.slider(
+                "食堂评分", 1, 5, 3,
+                help="对所选食堂本次就餐的评价（饭菜、环境、排队体验）；未选择食堂时不计入",
+                key="canteen_rating_slider"
+            )
+            st.text_area("具体建议或问题反馈：", height=100, key="feedback_text")
+            
+            st.form_submit_button("📤 提交反馈", on_click=submit_feedback)
+    else:
+        st.success("✅ 感谢您的宝贵反馈！")
+        
+        st.markdown("""
+        **🙏 感谢您的参与！**
+        
+        您的反馈将用于：
+        1. 优化推荐算法准确度
+        2. 改进系统用户体验
+        3. 增加新的实用功能
+        
+        我们将持续改进，为西昌学院师生提供更好的服务！
+        """)
+        
+        st.button("提交新反馈", on_click=reset_feedback)
+
+
+feedback_form()
+
+# ============ 项目信息 ============
+st.markdown("---")
+st.markdown("## 📋 项目信息")
+
+with st.expander("查看详细项目文档"):
+    col_info1, col_info2 = st.columns(2)
+    
+    with col_info1:
+        st.markdown("""
+        ### 🎓 项目背景
+        
+        **课程名称：** 人工智能  
+        **项目类型：** 课程设计/期末项目  
+        **开发时间：** 2024年12月  
+        **适用对象：** 西昌学院北校区全体师生  
+        
+        ### 🎯 项目目标
+        
+        1. **解决问题：** 缓解食堂高峰期拥堵  
+        2. **提升体验：** 优化师生就餐选择  
+        3. **数据驱动：** 基于真实数据的智能推荐  
+        4. **教育意义：** 展示AI在实际场景中的应用  
+        """)
+    
+    with col_info2:
+        st.markdown("""
+        ### 🛠️ 技术架构
+        
+        **前端技术：**  
+        - Streamlit (交互式Web应用)  
+        - HTML/CSS (界面美化)  
+        
+        **后端算法：**  
+        - 时间序列预测模型  
+        - 多因素加权推荐算法  
+        - 实时数据处理  
+        
+        **数据来源：**  
+        - 西昌学院食堂实地调研  
+        - 学生问卷调查数据  
+        - 历史就餐记录分析  
+        """)
+    
+    st.markdown("""
+    ### 📊 数据说明
+    
+    1. **实时数据：** 基于当前时间的动态预测  
+    2. **历史数据：** 过去30天的就餐记录分析  
+    3. **用户数据：** 匿名化的偏好设置数据  
+    4. **食堂数据：** 食堂目录（data/canteens.json）中各食堂的详细信息  
+    
+    ### 🔒 隐私保护
+    
+    - 所有用户数据均为匿名处理  
+    - 不收集个人敏感信息  
+    - 数据仅用于推荐算法优化  
+    """)
+
+# ============ 开发者信息 ============
+st.markdown("---")
+st.markdown("""
+<div style="text-align: center; padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            color: white; border-radius: 10px; margin-top: 20px;">
+    <h3>🎓 西昌学院人工智能课程期末项目</h3>
+    <p><strong>开发者：</strong>Lizhanghuan | <strong>学号：</strong>2311030019 | <strong>班级：</strong>计算机科学与技术23级1班</p>
+    <p><strong>指导老师：</strong>黎华老师 | <strong>课程：</strong>人工智能（2025-2026学年第一学期）</p>
+    <p><strong>项目时间：</strong>2025年12月 | <strong>版本：</strong>v3.0.0</p>
+    <p style="font-size: 0.9em; opacity: 0.8;">© 2025 西昌学院人工智能课程组 | 本系统仅为课程设计作品</p>
+</div>
+""", unsafe_allow_html=True)
+
+# ============ 刷新按钮 ============
+st.markdown("---")
+if st.button("🔄 刷新系统数据", type="primary", width="stretch"):
+    st.rerun()
+
+METRICS.observe("render", time.perf_counter() - RENDER_STARTED)
+METRICS.observe("script", time.perf_counter() - SCRIPT_STARTED)
\ No newline at end of file
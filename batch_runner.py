@@ -0,0 +1,329 @@
+# batch_runner.py - 离线批量推荐（命令行 / 库入口，不依赖 Streamlit）
+#
+# 用法：
+#   python batch_runner.py queries.csv -o recommendations.jsonl --chunk-size 50000
+#
+# 查询文件为 CSV 或 JSONL，每条查询字段：
+#   id, user_type, dining_purpose, time(HH:MM), price_min, price_max, max_wait, types, weekday
+# types 在 CSV 中以 "|" 分隔，在 JSONL 中可为列表；缺省表示全部类型。
+# weekday 为 0-6（0 表示周一），缺省为今天；可选 date（YYYY-MM-DD）指定就餐日期，只给 weekday 时
+# 取从今天起的下一个该星期几（同 API 服务）；可选 origin 为出发楼宇名称，给出时计入步行时间。
+# 评分输入与页面 / API 相同（见 SharedState.score_query）：时间按同样的时间桶取整，预测拥挤度、
+# 排队模型等待、反馈汇总的推荐分调整量与校历时间因子，同一条查询在批量与页面上得到相同的推荐。
+# 输入按块读取、按块评分、按块写出，内存占用只与块大小有关。
+# 时间、身份、价格、日期等有误的查询逐行报告（JSONL 写 error 字段，CSV 写 error 列），不中断整批处理。
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from catalog import CATALOG_PATH, CatalogStore
+from feedback_store import FEEDBACK_DB_PATH, FeedbackStore
+from forecast import FORECAST_PATH
+from result_cache import bucket_minute
+from scoring import CANTEEN_TYPES, DINING_PURPOSES, USER_TYPES, CanteenArrays, build_profiles, score_profiles
+from shared_state import SharedState
+
+DEFAULT_QUERY = {
+    "user_type": "本科生",
+    "dining_purpose": "日常快速就餐",
+    "price_min": 8,
+    "price_max": 25,
+    "max_wait": 15,
+}
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_TOP_K = 3
+CSV_FIELDS = ["id", "rank", "canteen", "score", "wait", "walk", "crowd", "status", "error"]
+
+
+# ============ 读取 ============
+def _file_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_queries(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按块读取查询文件，每次产出一个 DataFrame"""
+    if _file_format(path) == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={"id": str, "types": str, "time": str})
+        return
+
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) >= chunk_size:
+                yield pd.DataFrame.from_records(records)
+                records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def _parse_minute(value):
+    """"HH:MM" -> 一天中的分钟数，格式或取值不合法时抛出 ValueError"""
+    hour, minute = (int(part) for part in str(value).strip().split(":")[:2])
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"时间超出范围: {value}")
+    return hour * 60 + minute
+
+
+def _parse_types(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == "":
+        return CANTEEN_TYPES
+    return [t.strip() for t in str(value).split("|") if t.strip()]
+
+
+def _column(chunk, name):
+    if name in chunk:
+        return chunk[name].fillna(DEFAULT_QUERY[name])
+    return pd.Series(DEFAULT_QUERY[name], index=chunk.index)
+
+
+def _weekday_column(chunk):
+    """weekday 列转为数值，缺省或无法解析为 NaN"""
+    if "weekday" not in chunk:
+        return pd.Series(np.nan, index=chunk.index)
+    return pd.to_numeric(chunk["weekday"], errors="coerce")
+
+
+def dining_dates(chunk, today):
+    """各查询的就餐日期：给出 date 时以其为准，只给 weekday 时取从 today 起的下一个该星期几，
+    都没有时为 today（同 API 服务）。返回 (日期列表, 错误信息列表)，无误的行错误信息为 None"""
+    weekday = _weekday_column(chunk)
+    valid_weekday = weekday.isin(range(7))
+    offsets = (weekday.where(valid_weekday, today.weekday()).astype(np.int64) - today.weekday()) % 7
+    dates = [today + timedelta(days=int(offset)) for offset in offsets]
+    errors = [None if ok or pd.isna(raw) else f"weekday 应为 0-6: {raw}"
+              for ok, raw in zip(valid_weekday, chunk["weekday"] if "weekday" in chunk else weekday)]
+    if "date" in chunk:
+        for i, (text, given) in enumerate(zip(chunk["date"], weekday)):
+            if not isinstance(text, str) or not text.strip() or errors[i]:
+                continue
+            try:
+                dates[i] = date.fromisoformat(text.strip())
+            except ValueError:
+                errors[i] = f"date 应为 YYYY-MM-DD: {text}"
+                continue
+            if not pd.isna(given) and int(given) != dates[i].weekday():
+                errors[i] = f"weekday={int(given)} 与 date={dates[i]} 不符（应为 {dates[i].weekday()}）"
+    return dates, errors
+
+
+def check_queries(chunk, today):
+    """逐行校验查询块，返回 (各行就餐日期, 各行错误信息)，无误的行错误信息为 None
+
+    时间、身份、就餐目的、价格、最长等待、星期与日期有误的行不参与评分，由调用方按 id 输出错误记录。
+    """
+    dates, date_errors = dining_dates(chunk, today)
+    problems = [[] if error is None else [error] for error in date_errors]
+    if "time" not in chunk:
+        for row in problems:
+            row.append("缺少 time 字段")
+    else:
+        for row, value in zip(problems, chunk["time"]):
+            try:
+                _parse_minute(value)
+            except (ValueError, TypeError):
+                row.append(f"时间应为 HH:MM: {value}")
+    for name, label, allowed in (("user_type", "身份", USER_TYPES), ("dining_purpose", "就餐目的", DINING_PURPOSES)):
+        for row, value in zip(problems, _column(chunk, name)):
+            if value not in allowed:
+                row.append(f"未知的{label}: {value}")
+    low = pd.to_numeric(_column(chunk, "price_min"), errors="coerce").to_numpy()
+    high = pd.to_numeric(_column(chunk, "price_max"), errors="coerce").to_numpy()
+    max_wait = pd.to_numeric(_column(chunk, "max_wait"), errors="coerce").to_numpy()
+    for row, lo, hi, wait in zip(problems, low, high, max_wait):
+        if np.isnan(lo) or np.isnan(hi) or lo > hi:
+            row.append(f"价格区间不合法: {lo}-{hi}")
+        if np.isnan(wait) or wait < 0:
+            row.append(f"最长等待不合法: {wait}")
+    return dates, ["；".join(row) if row else None for row in problems]
+
+
+def profiles_from_frame(chunk, dates=None):
+    """查询块 -> ProfileBatch；dates 为各查询的就餐日期，缺省按 weekday 列（或今天）
+
+    时间与页面一样按 result_cache 的时间桶取整，各行应已通过 check_queries 校验。
+    """
+    types = chunk["types"] if "types" in chunk else pd.Series([None] * len(chunk), index=chunk.index)
+    if dates is not None:
+        weekday = [day.weekday() for day in dates]
+    else:
+        weekday = _weekday_column(chunk).fillna(date.today().weekday()).astype(np.int64)
+    return build_profiles(
+        _column(chunk, "user_type"),
+        _column(chunk, "dining_purpose"),
+        [bucket_minute(_parse_minute(t)) for t in chunk["time"]],
+        np.column_stack([_column(chunk, "price_min"), _column(chunk, "price_max")]),
+        _column(chunk, "max_wait"),
+        [_parse_types(t) for t in types],
+        weekday,
+    )
+
+
+# ============ 评分 ============
+def query_conditions(state, profiles, dates):
+    """与 SharedState.score_query 相同的评分输入：(拥挤度 (N, M), 等待 (N, M), 调整量 (M,), 时间因子 (N,))
+
+    数据表与校历作息按就餐日期分组各取一次，全部来自同一个快照。
+    """
+    snapshot = state.snapshot
+    shape = (len(profiles), len(snapshot.canteens))
+    crowd, wait, factor = np.empty(shape), np.empty(shape), np.empty(len(profiles))
+    dates = np.array(dates, dtype=object)
+    for day in set(dates.tolist()):
+        rows = np.flatnonzero(dates == day)
+        minutes = profiles.minute[rows]
+        day_crowd, queue = state.conditions(day, snapshot)
+        crowd[rows] = day_crowd[:, minutes].T
+        wait[rows] = queue.wait[:, minutes].T
+        factor[rows] = state.calendar.day(day).factor[minutes]
+    return crowd, wait, snapshot.score_adjustment, factor
+
+
+def recommend_chunk(canteens, chunk, rng=None, top_k=DEFAULT_TOP_K, walking=None, state=None):
+    """对一个查询块评分，返回 [(查询 id, 推荐列表, 错误信息)]，推荐列表按分数降序
+
+    未通过 check_queries 的行不评分，推荐列表为空、错误信息说明原因；其余行错误信息为 None。
+
+    walking 为 WalkingIndex 且查询含 origin 列时，按出发楼宇计入步行时间。
+    state 为 SharedState 时按其预测、排队、反馈调整与校历评分，食堂与步行索引取自其快照（与页面一致）；
+    否则按经验值加随机扰动（rng）评分。
+    """
+    snapshot = state.snapshot if state is not None else None
+    if snapshot is not None:
+        canteens = snapshot.canteens
+        walking = snapshot.catalog.walking if snapshot.catalog is not None else None
+    ids = chunk["id"].astype(str).tolist() if "id" in chunk else [str(i) for i in chunk.index]
+    dates, errors = check_queries(chunk, snapshot.created_at.date() if snapshot is not None else date.today())
+    valid = np.array([error is None for error in errors], dtype=bool)
+    if not valid.any():
+        return [(query_id, [], error) for query_id, error in zip(ids, errors)]
+
+    rows = chunk[valid]
+    walk = None
+    if walking is not None and "origin" in rows:
+        walk = walking.minutes_for([o if isinstance(o, str) else None for o in rows["origin"]])
+    if state is None:
+        result = score_profiles(canteens, profiles_from_frame(rows), rng=rng, walk=walk)
+    else:
+        dates = [day for day, ok in zip(dates, valid) if ok]
+        profiles = profiles_from_frame(rows, dates)
+        crowd, wait, adjustment, factor = query_conditions(state, profiles, dates)
+        result = score_profiles(canteens, profiles, crowd=crowd, wait=wait, adjustment=adjustment, walk=walk,
+                                factor=factor)
+
+    # 仅保留推荐食堂，按分数降序取前 top_k
+    ranked = np.where(result.eligible & result.recommended, result.score, -np.inf)
+    order = np.argsort(-ranked, axis=1, kind="stable")[:, :top_k]
+
+    output = []
+    scored = iter(range(len(rows)))
+    for query_id, error in zip(ids, errors):
+        if error is not None:
+            output.append((query_id, [], error))
+            continue
+        i = next(scored)
+        recs = []
+        for j in order[i]:
+            if not np.isfinite(ranked[i, j]):
+                break
+            recs.append({
+                "canteen": canteens.names[j],
+                "score": round(float(result.score[i, j]), 1),
+                "wait": int(result.wait[i, j]),
+                "walk": int(result.walk[i, j]),
+                "crowd": int(result.crowd[i, j]),
+                "status": "强烈推荐" if result.strong[i, j] else "推荐",
+            })
+        output.append((query_id, recs, None))
+    return output
+
+
+# ============ 写出 ============
+class _JsonlWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, query_id, recs, error=None):
+        record = {"id": query_id, "recommendations": recs} if error is None else {"id": query_id, "error": error}
+        self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class _CsvWriter:
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, query_id, recs, error=None):
+        if error is not None:
+            self.writer.writerow({"id": query_id, "error": error})
+        for rank, rec in enumerate(recs, 1):
+            self.writer.writerow({"id": query_id, "rank": rank, **rec})
+
+
+def load_state(catalog_path=CATALOG_PATH, db=None, forecast_path=FORECAST_PATH, feedback_path=FEEDBACK_DB_PATH):
+    """与页面相同的共享状态（不启动后台刷新）：目录、预测表、校历，反馈库存在时汇总推荐分调整量
+
+    db 为 名称 -> 食堂信息 的字典时用它代替目录文件（不含楼宇，不计步行时间）。
+    """
+    feedback_store = FeedbackStore(feedback_path) if feedback_path and os.path.exists(feedback_path) else None
+    try:
+        if db is not None:
+            return SharedState(canteens=CanteenArrays.from_db(db), forecast_path=forecast_path,
+                               feedback_store=feedback_store)
+        return SharedState(catalog_store=CatalogStore(catalog_path), forecast_path=forecast_path,
+                           feedback_store=feedback_store)
+    finally:
+        if feedback_store is not None:
+            feedback_store.close()
+
+
+def run(input_path, output_path=None, chunk_size=DEFAULT_CHUNK_SIZE, top_k=DEFAULT_TOP_K, db=None,
+        catalog_path=CATALOG_PATH, forecast_path=FORECAST_PATH, feedback_path=FEEDBACK_DB_PATH):
+    """批量生成推荐，返回 (处理的查询数, 有误的查询数)；output_path 为空时写到标准输出，db 为空时读取食堂目录"""
+    state = load_state(catalog_path, db, forecast_path, feedback_path)
+    out = open(output_path, "w", encoding="utf-8", newline="") if output_path else sys.stdout
+    try:
+        fmt = _file_format(output_path) if output_path else "jsonl"
+        writer = _JsonlWriter(out) if fmt == "jsonl" else _CsvWriter(out)
+        total = failed = 0
+        for chunk in read_queries(input_path, chunk_size):
+            for query_id, recs, error in recommend_chunk(state.canteens, chunk, top_k=top_k, state=state):
+                writer.write(query_id, recs, error)
+                failed += error is not None
+            total += len(chunk)
+        return total, failed
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="西昌学院北校区食堂离线批量推荐")
+    parser.add_argument("input", help="查询文件（.csv 或 .jsonl）")
+    parser.add_argument("-o", "--output", help="输出文件（.jsonl 或 .csv），缺省写到标准输出")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块查询条数")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="每条查询保留的推荐数")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录（.json / .toml / .csv）")
+    parser.add_argument("--forecast", default=FORECAST_PATH, help="拥挤度预测表（缺省时使用经验画像）")
+    parser.add_argument("--feedback-db", default=FEEDBACK_DB_PATH, help="反馈库，存在时计入推荐分调整量")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"找不到查询文件: {args.input}")
+    total, failed = run(args.input, args.output, args.chunk_size, args.top_k, catalog_path=args.catalog,
+                        forecast_path=args.forecast, feedback_path=args.feedback_db)
+    print(f"已处理 {total} 条查询" + (f"，其中 {failed} 条有误（见输出中的 error）" if failed else ""),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# run_benchmarks.py - 推荐评分与页面渲染的基准测试
+#
+# 用法：
+#   python benchmarks/run_benchmarks.py                      # 全部用例，结果追加到 benchmarks/history.jsonl
+#   python benchmarks/run_benchmarks.py --quick --skip-page  # 只跑小规模的纯计算用例
+#   python benchmarks/run_benchmarks.py --fail-on-regression # 比上次记录慢超过阈值时返回非零
+#
+# 用例：
+#   recommend  单个查询的完整计算（画像 + 评分 + 结果表），食堂数从 8 到 10000
+#   score / frame  上述流程中评分与构建结果表两部分各自的耗时
+#   plan       全天 1440 分钟 × 全部食堂的规划扫描
+#   menu_build / search  菜品倒排索引的构建，以及 "关键词 + 预算 + 供应时段" 搜索到食堂掩码（每个食堂 20 道菜）
+#   day_tables 当天 拥挤度 / 排队 / 营业 数据表的构建（共享状态每次数据更新时的开销）
+#   live_ingest 实时进出事件按批解析、计入环形窗口并发布快照（20 万条，每批 2000 条）
+#   batch      N 个画像 × M 个食堂的批量评分
+#   simulate   高峰期仿真（10000 名学生，forecast 策略），逐分钟批量评分作为压测负载
+#   page       通过 Streamlit AppTest 无界面完整运行 app.py（冷启动、命中缓存、未命中缓存）
+# 每个用例记录中位数、p95 与最小耗时（毫秒），每行一条 JSON，附带提交号与运行环境。
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, time as clock_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from catalog import load_catalog
+from forecast import CrowdForecaster
+from live_occupancy import REPLAY_BATCH, LiveOccupancy
+from menu import load_menu
+from planner import plan_day
+from results import result_frame
+from scoring import CANTEEN_TYPES, DINING_PURPOSES, USER_TYPES, build_profiles, score_profiles, single_profile
+from shared_state import build_day_tables
+from simulator import generate_students, simulate
+from synthetic import synthetic_catalog, synthetic_events, write_catalog, write_menu
+
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "history.jsonl")
+APP_PATH = os.path.join(ROOT, "app.py")
+CANTEEN_SIZES = [8, 100, 1000, 10000]
+QUICK_SIZES = [8, 100]
+BATCH_SIZES = [(100, 8), (10000, 8), (100, 1000), (10000, 1000)]
+PAGE_SIZES = [8, 1000]
+SIMULATE_MAX_CANTEENS = 1000
+DEFAULT_THRESHOLD = 0.25
+TIME_BUDGET_SECONDS = 1.0
+MIN_RUNS, MAX_RUNS = 3, 50
+QUERY_MINUTE = 12 * 60
+QUERY_WEEKDAY = 2
+
+
+# ============ 计时 ============
+def measure(fn, budget=TIME_BUDGET_SECONDS, min_runs=MIN_RUNS, max_runs=MAX_RUNS, warmup=True):
+    """预热一次后反复执行，直到用完时间预算（至少 min_runs 次），返回每次耗时（毫秒）"""
+    if warmup:
+        fn()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < min_runs or (len(samples) < max_runs and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(case, params, samples):
+    ordered = sorted(samples)
+    return {
+        "case": case,
+        "params": params,
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "min_ms": round(ordered[0], 3),
+    }
+
+
+# ============ 计算用例 ============
+def bench_recommend(sizes, workdir):
+    """单查询完整计算，评分、结果表、当天数据表各自的耗时，以及全天规划扫描"""
+    records = []
+    for m in sizes:
+        catalog = load_catalog(write_catalog(os.path.join(workdir, f"catalog_{m}.json"), m))
+        canteens, walking = catalog.arrays, catalog.walking
+        forecaster = CrowdForecaster.for_canteens(canteens)
+
+        tables = []
+        samples = measure(lambda: tables.append(build_day_tables(canteens, forecaster, QUERY_WEEKDAY)),
+                          budget=0, min_runs=1, warmup=False)
+        records.append(summarize("day_tables", {"canteens": m}, samples))
+        crowd, queue, _ = tables[-1]
+        origin = [walking.building_names[0]]
+        rng = np.random.default_rng(0)
+
+        def score():
+            profile = single_profile("本科生", "日常快速就餐", QUERY_MINUTE, (8, 25), 15, CANTEEN_TYPES,
+                                     QUERY_WEEKDAY)
+            return score_profiles(canteens, profile, rng=rng, crowd=crowd[:, profile.minute].T,
+                                  wait=queue.wait[:, profile.minute].T, walk=walking.minutes_for(origin))
+
+        result = score()
+        occupancy = queue.seat_occupancy[:, QUERY_MINUTE]
+
+        def frame():
+            return result_frame(canteens, result, occupancy)
+
+        records.append(summarize("score", {"canteens": m}, measure(score)))
+        records.append(summarize("frame", {"canteens": m, "rows": int(result.eligible[0].sum())}, measure(frame)))
+        records.append(summarize("recommend", {"canteens": m}, measure(
+            lambda: result_frame(canteens, score(), occupancy)
+        )))
+        records.append(summarize("plan", {"canteens": m, "slots": 1440}, measure(
+            lambda: plan_day(canteens, "本科生", "日常快速就餐", (8, 25), 15, CANTEEN_TYPES, QUERY_WEEKDAY,
+                             crowd, queue.wait, walk=walking.minutes_for(origin))
+        )))
+    return records
+
+
+def bench_search(sizes, workdir):
+    """菜品索引构建与搜索：二字词、三字词（需逐条核对）、两个词求交"""
+    records = []
+    for m in sizes:
+        catalog = load_catalog(write_catalog(os.path.join(workdir, f"catalog_{m}.json"), m))
+        path = write_menu(os.path.join(workdir, f"menu_{m}.json"), m)
+        menus = []
+        samples = measure(lambda: menus.append(load_menu(catalog.db, path)), budget=0, min_runs=1, warmup=False)
+        menu = menus[-1]
+        records.append(summarize("menu_build", {"canteens": m, "dishes": len(menu)}, samples))
+        for query in ("米线", "煲仔饭", "牛肉 米线"):
+            records.append(summarize("search", {"canteens": m, "dishes": len(menu), "query": query}, measure(
+                lambda: menu.search(query, (8, 25)).canteen_mask([QUERY_MINUTE], QUERY_WEEKDAY)
+            )))
+    return records
+
+
+def bench_live(sizes, n_events=200_000):
+    """实时事件处理：每次从空窗口开始，按回放批大小逐批计入全部事件"""
+    records = []
+    for m in sizes:
+        catalog = synthetic_catalog(m)
+        names = [canteen["name"] for canteen in catalog["canteens"]]
+        seats = [canteen["seats"] for canteen in catalog["canteens"]]
+        lines = synthetic_events(catalog, n_events)
+        batches = [lines[i:i + REPLAY_BATCH] for i in range(0, n_events, REPLAY_BATCH)]
+
+        def run():
+            tracker = LiveOccupancy(names, seats)
+            for batch in batches:
+                tracker.ingest(batch)
+
+        samples = measure(run, min_runs=1, max_runs=5)
+        records.append(summarize("live_ingest", {"canteens": m, "events": n_events}, samples))
+    return records
+
+
+def bench_batch(shapes, workdir):
+    """N 个随机画像 × M 个食堂的批量评分"""
+    records = []
+    for n, m in shapes:
+        canteens = load_catalog(write_catalog(os.path.join(workdir, f"catalog_{m}.json"), m)).arrays
+        rng = np.random.default_rng(0)
+        low = rng.integers(5, 30, n)
+        profiles = build_profiles(
+            rng.choice(USER_TYPES, n), rng.choice(DINING_PURPOSES, n), rng.integers(6 * 60, 22 * 60, n),
+            np.column_stack([low, low + rng.integers(5, 20, n)]), rng.integers(5, 45, n),
+            [CANTEEN_TYPES] * n, rng.integers(0, 7, n),
+        )
+        samples = measure(lambda: score_profiles(canteens, profiles, rng=rng))
+        records.append(summarize("batch", {"profiles": n, "canteens": m}, samples))
+    return records
+
+
+def bench_simulate(sizes, workdir, n_students=10000):
+    """午餐高峰仿真：每分钟到达的学生一起评分，事件堆推进排队与座位"""
+    records = []
+    for m in sizes:
+        catalog = load_catalog(write_catalog(os.path.join(workdir, f"catalog_{m}.json"), m))
+        canteens, walking = catalog.arrays, catalog.walking
+        students = generate_students(n_students, walking, weekday=QUERY_WEEKDAY)
+        day_tables = build_day_tables(canteens, CrowdForecaster.for_canteens(canteens), QUERY_WEEKDAY)
+        samples = measure(lambda: simulate(canteens, walking, students, "forecast", day_tables),
+                          min_runs=1, max_runs=3, warmup=False)
+        records.append(summarize("simulate", {"canteens": m, "students": n_students}, samples))
+    return records
+
+
+# ============ 页面用例 ============
+def page_child(m, runs):
+    """子进程内执行：用合成目录与临时数据目录运行 app.py，打印一行 JSON 结果"""
+    from streamlit.testing.v1 import AppTest
+
+    workdir = tempfile.mkdtemp(prefix="canteen-bench-")
+    os.environ["CANTEEN_CATALOG_PATH"] = write_catalog(os.path.join(workdir, "canteens.json"), m)
+    os.environ["CANTEEN_FORECAST_PATH"] = os.path.join(workdir, "crowd_forecast.npz")
+    os.environ["CANTEEN_COUNTS_DIR"] = os.path.join(workdir, "swipe_counts")
+    os.environ["CANTEEN_FEEDBACK_DB"] = os.path.join(workdir, "feedback.db")
+    os.chdir(workdir)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    cold = [(time.perf_counter() - start) * 1000]
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    cached, uncached = [], []
+    for i in range(runs):
+        start = time.perf_counter()
+        at.run()
+        cached.append((time.perf_counter() - start) * 1000)
+
+        # 每次换到一个新的 5 分钟时间桶，结果缓存必然未命中
+        minute = 7 * 60 + 5 * i
+        at.sidebar.time_input[0].set_value(clock_time(minute // 60, minute % 60))
+        start = time.perf_counter()
+        at.run()
+        uncached.append((time.perf_counter() - start) * 1000)
+    print(json.dumps([
+        summarize("page", {"canteens": m, "phase": "cold"}, cold),
+        summarize("page", {"canteens": m, "phase": "rerun_cached"}, cached),
+        summarize("page", {"canteens": m, "phase": "rerun_uncached"}, uncached),
+    ]))
+
+
+def bench_page(sizes, runs):
+    """每个规模在独立子进程中运行，避免 st.cache_resource 跨规模复用"""
+    records = []
+    for m in sizes:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--page-child", str(m), "--page-runs", str(runs)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        records.extend(json.loads(output.strip().splitlines()[-1]))
+    return records
+
+
+# ============ 历史记录 ============
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _case_key(record):
+    return record["case"], json.dumps(record["params"], sort_keys=True)
+
+
+def compare(records, history, threshold, env=None):
+    """与历史中同一机器、同一用例的最近一次记录比较，返回中位数变慢超过阈值的 [(记录, 上次中位数)]"""
+    if env is not None:
+        history = [r for r in history if (r.get("machine"), r.get("cpu_count")) == (env["machine"], env["cpu_count"])]
+    previous = {_case_key(r): r for r in history}
+    regressions = []
+    for record in records:
+        last = previous.get(_case_key(record))
+        if last and record["median_ms"] > last["median_ms"] * (1 + threshold):
+            regressions.append((record, last["median_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="推荐评分与页面渲染的基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"食堂数规模，缺省 {CANTEEN_SIZES}")
+    parser.add_argument("--quick", action="store_true", help=f"只跑小规模 {QUICK_SIZES}")
+    parser.add_argument("--skip-batch", action="store_true", help="跳过批量评分用例")
+    parser.add_argument("--skip-simulate", action="store_true", help="跳过高峰期仿真用例")
+    parser.add_argument("--skip-page", action="store_true", help="跳过 AppTest 页面用例")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=PAGE_SIZES, help="页面用例的食堂数规模")
+    parser.add_argument("--page-runs", type=int, default=5, help="页面用例的重复运行次数")
+    parser.add_argument("--history", default=HISTORY_PATH, help="历史记录文件（JSONL）")
+    parser.add_argument("--no-record", action="store_true", help="只打印，不追加到历史记录")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定变慢的相对阈值")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有用例变慢时以状态码 1 退出")
+    parser.add_argument("--page-child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.page_child is not None:
+        page_child(args.page_child, args.page_runs)
+        return 0
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else CANTEEN_SIZES)
+    records = []
+    with tempfile.TemporaryDirectory(prefix="canteen-bench-") as workdir:
+        records += bench_recommend(sizes, workdir)
+        records += bench_search(sizes, workdir)
+        records += bench_live(sizes)
+        if not args.skip_batch:
+            shapes = [(n, m) for n, m in BATCH_SIZES if m <= max(sizes)]
+            records += bench_batch(shapes, workdir)
+        if not args.skip_simulate:
+            records += bench_simulate([m for m in sizes if m <= SIMULATE_MAX_CANTEENS], workdir)
+    if not args.skip_page:
+        records += bench_page([m for m in args.page_sizes if not args.quick or m <= max(sizes)], args.page_runs)
+
+    env = environment()
+    regressions = compare(records, load_history(args.history), args.threshold, env)
+    slower = {id(r) for r, _ in regressions}
+    for record in records:
+        flag = "  <-- 变慢" if id(record) in slower else ""
+        params = ", ".join(f"{k}={v}" for k, v in record["params"].items())
+        print(f"{record['case']:<10} {params:<40} 中位数 {record['median_ms']:>10.2f} ms  "
+              f"p95 {record['p95_ms']:>10.2f} ms  ({record['runs']} 次){flag}")
+    for record, last in regressions:
+        print(f"变慢：{record['case']} {record['params']} {last:.2f} -> {record['median_ms']:.2f} ms", file=sys.stderr)
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps({**env, **record}, ensure_ascii=False) + "\n")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# synthetic.py - 基准测试用的合成食堂目录
+#
+# 按给定规模生成与 data/canteens.json 同格式的目录：类型、价格、营业时间、
+# 座位与窗口数随机但由种子决定，坐标均匀分布在若干个校区内。
+# 菜品目录与 data/dishes.json 同格式，菜名由 食材 × 做法 组合而成，价格落在所属食堂的价格区间内。
+# 实时进出事件为 live_occupancy 的行格式，集中在午餐时段，约一半食堂装有报告离场的闸机。
+import json
+
+import numpy as np
+
+from scoring import CANTEEN_TYPES
+
+NAME_SUFFIXES = ["大众餐厅", "风味餐厅", "清真食堂", "快餐中心", "自助餐厅", "教工餐厅", "美食广场", "夜宵中心"]
+OPENING_HOURS = ["6:30-20:30", "10:00-21:30", "7:00-20:00", "6:30-21:00", "11:00-20:30",
+                 "11:00-13:30, 17:00-19:00", "10:00-22:00", "16:00-23:00"]
+DISH_INGREDIENTS = ["牛肉", "羊肉", "鸡肉", "猪肉", "鱼", "豆腐", "鸡蛋", "土豆", "番茄", "香菇"]
+DISH_STYLES = ["米线", "拉面", "盖饭", "炒饭", "米粉", "饺子", "套餐", "火锅", "馄饨", "煲仔饭"]
+DISH_HOURS = ["6:30-9:30", "10:30-13:30", "16:30-19:30"]
+DISHES_PER_CANTEEN = 20
+EVENT_START = "2026-03-04 11:00"
+EVENT_MINUTES = 120
+CAMPUS_SIZE_METERS = 1500.0
+CANTEENS_PER_CAMPUS = 50
+
+
+def synthetic_catalog(n_canteens, seed=0, n_buildings=None):
+    """生成含 n_canteens 个食堂的目录字典 {"canteens": [...], "buildings": [...]}"""
+    rng = np.random.default_rng(seed)
+    n_campuses = max(1, -(-n_canteens // CANTEENS_PER_CAMPUS))
+    campus_origin = np.column_stack([np.arange(n_campuses) * CAMPUS_SIZE_METERS * 3, np.zeros(n_campuses)])
+
+    def points(n):
+        campus = rng.integers(0, n_campuses, n)
+        return campus, campus_origin[campus] + rng.uniform(0, CAMPUS_SIZE_METERS, (n, 2))
+
+    kind = rng.integers(0, len(CANTEEN_TYPES), n_canteens)
+    low = rng.integers(6, 20, n_canteens)
+    high = low + rng.integers(4, 20, n_canteens)
+    seats = rng.integers(100, 800, n_canteens)
+    campus, xy = points(n_canteens)
+    canteens = [{
+        "name": f"{campus[j] + 1}校区{j + 1}号（{NAME_SUFFIXES[kind[j]]}）",
+        "type": CANTEEN_TYPES[kind[j]],
+        "price_range": [int(low[j]), int(high[j])],
+        "base_score": round(float(rng.uniform(7.0, 9.5)), 1),
+        "location": f"{campus[j] + 1}校区",
+        "coords": [round(float(xy[j, 0]), 1), round(float(xy[j, 1]), 1)],
+        "specialty": "",
+        "popular_dishes": ["套餐A", "套餐B", "套餐C"],
+        "opening_hours": OPENING_HOURS[kind[j]],
+        "seats": int(seats[j]),
+        "windows": int(max(2, seats[j] // 40)),
+        "service_minutes": round(float(rng.uniform(0.4, 1.0)), 2),
+    } for j in range(n_canteens)]
+
+    n_buildings = n_buildings or max(10, n_canteens // 2)
+    campus, xy = points(n_buildings)
+    buildings = [{"name": f"{campus[i] + 1}校区{i + 1}号楼", "coords": [round(float(xy[i, 0]), 1),
+                                                                  round(float(xy[i, 1]), 1)]}
+                 for i in range(n_buildings)]
+    return {"canteens": canteens, "buildings": buildings}
+
+
+def write_catalog(path, n_canteens, seed=0):
+    """把合成目录写成 JSON 文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_catalog(n_canteens, seed), f, ensure_ascii=False)
+    return path
+
+
+def synthetic_menu(catalog, dishes_per_canteen=DISHES_PER_CANTEEN, seed=0):
+    """为 synthetic_catalog 生成的目录配一份菜品目录 {"dishes": [...]}，约三分之一的菜只在某个餐段供应"""
+    rng = np.random.default_rng(seed)
+    dishes = []
+    for canteen in catalog["canteens"]:
+        low, high = canteen["price_range"]
+        ingredient = rng.integers(0, len(DISH_INGREDIENTS), dishes_per_canteen)
+        style = rng.integers(0, len(DISH_STYLES), dishes_per_canteen)
+        price = rng.integers(low, high + 1, dishes_per_canteen)
+        period = rng.integers(-2 * len(DISH_HOURS), len(DISH_HOURS), dishes_per_canteen)
+        for k in range(dishes_per_canteen):
+            dish = {
+                "canteen": canteen["name"],
+                "name": DISH_INGREDIENTS[ingredient[k]] + DISH_STYLES[style[k]],
+                "price": int(price[k]),
+                "tags": [DISH_INGREDIENTS[ingredient[k]], DISH_STYLES[style[k]]],
+            }
+            if period[k] >= 0:
+                dish["hours"] = DISH_HOURS[period[k]]
+            dishes.append(dish)
+    return {"dishes": dishes}
+
+
+def write_menu(path, n_canteens, seed=0, dishes_per_canteen=DISHES_PER_CANTEEN):
+    """把与 write_catalog(n_canteens, seed) 对应的合成菜品目录写成 JSON 文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_menu(synthetic_catalog(n_canteens, seed), dishes_per_canteen, seed), f, ensure_ascii=False)
+    return path
+
+
+def synthetic_events(catalog, n_events, seed=0):
+    """午餐两小时内的 n_events 条进出事件行（按时间排序）；偶数号食堂有离场事件"""
+    rng = np.random.default_rng(seed)
+    names = [canteen["name"] for canteen in catalog["canteens"]]
+    seconds = np.sort(rng.integers(0, EVENT_MINUTES * 60, n_events))
+    stamps = (np.datetime64(EVENT_START) + seconds.astype("timedelta64[s]")).astype(str)
+    canteen = rng.integers(0, len(names), n_events)
+    leaving = (canteen % 2 == 0) & (rng.random(n_events) < 0.45)
+    return [f"{names[c]},{stamp.replace('T', ' ')},{'out' if out else 'in'}"
+            for c, stamp, out in zip(canteen.tolist(), stamps.tolist(), leaving.tolist())]
@@ -0,0 +1,236 @@
+# catalog.py - 外部食堂目录：加载、校验、列式转换与热更新
+#
+# 食堂目录放在外部文件（JSON / TOML / CSV）中，每个进程加载一次：
+# 先按字段规则逐条校验，再转换为评分引擎直接使用的列式 CanteenArrays，
+# 并由食堂与楼宇坐标预计算步行时间索引（见 walking.py）。
+# CatalogStore 发现文件修改时间变化时重新加载，校验通过后整体替换引用；
+# 新文件有误时保留旧目录并记录日志，不影响正在服务的会话。
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import tomllib
+from dataclasses import dataclass
+
+from opening_hours import parse_schedule
+from scoring import CANTEEN_TYPES, MAX_SCORE, CanteenArrays
+from walking import WalkingIndex
+
+CATALOG_PATH = os.environ.get(
+    "CANTEEN_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "canteens.json")
+)
+DEFAULT_CHECK_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogError(ValueError):
+    """食堂目录格式或取值有误"""
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """一份已校验的食堂目录"""
+    db: dict                   # 名称 -> 食堂信息（展示用字段）
+    arrays: CanteenArrays      # 评分用的列式表示
+    walking: WalkingIndex      # 楼宇 × 食堂步行时间
+    path: str
+    mtime: float
+    version: int
+
+    def __len__(self):
+        return len(self.arrays)
+
+
+# ============ 读取 ============
+def _read_records(path):
+    """读取 (食堂记录列表, 楼宇记录列表)；CSV 只含食堂"""
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            return [_csv_record(row) for row in csv.DictReader(f)], []
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    if isinstance(data, list):
+        return data, []
+    return data.get("canteens", []), data.get("buildings", [])
+
+
+def _csv_record(row):
+    """CSV 行 -> 记录：price_min/price_max、x/y 各两列，popular_dishes 以 | 分隔"""
+    record = {k: v for k, v in row.items() if v not in (None, "")}
+    try:
+        if "price_min" in record or "price_max" in record:
+            record["price_range"] = [float(record.pop("price_min")), float(record.pop("price_max"))]
+        if "x" in record or "y" in record:
+            record["coords"] = [float(record.pop("x")), float(record.pop("y"))]
+        for field in ("base_score", "service_minutes"):
+            if field in record:
+                record[field] = float(record[field])
+        for field in ("seats", "windows"):
+            if field in record:
+                record[field] = int(record[field])
+    except (KeyError, ValueError) as exc:
+        raise CatalogError(f"{record.get('name', '?')}: CSV 字段无法转换为数值 ({exc})") from None
+    if "popular_dishes" in record:
+        record["popular_dishes"] = [d.strip() for d in record["popular_dishes"].split("|") if d.strip()]
+    return record
+
+
+# ============ 校验 ============
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_point(value):
+    return isinstance(value, (list, tuple)) and len(value) == 2 and all(_is_number(v) for v in value)
+
+
+def _check_record(record):
+    """返回一条记录的问题列表"""
+    problems = []
+    if not isinstance(record.get("name"), str) or not record["name"].strip():
+        return ["缺少 name"]
+    if record.get("type") not in CANTEEN_TYPES:
+        problems.append(f"type 必须是 {CANTEEN_TYPES} 之一")
+
+    price = record.get("price_range")
+    if not (isinstance(price, (list, tuple)) and len(price) == 2 and all(_is_number(p) for p in price)
+            and 0 <= price[0] <= price[1]):
+        problems.append("price_range 必须是 [最低价, 最高价] 且 0 <= 最低价 <= 最高价")
+
+    score = record.get("base_score")
+    if not (_is_number(score) and 0 <= score <= MAX_SCORE):
+        problems.append(f"base_score 必须在 0-{MAX_SCORE:g} 之间")
+    if not (isinstance(record.get("seats"), int) and record["seats"] > 0):
+        problems.append("seats 必须是正整数")
+    if "windows" in record and not (isinstance(record["windows"], int) and record["windows"] > 0):
+        problems.append("windows 必须是正整数")
+    if "service_minutes" in record and not (_is_number(record["service_minutes"]) and record["service_minutes"] > 0):
+        problems.append("service_minutes 必须大于 0")
+    if "coords" in record and not _is_point(record["coords"]):
+        problems.append("coords 必须是 [x, y]（米）")
+
+    try:
+        parse_schedule(record.get("opening_hours", ""))
+    except (ValueError, TypeError, AttributeError) as exc:
+        problems.append(f"opening_hours 无效：{exc}")
+
+    for field in ("location", "specialty"):
+        if not isinstance(record.get(field, ""), str):
+            problems.append(f"{field} 必须是字符串")
+    dishes = record.get("popular_dishes", [])
+    if not (isinstance(dishes, list) and all(isinstance(d, str) for d in dishes)):
+        problems.append("popular_dishes 必须是字符串列表")
+    return [f"{record['name']}: {p}" for p in problems]
+
+
+def _check_buildings(buildings):
+    problems = []
+    seen = set()
+    for i, building in enumerate(buildings):
+        name = building.get("name") if isinstance(building, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            problems.append(f"第 {i + 1} 个楼宇缺少 name")
+            continue
+        if not _is_point(building.get("coords")):
+            problems.append(f"楼宇 {name}: coords 必须是 [x, y]（米）")
+        if name in seen:
+            problems.append(f"楼宇 {name}: 名称重复")
+        seen.add(name)
+    return problems
+
+
+def validate(records, buildings=()):
+    """校验全部食堂与楼宇记录，有问题时抛出 CatalogError（列出所有问题）"""
+    problems = []
+    seen = set()
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            problems.append(f"第 {i + 1} 条不是对象")
+            continue
+        problems.extend(_check_record(record))
+        name = record.get("name")
+        if name in seen:
+            problems.append(f"{name}: 名称重复")
+        seen.add(name)
+    if not records:
+        problems.append("目录为空")
+    problems.extend(_check_buildings(buildings))
+    if problems:
+        raise CatalogError("食堂目录校验失败：\n" + "\n".join(problems))
+
+
+def read_records(path=CATALOG_PATH):
+    """读取目录文件，返回 (修改时间, 食堂记录列表, 楼宇记录列表)，不校验"""
+    try:
+        return (os.path.getmtime(path), *_read_records(path))
+    except (OSError, json.JSONDecodeError, tomllib.TOMLDecodeError, csv.Error, UnicodeDecodeError) as exc:
+        raise CatalogError(f"无法读取食堂目录 {path}: {exc}") from None
+
+
+def load_catalog(path=CATALOG_PATH, version=1):
+    """加载并校验目录文件"""
+    mtime, records, buildings = read_records(path)
+    return build_catalog(records, buildings, path, mtime, version)
+
+
+def build_catalog(records, buildings=(), path=None, mtime=None, version=1):
+    """校验记录并构建 Catalog（情景推演等不经过文件的场合直接使用）"""
+    validate(records, buildings)
+
+    db = {}
+    for record in records:
+        info = dict(record)
+        name = info.pop("name")
+        info.setdefault("location", "")
+        info.setdefault("specialty", "")
+        info.setdefault("popular_dishes", [])
+        info["price_range"] = list(info["price_range"])
+        db[name] = info
+    arrays = CanteenArrays.from_db(db)
+    walking = WalkingIndex([b["name"] for b in buildings], [b["coords"] for b in buildings], arrays.coords)
+    return Catalog(db=db, arrays=arrays, walking=walking, path=path, mtime=mtime, version=version)
+
+
+# ============ 热更新 ============
+class CatalogStore:
+    """持有当前目录；文件修改时间变化时重新加载并原子替换"""
+
+    def __init__(self, path=CATALOG_PATH, check_seconds=DEFAULT_CHECK_SECONDS, clock=time.monotonic):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.clock = clock
+        self.catalog = load_catalog(path)
+        self._next_check = clock() + check_seconds
+        self._lock = threading.Lock()
+
+    def get(self):
+        """返回当前目录，到检查间隔时顺便检查文件是否更新"""
+        if self.clock() >= self._next_check:
+            self.reload_if_changed()
+        return self.catalog
+
+    def reload_if_changed(self):
+        """文件有变化且校验通过时替换目录，返回是否替换"""
+        with self._lock:
+            self._next_check = self.clock() + self.check_seconds
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                logger.warning("食堂目录 %s 不可访问，继续使用旧目录", self.path)
+                return False
+            if mtime == self.catalog.mtime:
+                return False
+            try:
+                catalog = load_catalog(self.path, self.catalog.version + 1)
+            except CatalogError:
+                logger.exception("新的食堂目录无效，继续使用旧目录")
+                return False
+            self.catalog = catalog
+            return True
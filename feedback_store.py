@@ -0,0 +1,156 @@
+# feedback_store.py - 用户反馈持久化（SQLite WAL，后台批量提交）
+#
+# 页面提交反馈时只把记录放入内存队列，立即返回；
+# 后台写线程把队列中积攒的记录一次性 executemany 并提交（group commit），
+# 页面渲染线程不会等待磁盘。聚合任务定期把"食堂评分"汇总为各食堂的推荐分调整量；
+# 其余四项评分评价的是推荐系统本身，不计入食堂的推荐分。
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+FEEDBACK_DB_PATH = os.environ.get(
+    "CANTEEN_FEEDBACK_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "feedback.db")
+)
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_SECONDS = 1.0
+
+# 评分 -> 推荐分调整：以 3 分为中性，每高 1 分加 ADJUSTMENT_PER_POINT，
+# 按 n / (n + PRIOR_COUNT) 收缩，少量反馈不会大幅改变排名
+ADJUSTMENT_PER_POINT = 0.25
+MAX_ADJUSTMENT = 0.5
+NEUTRAL_RATING = 3.0
+PRIOR_COUNT = 20
+
+RATING_FIELDS = ["accuracy", "usability", "usefulness", "likelihood"]
+_COLUMNS = ["created_at", "session_id", "canteen", "canteen_rating", *RATING_FIELDS, "comment"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    session_id TEXT,
+    canteen TEXT,
+    canteen_rating INTEGER,
+    accuracy INTEGER NOT NULL,
+    usability INTEGER NOT NULL,
+    usefulness INTEGER NOT NULL,
+    likelihood INTEGER NOT NULL,
+    comment TEXT
+);
+CREATE INDEX IF NOT EXISTS feedback_canteen ON feedback (canteen);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class FeedbackStore:
+    """只追加的反馈库：submit() 非阻塞，后台线程批量写入"""
+
+    def __init__(self, path=FEEDBACK_DB_PATH, batch_size=DEFAULT_BATCH_SIZE, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _connect(path) as conn:
+            conn.executescript(_SCHEMA)
+            # 早期的库没有 canteen_rating 列，补上（旧记录为 NULL，不参与食堂汇总）
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(feedback)")}
+            if "canteen_rating" not in columns:
+                conn.execute("ALTER TABLE feedback ADD COLUMN canteen_rating INTEGER")
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, accuracy, usability, usefulness, likelihood, comment="", canteen=None, session_id=None,
+               canteen_rating=None):
+        """提交一条反馈（只入队，不等待写盘）；canteen_rating 为对 canteen 的 1-5 分评价"""
+        if self._closed.is_set():
+            raise RuntimeError("反馈库已关闭")
+        if canteen_rating is not None and canteen is None:
+            raise ValueError("食堂评分需要指定食堂")
+        self._queue.put((time.time(), session_id, canteen, None if canteen_rating is None else int(canteen_rating),
+                         int(accuracy), int(usability), int(usefulness), int(likelihood), comment or ""))
+
+    def flush(self):
+        """等待已提交的反馈全部写入"""
+        self._queue.join()
+
+    def close(self):
+        self._closed.set()
+        self._queue.put(None)
+        self._writer.join()
+
+    def _run(self):
+        conn = _connect(self.path)
+        sql = f"INSERT INTO feedback ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not None]
+            stopping = len(rows) < len(batch)
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany(sql, rows)
+            except sqlite3.Error:
+                logger.exception("反馈写入失败，丢弃 %d 条", len(rows))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    # ============ 聚合 ============
+    def rating_summary(self):
+        """各食堂 {名称: (评分条数, 平均食堂评分)}，只统计 canteen_rating"""
+        conn = _connect(self.path)
+        try:
+            rows = conn.execute(
+                "SELECT canteen, COUNT(*), AVG(canteen_rating) FROM feedback "
+                "WHERE canteen IS NOT NULL AND canteen_rating IS NOT NULL GROUP BY canteen"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {name: (count, mean) for name, count, mean in rows}
+
+    def accuracy_summary(self):
+        """全部反馈的 (条数, "预测准确度"平均分)，没有反馈时平均分为 None"""
+        conn = _connect(self.path)
+        try:
+            count, mean = conn.execute("SELECT COUNT(*), AVG(accuracy) FROM feedback").fetchone()
+        finally:
+            conn.close()
+        return count, mean
+
+    def score_adjustments(self, names):
+        """按食堂顺序返回推荐分调整量 (M,)"""
+        summary = self.rating_summary()
+        adjustment = np.zeros(len(names))
+        for j, name in enumerate(names):
+            if name in summary:
+                count, mean = summary[name]
+                shrink = count / (count + PRIOR_COUNT)
+                adjustment[j] = ADJUSTMENT_PER_POINT * (mean - NEUTRAL_RATING) * shrink
+        return np.clip(adjustment, -MAX_ADJUSTMENT, MAX_ADJUSTMENT)
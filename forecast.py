@@ -0,0 +1,207 @@
+# forecast.py - 食堂拥挤度时间序列预测
+#
+# 按 食堂 × 星期 × 时间槽 累积历史占用率（占座位数百分比），
+# 预先算出预测表，在线预测只是一次数组索引。
+# 每来一天的新数据调用 partial_fit 增量更新（可选指数衰减），无需全量重训。
+# 没有历史数据的时间槽退回到经验画像（高峰时间因子 × 食堂类型系数）。
+import argparse
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ingest import COUNTS_DIR, CountStore, iter_occupancy_days
+from opening_hours import DAYS_PER_WEEK, MINUTES_PER_DAY
+from scoring import BASE_CROWD, MAX_CROWD, MIN_CROWD, time_factor
+
+DEFAULT_SLOT_MINUTES = 5
+DEFAULT_PRIOR_WEIGHT = 1.0
+FORECAST_PATH = os.environ.get(
+    "CANTEEN_FORECAST_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "crowd_forecast.npz")
+)
+
+
+def prior_profile(canteens, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """经验拥挤度画像，形状 (M, 时间槽数)，单位为百分比"""
+    slot_start = np.arange(0, MINUTES_PER_DAY, slot_minutes)
+    crowd = BASE_CROWD * time_factor(slot_start)[None, :]
+    crowd = crowd * np.where(canteens.tags["教工"], 0.7, 1.0)[:, None]
+    crowd = crowd * np.where(canteens.tags["大众"], 1.3, 1.0)[:, None]
+    return np.clip(crowd, MIN_CROWD, MAX_CROWD)
+
+
+def check_slot_minutes(slot_minutes):
+    """时间槽长度须为正整数且整除一天的分钟数，否则抛出 ValueError"""
+    if int(slot_minutes) != slot_minutes or slot_minutes <= 0 or MINUTES_PER_DAY % slot_minutes:
+        raise ValueError(f"时间槽长度须为整除 {MINUTES_PER_DAY} 的正整数分钟: {slot_minutes}")
+    return int(slot_minutes)
+
+
+def _slot_minutes_arg(text):
+    try:
+        return check_slot_minutes(int(text))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+class CrowdForecaster:
+    """按分钟（时间槽）和星期的拥挤度预测表，支持增量拟合"""
+
+    def __init__(self, names, seats, prior, slot_minutes=DEFAULT_SLOT_MINUTES, decay=1.0,
+                 prior_weight=DEFAULT_PRIOR_WEIGHT):
+        slot_minutes = check_slot_minutes(slot_minutes)
+        self.names = list(names)
+        self.seats = np.asarray(seats, dtype=np.float64)
+        self.slot_minutes = slot_minutes
+        self.decay = decay
+        self.prior_weight = prior_weight
+        self.prior = np.asarray(prior, dtype=np.float64)
+        n_slots = MINUTES_PER_DAY // slot_minutes
+        self.sums = np.zeros((len(self.names), DAYS_PER_WEEK, n_slots))
+        self.weights = np.zeros_like(self.sums)
+        self.version = 0
+        self._table = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_canteens(cls, canteens, slot_minutes=DEFAULT_SLOT_MINUTES, **kwargs):
+        """以经验画像为先验，为一组食堂创建预测器"""
+        return cls(canteens.names, canteens.seats, prior_profile(canteens, slot_minutes), slot_minutes, **kwargs)
+
+    # ============ 拟合 ============
+    def partial_fit(self, occupancy, weekday):
+        """加入一天的观测：occupancy 为 (M, 1440) 的在场人数，NaN 表示缺测"""
+        occupancy = np.asarray(occupancy, dtype=np.float64)
+        pct = 100.0 * occupancy / self.seats[:, None]
+        pct = pct.reshape(len(self.names), -1, self.slot_minutes)
+        observed = ~np.isnan(pct)
+        slot_sum = np.where(observed, pct, 0.0).sum(axis=2)
+        slot_count = observed.sum(axis=2)
+        slot_mean = np.divide(slot_sum, slot_count, out=np.zeros_like(slot_sum), where=slot_count > 0)
+        has_data = slot_count > 0
+
+        with self._lock:
+            sums = self.sums[:, weekday]
+            weights = self.weights[:, weekday]
+            sums[has_data] = sums[has_data] * self.decay + slot_mean[has_data]
+            weights[has_data] = weights[has_data] * self.decay + 1.0
+            self.version += 1
+            self._table = None
+
+    def fit(self, days):
+        """从头拟合：days 为 [(星期, (M, 1440) 在场人数)] 序列"""
+        with self._lock:
+            self.sums[:] = 0.0
+            self.weights[:] = 0.0
+        for weekday, occupancy in days:
+            self.partial_fit(occupancy, weekday)
+        return self
+
+    def fit_frame(self, frame):
+        """从长表拟合：列为 canteen, time, occupancy，按自然日分组"""
+        frame = frame.assign(time=pd.to_datetime(frame["time"]))
+        index = {name: i for i, name in enumerate(self.names)}
+        frame = frame[frame["canteen"].isin(index)]
+        for day, group in frame.groupby(frame["time"].dt.normalize()):
+            occupancy = np.full((len(self.names), MINUTES_PER_DAY), np.nan)
+            rows = group["canteen"].map(index).to_numpy()
+            minutes = (group["time"].dt.hour * 60 + group["time"].dt.minute).to_numpy()
+            occupancy[rows, minutes] = group["occupancy"].to_numpy(dtype=np.float64)
+            self.partial_fit(occupancy, day.weekday())
+        return self
+
+    # ============ 预测 ============
+    @property
+    def table(self):
+        """预测表 (M, 7, 时间槽数)，单位为百分比；拟合后首次访问时重算"""
+        table = self._table
+        if table is None:
+            with self._lock:
+                blended = (self.sums + self.prior[:, None, :] * self.prior_weight) / (self.weights + self.prior_weight)
+                table = np.clip(blended, 0.0, 100.0).astype(np.float32)
+                table.setflags(write=False)
+                self._table = table
+        return table
+
+    def predict(self, minutes, weekdays=0):
+        """N 个 (星期, 分钟) 查询 -> (N, M) 预测拥挤度"""
+        minutes = np.asarray(minutes, dtype=np.intp) % MINUTES_PER_DAY
+        weekdays = np.broadcast_to(np.asarray(weekdays, dtype=np.intp), minutes.shape)
+        return self.table[:, weekdays, minutes // self.slot_minutes].T
+
+    def day_profile(self, weekday=0):
+        """某天每分钟的预测拥挤度，形状 (M, 1440)"""
+        return np.repeat(self.table[:, weekday], self.slot_minutes, axis=1)
+
+    # ============ 持久化 ============
+    def save(self, path):
+        with self._lock:
+            np.savez_compressed(
+                path, names=np.array(self.names), seats=self.seats, prior=self.prior,
+                sums=self.sums, weights=self.weights,
+                params=np.array([self.slot_minutes, self.decay, self.prior_weight]),
+            )
+
+    @classmethod
+    def load(cls, path, canteens=None):
+        """读取预测器；给定 canteens 时按名称对齐，未出现的食堂只用经验画像"""
+        with np.load(path) as data:
+            slot_minutes, decay, prior_weight = data["params"]
+            saved = cls(data["names"].tolist(), data["seats"], data["prior"], int(slot_minutes), float(decay),
+                        float(prior_weight))
+            saved.sums[:] = data["sums"]
+            saved.weights[:] = data["weights"]
+        if canteens is None:
+            return saved
+
+        aligned = cls.for_canteens(canteens, saved.slot_minutes, decay=saved.decay, prior_weight=saved.prior_weight)
+        position = {name: i for i, name in enumerate(saved.names)}
+        for j, name in enumerate(aligned.names):
+            if name in position:
+                aligned.sums[j] = saved.sums[position[name]]
+                aligned.weights[j] = saved.weights[position[name]]
+        return aligned
+
+
+def load_or_prior(canteens, path=FORECAST_PATH, counts_dir=COUNTS_DIR):
+    """依次尝试预测文件、刷卡计数目录，都没有时返回只含经验画像的预测器"""
+    if os.path.exists(path):
+        return CrowdForecaster.load(path, canteens)
+    forecaster = CrowdForecaster.for_canteens(canteens)
+    if os.path.isdir(counts_dir):
+        forecaster.fit(iter_occupancy_days(CountStore.open(counts_dir), forecaster.names))
+    return forecaster
+
+
+def main(argv=None):
+    from catalog import CATALOG_PATH, load_catalog
+
+    parser = argparse.ArgumentParser(description="由历史占用数据拟合拥挤度预测表")
+    parser.add_argument("history", nargs="?", help="历史数据 CSV，列为 canteen, time, occupancy")
+    parser.add_argument("--counts", help="改用 ingest.py 生成的刷卡计数目录拟合")
+    parser.add_argument("-o", "--output", default=FORECAST_PATH, help="预测表输出路径（.npz）")
+    parser.add_argument("--slot-minutes", type=_slot_minutes_arg, default=DEFAULT_SLOT_MINUTES,
+                        help="时间槽长度（分钟，须整除 1440）")
+    parser.add_argument("--update", action="store_true", help="在已有预测表上增量更新")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录（.json / .toml / .csv）")
+    args = parser.parse_args(argv)
+
+    canteens = load_catalog(args.catalog).arrays
+    if args.update and os.path.exists(args.output):
+        forecaster = CrowdForecaster.load(args.output, canteens)
+    else:
+        forecaster = CrowdForecaster.for_canteens(canteens, args.slot_minutes)
+    if args.counts:
+        for weekday, occupancy in iter_occupancy_days(CountStore.open(args.counts), forecaster.names):
+            forecaster.partial_fit(occupancy, weekday)
+    elif args.history:
+        forecaster.fit_frame(pd.read_csv(args.history))
+    else:
+        parser.error("需要指定历史数据 CSV 或 --counts")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    forecaster.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
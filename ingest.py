@@ -0,0 +1,217 @@
+# ingest.py - 校园卡刷卡流水流式导入，聚合为 食堂 × 分钟 计数
+#
+# 流水按块读取（CSV 分块，或可选的 Parquet/Arrow 按批读取），
+# 每块按自然日分组后用 bincount 累加到按天存放的计数文件中：
+#   <目录>/index.json          食堂名称顺序与已导入文件的内容摘要
+#   <目录>/YYYY-MM-DD.npy      (M, 1440) uint32，可直接内存映射
+# 内存占用只与块大小有关，与流水总行数无关。
+# 每个文件先导入到暂存目录，整份读完后才并入计数并记下摘要；内容相同的文件再次导入时跳过，不会重复计数。
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from opening_hours import MINUTES_PER_DAY
+
+COUNTS_DIR = os.environ.get(
+    "CANTEEN_COUNTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "swipe_counts")
+)
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_DWELL_MINUTES = 25
+INDEX_FILE = "index.json"
+STAGING_DIR = ".staging"
+
+
+def file_digest(path, block_size=1 << 20):
+    """文件内容的 blake2b 摘要，用于识别已导入过的流水（改名或复制后仍能识别）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CountStore:
+    """按天存放的 (M, 1440) 刷卡计数，文件为可内存映射的 .npy；files 为已导入文件的 摘要 -> 信息"""
+
+    def __init__(self, directory, names, files=None):
+        self.directory = directory
+        self.names = list(names)
+        self.files = dict(files or {})
+        self._position = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def create(cls, directory, names):
+        """新建或打开计数目录；已有目录的食堂顺序必须一致"""
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            store = cls.open(directory)
+            if store.names != list(names):
+                raise ValueError(f"{directory} 中的食堂列表与当前数据不一致")
+            return store
+        store = cls(directory, names)
+        store._write_index()
+        return store
+
+    @classmethod
+    def open(cls, directory):
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        return cls(directory, index["names"], index.get("files"))
+
+    def _write_index(self):
+        """先写临时文件再替换，中断时不会留下写了一半的索引"""
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"names": self.names, "minutes": MINUTES_PER_DAY, "files": self.files}, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def record_file(self, digest, path, rows):
+        """记下已并入计数的文件"""
+        self.files[digest] = {"path": os.path.abspath(path), "rows": rows}
+        self._write_index()
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{pd.Timestamp(day):%Y-%m-%d}.npy")
+
+    def days(self):
+        """已有数据的日期（升序）"""
+        names = sorted(f for f in os.listdir(self.directory) if f.endswith(".npy"))
+        return [pd.Timestamp(f[:-4]) for f in names]
+
+    def load_day(self, day):
+        """只读内存映射某天的计数"""
+        return np.load(self._path(day), mmap_mode="r")
+
+    def add(self, day, counts):
+        """把 (M, 1440) 计数累加到某天的文件"""
+        path = self._path(day)
+        if os.path.exists(path):
+            mm = np.load(path, mmap_mode="r+")
+        else:
+            mm = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint32, shape=(len(self.names), MINUTES_PER_DAY))
+        mm += counts.astype(np.uint32)
+        mm.flush()
+        del mm
+
+    def merge(self, other):
+        """把另一个（食堂顺序相同的）计数目录的各天计数累加进来"""
+        for day in other.days():
+            self.add(day, other.load_day(day))
+
+    def ingest_frame(self, frame, canteen_col="canteen", time_col="time"):
+        """导入一块流水，返回 (已计入行数, 跳过行数)"""
+        rows = frame[canteen_col].map(self._position)
+        # 按 ISO 8601 逐行解析：带秒与不带秒的时间混在一块里时，不会因按首行推断格式而被当作无法解析
+        times = pd.to_datetime(frame[time_col], errors="coerce", format="ISO8601")
+        valid = rows.notna() & times.notna()
+        rows, times = rows[valid].astype(np.int64), times[valid]
+
+        flat = rows.to_numpy() * MINUTES_PER_DAY + (times.dt.hour * 60 + times.dt.minute).to_numpy()
+        codes, days = pd.factorize(times.dt.normalize())
+        for k, day in enumerate(days):
+            counts = np.bincount(flat[codes == k], minlength=len(self.names) * MINUTES_PER_DAY)
+            self.add(day, counts.reshape(len(self.names), MINUTES_PER_DAY))
+        return int(valid.sum()), int((~valid).sum())
+
+
+# ============ 读取流水 ============
+def iter_log_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=("canteen", "time")):
+    """按块读取流水；.parquet/.arrow 走列式按批读取（需要 pyarrow）"""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("读取 Parquet 需要安装 pyarrow") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=list(columns)):
+            yield batch.to_pandas()
+    elif path.endswith((".arrow", ".feather", ".ipc")):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("读取 Arrow 需要安装 pyarrow") from None
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(list(columns)).to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=list(columns), chunksize=chunk_size, dtype={columns[0]: str})
+
+
+def ingest(paths, directory=COUNTS_DIR, names=None, chunk_size=DEFAULT_CHUNK_SIZE, canteen_col="canteen",
+           time_col="time"):
+    """导入若干流水文件，返回 (已计入行数, 跳过行数, 之前已导入而跳过的文件)"""
+    if names is None:
+        from catalog import load_catalog
+        names = list(load_catalog().arrays.names)
+    store = CountStore.create(directory, names)
+    staging_dir = os.path.join(directory, STAGING_DIR)
+    counted = skipped = 0
+    repeated = []
+    for path in paths:
+        digest = file_digest(path)
+        if digest in store.files:
+            repeated.append(path)
+            continue
+        # 整份文件读完才并入，读取中途出错时计数不受影响，可以直接重新导入
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging = CountStore.create(staging_dir, names)
+        file_counted = 0
+        for chunk in iter_log_chunks(path, chunk_size, (canteen_col, time_col)):
+            c, s = staging.ingest_frame(chunk, canteen_col, time_col)
+            file_counted += c
+            skipped += s
+        store.merge(staging)
+        store.record_file(digest, path, file_counted)
+        shutil.rmtree(staging_dir)
+        counted += file_counted
+    return counted, skipped, repeated
+
+
+# ============ 派生量 ============
+def arrivals_to_occupancy(arrivals, dwell_minutes=DEFAULT_DWELL_MINUTES):
+    """每分钟到达人数 -> 在场人数（最近 dwell_minutes 分钟到达人数之和）"""
+    arrivals = np.asarray(arrivals, dtype=np.float64)
+    cumulative = np.cumsum(arrivals, axis=-1)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., dwell_minutes:] = cumulative[..., :-dwell_minutes]
+    return cumulative - shifted
+
+
+def iter_occupancy_days(store, names=None, dwell_minutes=DEFAULT_DWELL_MINUTES):
+    """逐天产出 (星期, (M, 1440) 在场人数)；给定 names 时按名称对齐，缺失食堂为 NaN"""
+    for day in store.days():
+        occupancy = arrivals_to_occupancy(store.load_day(day), dwell_minutes)
+        if names is not None:
+            aligned = np.full((len(names), MINUTES_PER_DAY), np.nan)
+            for j, name in enumerate(names):
+                if name in store._position:
+                    aligned[j] = occupancy[store._position[name]]
+            occupancy = aligned
+        yield day.weekday(), occupancy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入校园卡刷卡流水，聚合为每分钟计数")
+    parser.add_argument("logs", nargs="+", help="流水文件（.csv / .parquet / .arrow）")
+    parser.add_argument("-o", "--output", default=COUNTS_DIR, help="计数目录")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块行数")
+    parser.add_argument("--canteen-col", default="canteen", help="食堂名称列")
+    parser.add_argument("--time-col", default="time", help="刷卡时间列")
+    args = parser.parse_args(argv)
+
+    counted, skipped, repeated = ingest(args.logs, args.output, chunk_size=args.chunk_size,
+                                        canteen_col=args.canteen_col, time_col=args.time_col)
+    for path in repeated:
+        print(f"{path} 的内容之前已导入，跳过", file=sys.stderr)
+    print(f"已计入 {counted} 条，跳过 {skipped} 条（未知食堂或时间无法解析）", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+# live_occupancy.py - 闸机 / 刷卡机实时事件流，按食堂维护滑动窗口计数
+#
+# 每条事件是一行文本 "食堂名称,时间,方向"（方向为 in / out；刷卡机只有 in），列顺序与刷卡流水一致。
+# 事件通过本地 TCP 端口（每行一条，连接可以一直保持）或进程内队列送入，由单个消费线程按批解析，
+# 累加到固定大小的环形计数 (M, WINDOW_MINUTES) 中。内存占用与事件总数无关，时间按事件时间推进。
+# 每处理完一批就生成一个新的只读快照并整体替换引用，评分代码读快照时不需要加锁。
+# 在场人数的两种来源：
+#   - 报告过离场事件的食堂：进场数 - 离场数，按自然日清零；
+#   - 只有刷卡机的食堂：最近 DEFAULT_DWELL_MINUTES 分钟的进场数，与 ingest.arrivals_to_occupancy 一致。
+#
+# 用法：
+#   python live_occupancy.py listen --port 8700                        # 接收事件，定期打印各食堂在场人数
+#   python live_occupancy.py replay events.csv --port 8700 --speed 60 --retime   # 60 倍速回放，时间换算为此刻
+#   python live_occupancy.py replay events.csv --local                 # 不经网络直接回放，报告处理速率
+import argparse
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_DWELL_MINUTES, iter_log_chunks
+from opening_hours import MINUTES_PER_DAY
+
+LIVE_HOST = os.environ.get("CANTEEN_LIVE_HOST", "127.0.0.1")
+# 设置了 CANTEEN_LIVE_PORT 时页面与 API 服务才接收实时事件
+LIVE_PORT = int(os.environ["CANTEEN_LIVE_PORT"]) if os.environ.get("CANTEEN_LIVE_PORT") else None
+DEFAULT_LIVE_PORT = 8700
+WINDOW_MINUTES = 60
+RATE_MINUTES = 5               # 到达率取最近几分钟的平均
+STALE_MINUTES = 10             # 最新事件早于此刻这么多分钟时，快照视为过期
+QUEUE_BATCHES = 1024           # 待处理批次上限，满了以后接收端阻塞（背压）
+MAX_MERGED_LINES = 200_000     # 积压时一次合并处理的最多行数
+READ_BYTES = 1 << 16
+REPLAY_BATCH = 2000
+EVENT_COLUMNS = ("canteen", "time", "direction")
+DIRECTIONS = {"in": 1, "out": -1}
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 解析 ============
+class _MinuteParser:
+    """ "YYYY-MM-DD HH:MM[:SS]" -> 绝对分钟（自公元元年起），同一分钟的时间戳只解析一次"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._cache = {}
+
+    def __call__(self, stamp):
+        key = stamp[:16]
+        minute = self._cache.get(key)
+        if minute is None:
+            moment = datetime.strptime(key.replace("T", " "), "%Y-%m-%d %H:%M")
+            minute = moment.toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+            if len(self._cache) >= self.maxsize:
+                self._cache = {}
+            self._cache[key] = minute
+        return minute
+
+
+def minute_to_datetime(minute):
+    """绝对分钟 -> datetime"""
+    day, offset = divmod(int(minute), MINUTES_PER_DAY)
+    return datetime.fromordinal(day) + timedelta(minutes=offset)
+
+
+def parse_events(lines, position, parse_minute):
+    """事件行 -> (食堂下标, 绝对分钟, +1/-1, 跳过行数)；未知食堂、时间或方向的行跳过"""
+    rows, minutes, deltas = [], [], []
+    skipped = 0
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) != 3:
+            skipped += bool(line.strip())
+            continue
+        row = position.get(parts[0].strip())
+        delta = DIRECTIONS.get(parts[2].strip())
+        if row is None or delta is None:
+            skipped += 1
+            continue
+        try:
+            minute = parse_minute(parts[1].strip())
+        except ValueError:
+            skipped += 1
+            continue
+        rows.append(row)
+        minutes.append(minute)
+        deltas.append(delta)
+    return (np.array(rows, dtype=np.int64), np.array(minutes, dtype=np.int64), np.array(deltas, dtype=np.int64),
+            skipped)
+
+
+# ============ 快照 ============
+@dataclass(frozen=True)
+class LiveSnapshot:
+    """某一批事件处理完后的实时状态，创建后不再修改"""
+    version: int
+    names: tuple
+    newest: datetime           # 最新事件所在的分钟，还没有事件时为 None
+    events: int                # 已计入的事件数
+    skipped: int               # 无法解析或未知食堂的行数
+    late: int                  # 早于窗口、已无法计入的事件数
+    arrivals: np.ndarray       # (M, WINDOW_MINUTES) 每分钟进场人数，最后一列为最新分钟
+    rate: np.ndarray           # (M,) 最近 RATE_MINUTES 分钟的平均到达率（人/分钟）
+    occupancy: np.ndarray      # (M,) 在场人数
+    crowd: np.ndarray          # (M,) 拥挤度（占座位百分比，不超过 100）
+    observed: np.ndarray       # (M,) 窗口内有事件（或有离场计数）的食堂
+
+    def fresh(self, now, stale_minutes=STALE_MINUTES):
+        """最新事件是否在 now 之前 stale_minutes 分钟以内"""
+        return self.newest is not None and timedelta(0) <= now - self.newest <= timedelta(minutes=stale_minutes)
+
+    def aligned(self, names):
+        """按 names 的顺序取 (拥挤度, 是否有实时数据)，快照中没有的食堂视为无数据"""
+        position = {name: i for i, name in enumerate(self.names)}
+        index = np.array([position.get(name, -1) for name in names], dtype=np.int64)
+        known = index >= 0
+        crowd = np.where(known, self.crowd[index], 0.0)
+        return crowd, known & self.observed[index]
+
+
+# ============ 计数 ============
+class LiveOccupancy:
+    """按食堂的环形滑动窗口计数；ingest() 与 realign() 只由写入方调用，读取方只读 snapshot"""
+
+    def __init__(self, names, seats, window_minutes=WINDOW_MINUTES, dwell_minutes=DEFAULT_DWELL_MINUTES):
+        if not 0 < dwell_minutes <= window_minutes:
+            raise ValueError(f"就餐时长 {dwell_minutes} 分钟应在 1-{window_minutes} 之间")
+        self.window_minutes = window_minutes
+        self.dwell_minutes = dwell_minutes
+        self.events = self.skipped = self.late = 0
+        self.snapshot = None
+        self._parse_minute = _MinuteParser()
+        # 只在写入方（消费线程与 realign）之间互斥，读快照不加锁
+        self._write_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=QUEUE_BATCHES)
+        self._consumer = None
+        self._server = None
+        self._head = None
+        self._resize(names, seats)
+        self._publish()
+
+    def _resize(self, names, seats, keep=None):
+        """切换到新的食堂列表；keep 为旧计数器，同名食堂的计数保留"""
+        self.names = tuple(names)
+        self.seats = np.asarray(seats, dtype=np.float64)
+        self._position = {name: i for i, name in enumerate(self.names)}
+        shape = (len(self.names), self.window_minutes)
+        self._entries = np.zeros(shape, dtype=np.int64)
+        self._exits = np.zeros(shape, dtype=np.int64)
+        self._net = np.zeros(len(self.names), dtype=np.int64)
+        self._has_exits = np.zeros(len(self.names), dtype=bool)
+        if keep is not None:
+            old_names, entries, exits, net, has_exits = keep
+            pairs = [(i, self._position[name]) for i, name in enumerate(old_names) if name in self._position]
+            if pairs:
+                old, new = map(list, zip(*pairs))
+                self._entries[new], self._exits[new] = entries[old], exits[old]
+                self._net[new], self._has_exits[new] = net[old], has_exits[old]
+
+    def realign(self, names, seats):
+        """食堂目录更新后按名称对齐计数"""
+        with self._write_lock:
+            self._resize(names, seats, (self.names, self._entries, self._exits, self._net, self._has_exits))
+            self._publish()
+
+    def _advance(self, minute):
+        """窗口推进到 minute：滑出窗口的各列清零，跨天时在场人数清零"""
+        if self._head is not None:
+            gap = minute - self._head
+            if gap >= self.window_minutes:
+                self._entries[:] = 0
+                self._exits[:] = 0
+            else:
+                slots = np.arange(self._head + 1, minute + 1) % self.window_minutes
+                self._entries[:, slots] = 0
+                self._exits[:, slots] = 0
+            if minute // MINUTES_PER_DAY != self._head // MINUTES_PER_DAY:
+                self._net[:] = 0
+        self._head = minute
+
+    def apply(self, rows, minutes, deltas):
+        """把一批已解析的事件计入窗口，早于窗口的事件只计数不累加"""
+        if not len(rows):
+            return
+        newest = int(minutes.max())
+        if self._head is None or newest > self._head:
+            self._advance(newest)
+        fresh = minutes > self._head - self.window_minutes
+        self.late += int((~fresh).sum())
+        rows, minutes, deltas = rows[fresh], minutes[fresh], deltas[fresh]
+        self.events += len(rows)
+
+        slot = minutes % self.window_minutes
+        entering = deltas > 0
+        np.add.at(self._entries, (rows[entering], slot[entering]), 1)
+        np.add.at(self._exits, (rows[~entering], slot[~entering]), 1)
+        self._has_exits[rows[~entering]] = True
+        today = minutes >= self._head - self._head % MINUTES_PER_DAY
+        np.add.at(self._net, rows[today], deltas[today])
+
+    def _publish(self):
+        """由当前计数生成只读快照并替换引用"""
+        head = self._head if self._head is not None else self.window_minutes - 1
+        arrivals = np.roll(self._entries, -((head + 1) % self.window_minutes), axis=1)
+        exits_seen = self._exits.any(axis=1)
+        # 开始接收前已在场的人离场时进出差会是负数，发布时截为 0（不改计数，结果与分批方式无关）
+        occupancy = np.where(self._has_exits, np.maximum(self._net, 0), arrivals[:, -self.dwell_minutes:].sum(axis=1))
+        crowd = np.minimum(occupancy / np.maximum(self.seats, 1.0) * 100.0, 100.0)
+        arrays = dict(
+            arrivals=arrivals,
+            rate=arrivals[:, -RATE_MINUTES:].sum(axis=1) / RATE_MINUTES,
+            occupancy=occupancy.astype(np.float64),
+            crowd=crowd,
+            observed=arrivals.any(axis=1) | exits_seen | (self._has_exits & (self._net > 0)),
+        )
+        for array in arrays.values():
+            array.setflags(write=False)
+        previous = self.snapshot
+        self.snapshot = LiveSnapshot(
+            version=previous.version + 1 if previous else 1,
+            names=self.names,
+            newest=None if self._head is None else minute_to_datetime(self._head),
+            events=self.events, skipped=self.skipped, late=self.late,
+            **arrays,
+        )
+        return self.snapshot
+
+    def ingest(self, lines):
+        """解析并计入一批事件行，返回新快照"""
+        with self._write_lock:
+            rows, minutes, deltas, skipped = parse_events(lines, self._position, self._parse_minute)
+            self.skipped += skipped
+            self.apply(rows, minutes, deltas)
+            return self._publish()
+
+    # ============ 队列与消费线程 ============
+    def feed(self, lines):
+        """把一批事件行放入队列（队列满时阻塞），由消费线程处理"""
+        self._queue.put(lines)
+
+    def _consume(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            # 积压时把已排队的批次合在一起处理，每次只生成一个快照
+            lines = list(batch)
+            while len(lines) < MAX_MERGED_LINES:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._safe_ingest(lines)
+                    return
+                lines.extend(more)
+            self._safe_ingest(lines)
+
+    def _safe_ingest(self, lines):
+        try:
+            self.ingest(lines)
+        except Exception:
+            logger.exception("实时事件处理失败，丢弃本批 %d 行", len(lines))
+
+    def start(self, host=None, port=None):
+        """启动消费线程；给出 port 时同时在本地端口接收事件（端口被占用时记录日志，只接收队列）"""
+        if self._consumer is None or not self._consumer.is_alive():
+            self._consumer = threading.Thread(target=self._consume, name="live-occupancy", daemon=True)
+            self._consumer.start()
+        if port is not None and self._server is None:
+            try:
+                self._server = _EventServer((host or LIVE_HOST, port), _handler(self))
+            except OSError:
+                logger.warning("实时事件端口 %s:%s 不可用，只接收进程内队列", host or LIVE_HOST, port)
+                return self
+            threading.Thread(target=self._server.serve_forever, name="live-events", daemon=True).start()
+        return self
+
+    @property
+    def address(self):
+        """接收事件的 (主机, 端口)，未监听时为 None"""
+        return self._server.server_address if self._server is not None else None
+
+    def stop(self):
+        """停止接收，处理完已排队的事件后退出消费线程"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._consumer is not None:
+            self._queue.put(None)
+            self._consumer.join()
+            self._consumer = None
+
+
+# ============ 本地端口 ============
+class _EventServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _handler(tracker):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            pending = b""
+            while True:
+                chunk = self.rfile.read1(READ_BYTES)
+                if not chunk:
+                    break
+                data = pending + chunk
+                cut = data.rfind(b"\n")
+                if cut < 0:
+                    pending = data[-READ_BYTES:]
+                    continue
+                pending = data[cut + 1:]
+                tracker.feed(data[:cut].decode("utf-8", "replace").splitlines())
+            if pending.strip():
+                tracker.feed([pending.decode("utf-8", "replace")])
+
+    return Handler
+
+
+# ============ 回放 ============
+def iter_event_lines(path, chunk_size=REPLAY_BATCH, retime=None):
+    """按块读取录制的事件（CSV / Parquet / Arrow，列 canteen, time, direction），
+    产出 (该块各事件的录制时间, 事件行)；给出 retime 时事件行中的时间改为 retime(录制时间)"""
+    for chunk in iter_log_chunks(path, chunk_size, EVENT_COLUMNS):
+        times = pd.to_datetime(chunk["time"], errors="coerce")
+        valid = times.notna()
+        chunk, times = chunk[valid], times[valid]
+        stamps = (times if retime is None else retime(times)).dt.strftime("%Y-%m-%d %H:%M:%S")
+        lines = (chunk["canteen"].astype(str) + "," + stamps + "," + chunk["direction"].astype(str)).tolist()
+        yield times, lines
+
+
+def _first_time(path):
+    for times, _ in iter_event_lines(path, chunk_size=1):
+        if len(times):
+            return times.iloc[0]
+    return None
+
+
+def replay(path, send, speed=0.0, retime=False, clock=time.monotonic, sleep=time.sleep, now=datetime.now):
+    """按录制顺序把事件交给 send(lines)，返回事件行数
+
+    speed > 0 时按录制时间的 speed 倍速发送；retime 时把录制时间压缩到回放的实际时间上
+    （开始时刻 + 录制经过时间 / speed），接收端看到的就是"此刻"的事件，因此要求 speed > 0。
+    """
+    if retime and speed <= 0:
+        raise ValueError("retime 需要 speed > 0")
+    first = _first_time(path)
+    if first is None:
+        return 0
+    started_at = pd.Timestamp(now())
+    mapping = (lambda times: started_at + (times - first) / speed) if retime else None
+    start = clock()
+    sent = 0
+    for times, lines in iter_event_lines(path, retime=mapping):
+        if speed > 0:
+            delay = (times.iloc[0] - first).total_seconds() / speed - (clock() - start)
+            if delay > 0:
+                sleep(delay)
+        send(lines)
+        sent += len(lines)
+    return sent
+
+
+def _socket_sender(host, port):
+    sock = socket.create_connection((host, port))
+
+    def send(lines):
+        sock.sendall(("\n".join(lines) + "\n").encode("utf-8"))
+
+    return sock, send
+
+
+# ============ 命令行 ============
+def _tracker_for(catalog_path):
+    from catalog import load_catalog
+    arrays = load_catalog(catalog_path).arrays
+    return LiveOccupancy(arrays.names, arrays.seats)
+
+
+def _print_snapshot(snapshot):
+    newest = f"{snapshot.newest:%Y-%m-%d %H:%M}" if snapshot.newest else "无"
+    print(f"最新事件 {newest}  已计入 {snapshot.events}  跳过 {snapshot.skipped}  过晚 {snapshot.late}")
+    for i in np.flatnonzero(snapshot.observed):
+        print(f"  {snapshot.names[i]}  在场 {snapshot.occupancy[i]:.0f} 人  拥挤度 {snapshot.crowd[i]:.0f}%  "
+              f"到达 {snapshot.rate[i]:.1f} 人/分钟")
+
+
+def main(argv=None):
+    from catalog import CATALOG_PATH
+
+    parser = argparse.ArgumentParser(description="食堂实时进出事件的接收与回放")
+    sub = parser.add_subparsers(dest="command", required=True)
+    listen = sub.add_parser("listen", help="在本地端口接收事件并定期打印快照")
+    listen.add_argument("--host", default=LIVE_HOST)
+    listen.add_argument("--port", type=int, default=LIVE_PORT or DEFAULT_LIVE_PORT)
+    listen.add_argument("--interval", type=float, default=10.0, help="打印间隔（秒）")
+    listen.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录文件")
+    play = sub.add_parser("replay", help="回放录制的事件（列 canteen, time, direction）")
+    play.add_argument("events", help="事件文件（.csv / .parquet / .arrow），按时间排序")
+    play.add_argument("--host", default=LIVE_HOST)
+    play.add_argument("--port", type=int, default=LIVE_PORT or DEFAULT_LIVE_PORT)
+    play.add_argument("--speed", type=float, default=0.0, help="按事件时间的倍速回放，0 表示尽快发送")
+    play.add_argument("--retime", action="store_true", help="把录制时间换算为回放时的实际时间（需要 --speed）")
+    play.add_argument("--local", action="store_true", help="不经网络，直接在本进程计数并报告处理速率")
+    play.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录文件（--local 时使用）")
+    args = parser.parse_args(argv)
+    if args.command == "replay" and args.retime and args.speed <= 0:
+        parser.error("--retime 需要 --speed > 0")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "listen":
+        tracker = _tracker_for(args.catalog).start(args.host, args.port)
+        if tracker.address is None:
+            return 1
+        logger.info("实时事件接收已启动：%s:%s", *tracker.address[:2])
+        try:
+            while True:
+                time.sleep(args.interval)
+                _print_snapshot(tracker.snapshot)
+        except KeyboardInterrupt:
+            tracker.stop()
+        return 0
+
+    if args.local:
+        tracker = _tracker_for(args.catalog)
+        started = time.perf_counter()
+        sent = replay(args.events, tracker.ingest, args.speed, args.retime)
+        elapsed = time.perf_counter() - started
+        _print_snapshot(tracker.snapshot)
+        print(f"回放 {sent} 条，用时 {elapsed:.2f} 秒（{sent / max(elapsed, 1e-9):,.0f} 条/秒）", file=sys.stderr)
+        return 0
+    sock, send = _socket_sender(args.host, args.port)
+    with sock:
+        sent = replay(args.events, send, args.speed, args.retime)
+    print(f"已发送 {sent} 条到 {args.host}:{args.port}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
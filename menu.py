@@ -0,0 +1,308 @@
+# menu.py - 菜品目录与倒排索引：按菜名 / 标签搜索，按预算与供应时段筛选出有这道菜的食堂
+#
+# 菜品目录（data/dishes.json）逐道菜给出所属食堂、价格、标签与供应时段（缺省同食堂营业时间）。
+# 加载时全部菜品按价格排序后编号，于是"编号递增"就是"价格递增"：
+# 菜名与每个标签分别切成单字与相邻二字（bigram）作为词项，每个词项的倒排表是升序的菜品编号，
+# 也就天然按价格排好序——预算筛选只需在倒排表上二分出一段编号区间，
+# 多个词项从最短的倒排表开始逐个二分求交，不需要扫描全部菜品。
+# 供应时段复用 opening_hours 的按分钟营业位图；搜索结果最终是 (T, M) 的"有匹配菜品"食堂掩码，
+# 作为评分的一个可选条件并入推荐排序与全天规划。
+#
+# 用法：
+#   python menu.py 米线 --budget 10 20 --time 12:00 --weekday 2
+import argparse
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from catalog import CATALOG_PATH, load_catalog
+from opening_hours import OpeningHoursIndex, parse_schedule
+
+MENU_PATH = os.environ.get(
+    "CANTEEN_MENU_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dishes.json")
+)
+DEFAULT_DISHES_PER_CANTEEN = 3
+
+_TERM_SPLIT_RE = re.compile(r"[\s,，;；、/|+]+")
+
+logger = logging.getLogger(__name__)
+
+
+class MenuError(ValueError):
+    """菜品目录格式或取值有误"""
+
+
+# ============ 分词 ============
+def query_terms(text):
+    """搜索文本 -> 归一化的词列表（按空白与标点切分、小写、去重、排序），空查询为 ()"""
+    return tuple(sorted({t for t in _TERM_SPLIT_RE.split((text or "").strip().lower()) if t}))
+
+
+def _term_grams(term):
+    """一个词的检索词项：单字词为其本身，否则为全部相邻二字"""
+    if len(term) == 1:
+        return [term]
+    return [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+def _field_grams(field):
+    """菜名或标签的全部单字与相邻二字"""
+    field = field.lower()
+    return set(field) | {field[i:i + 2] for i in range(len(field) - 1)}
+
+
+# ============ 校验 ============
+def _schedule_key(hours):
+    """供应时段的可哈希表示：文本原样，按星期的字典转为 JSON"""
+    return hours if isinstance(hours, str) else json.dumps(hours, sort_keys=True, ensure_ascii=False)
+
+
+def _check_dish(i, record, checked):
+    if not isinstance(record, dict):
+        return [f"第 {i + 1} 道菜不是对象"]
+    if not isinstance(record.get("name"), str) or not record["name"].strip():
+        return [f"第 {i + 1} 道菜缺少 name"]
+    problems = []
+    if not isinstance(record.get("canteen"), str) or not record["canteen"].strip():
+        problems.append("缺少 canteen")
+    price = record.get("price")
+    if not (isinstance(price, (int, float)) and not isinstance(price, bool) and price >= 0):
+        problems.append("price 必须是非负数")
+    tags = record.get("tags", [])
+    if not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+        problems.append("tags 必须是字符串列表")
+    if "hours" in record:
+        # 同样的时段文本只解析一次
+        key = _schedule_key(record["hours"])
+        if key not in checked:
+            try:
+                parse_schedule(record["hours"])
+                checked[key] = None
+            except (ValueError, TypeError, AttributeError) as exc:
+                checked[key] = f"hours 无效：{exc}"
+        if checked[key] is not None:
+            problems.append(checked[key])
+    return [f"{record['name']}: {p}" for p in problems]
+
+
+def validate(records):
+    """校验全部菜品记录，有问题时抛出 MenuError（列出所有问题）"""
+    checked = {}
+    problems = [p for i, record in enumerate(records) for p in _check_dish(i, record, checked)]
+    if problems:
+        raise MenuError("菜品目录校验失败：\n" + "\n".join(problems))
+
+
+# ============ 索引 ============
+@dataclass(frozen=True)
+class Menu:
+    """按价格升序编号的菜品列式表与倒排索引，长度均为 D"""
+    names: list
+    canteen: np.ndarray        # 所属食堂在食堂目录中的下标
+    price: np.ndarray          # 升序
+    tags: list                 # 每道菜的标签元组
+    schedules: OpeningHoursIndex  # 互不相同的供应时段位图（K 个）
+    schedule: np.ndarray       # 每道菜的供应时段在 schedules 中的下标
+    n_canteens: int
+    terms: dict                # 词项 -> 倒排表下标
+    offsets: np.ndarray        # 第 t 个词项的倒排表为 postings[offsets[t]:offsets[t + 1]]
+    postings: np.ndarray       # int32，每段升序
+    texts: list                # 互不相同的 菜名与标签（以换行拼接），用于核对三字以上的词
+    text_id: np.ndarray        # 每道菜在 texts 中的下标
+    path: str = None
+    mtime: float = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, records, db, path=None, mtime=None):
+        """由菜品记录与食堂目录（名称 -> 食堂信息）构建；不在目录中的食堂的菜品跳过"""
+        validate(records)
+        codes = {name: j for j, name in enumerate(db)}
+        kept = [r for r in records if r["canteen"] in codes]
+        if len(kept) < len(records):
+            logger.warning("菜品目录中有 %d 道菜所属的食堂不在食堂目录中，已跳过", len(records) - len(kept))
+        kept.sort(key=lambda r: r["price"])
+
+        # 供应时段：缺省为食堂营业时间；相同的时段只解析、存储一次，菜品只记下标
+        hours = [r.get("hours", db[r["canteen"]]["opening_hours"]) for r in kept]
+        distinct = {}
+        schedule = np.array([distinct.setdefault(_schedule_key(h), (len(distinct), h))[0] for h in hours],
+                            dtype=np.int32)
+
+        # 词项按不同的菜名文本计算一次，再展开到共用该文本的每道菜
+        texts = {}
+        text_id = np.array([texts.setdefault("\n".join([r["name"], *r.get("tags", [])]).lower(), len(texts))
+                            for r in kept], dtype=np.int32)
+        terms, pair_terms, pair_texts = {}, [], []
+        for t, text in enumerate(texts):
+            for gram in set().union(*map(_field_grams, text.split("\n"))):
+                pair_terms.append(terms.setdefault(gram, len(terms)))
+                pair_texts.append(t)
+        pair_texts = np.asarray(pair_texts, dtype=np.int64)
+        by_text = np.argsort(text_id, kind="stable").astype(np.int32)
+        text_count = np.bincount(text_id, minlength=len(texts))
+        text_start = np.cumsum(text_count) - text_count
+        repeat = text_count[pair_texts]
+        within = np.arange(repeat.sum()) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        term_rows = np.repeat(np.asarray(pair_terms, dtype=np.int64), repeat)
+        dish_cols = by_text[np.repeat(text_start[pair_texts], repeat) + within]
+        order = np.lexsort((dish_cols, term_rows))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_rows, minlength=len(terms)), out=offsets[1:])
+
+        return cls(
+            names=[r["name"] for r in kept],
+            canteen=np.array([codes[r["canteen"]] for r in kept], dtype=np.int32),
+            price=np.array([r["price"] for r in kept], dtype=np.float64),
+            tags=[tuple(r.get("tags", ())) for r in kept],
+            schedules=OpeningHoursIndex.from_hours([h for _, h in distinct.values()]),
+            schedule=schedule,
+            n_canteens=len(codes),
+            terms=terms,
+            offsets=offsets,
+            postings=dish_cols[order],
+            texts=list(texts),
+            text_id=text_id,
+            path=path,
+            mtime=mtime,
+        )
+
+    def _posting(self, gram):
+        t = self.terms.get(gram)
+        if t is None:
+            return self.postings[:0]
+        return self.postings[self.offsets[t]:self.offsets[t + 1]]
+
+    def price_bounds(self, price_range):
+        """预算 [最低, 最高] 对应的菜品编号区间 [lo, hi)"""
+        if price_range is None:
+            return 0, len(self)
+        return (int(np.searchsorted(self.price, price_range[0], side="left")),
+                int(np.searchsorted(self.price, price_range[1], side="right")))
+
+    def search(self, query, price_range=None):
+        """菜名或标签包含 query 中每个词、价格在预算内的菜品，返回 DishMatches（按价格升序）"""
+        terms = query if isinstance(query, tuple) else query_terms(query)
+        lo, hi = self.price_bounds(price_range)
+        grams = sorted({g for term in terms for g in _term_grams(term)})
+        if not grams or lo >= hi:
+            return DishMatches(self, self.postings[:0])
+
+        lists = []
+        for gram in grams:
+            posting = self._posting(gram)
+            lists.append(posting[np.searchsorted(posting, lo):np.searchsorted(posting, hi)])
+        lists.sort(key=len)
+        ids = lists[0]
+        for posting in lists[1:]:
+            if not len(ids):
+                break
+            # 短表中的每个编号到长表里二分查找
+            at = np.minimum(np.searchsorted(posting, ids), len(posting) - 1)
+            ids = ids[posting[at] == ids] if len(posting) else ids[:0]
+
+        # 二字词项都出现不代表原词连续出现，三字以上的词按不同的菜名文本逐个核对
+        long_terms = [term for term in terms if len(term) > 2]
+        if long_terms and len(ids):
+            candidates, inverse = np.unique(self.text_id[ids], return_inverse=True)
+            found = np.array([all(term in self.texts[t] for term in long_terms) for t in candidates.tolist()])
+            ids = ids[found[inverse]]
+        return DishMatches(self, ids)
+
+
+@dataclass(frozen=True)
+class DishMatches:
+    """一次搜索命中的菜品编号（升序，即价格从低到高）"""
+    menu: Menu
+    ids: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    def available(self, minutes, weekday=0):
+        """各时刻命中菜品是否在供应，返回 (T, D) 布尔矩阵"""
+        return self.menu.schedules.is_open(minutes, weekday)[:, self.menu.schedule[self.ids]]
+
+    def canteen_mask(self, minutes, weekday=0):
+        """各时刻有命中菜品在供应的食堂，返回 (T, M) 布尔矩阵，可直接作为评分的可选条件"""
+        minutes = np.atleast_1d(minutes)
+        mask = np.zeros((len(minutes), self.menu.n_canteens), dtype=bool)
+        slot, dish = np.nonzero(self.available(minutes, weekday))
+        mask[slot, self.menu.canteen[self.ids[dish]]] = True
+        return mask
+
+    def by_canteen(self, minute, weekday=0, limit=DEFAULT_DISHES_PER_CANTEEN):
+        """该时刻各食堂在供应的命中菜品：{食堂下标: [(菜名, 价格)]}，每个食堂取最便宜的 limit 道"""
+        ids = self.ids[self.available([minute], weekday)[0]]
+        dishes = {}
+        for dish, code in zip(ids.tolist(), self.menu.canteen[ids].tolist()):
+            found = dishes.setdefault(code, [])
+            if len(found) < limit:
+                found.append((self.menu.names[dish], float(self.menu.price[dish])))
+        return dishes
+
+
+# ============ 读取 ============
+def load_menu(db, path=MENU_PATH):
+    """加载并校验菜品目录，按食堂目录 db 对齐；文件不存在时返回空目录"""
+    if not os.path.exists(path):
+        return Menu.build([], db, path)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise MenuError(f"无法读取菜品目录 {path}: {exc}") from None
+    records = data if isinstance(data, list) else data.get("dishes", [])
+    return Menu.build(records, db, path, mtime)
+
+
+def menu_mtime(path=MENU_PATH):
+    """菜品目录文件的修改时间，不存在时为 None（用于判断是否需要重建索引）"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+# ============ 结果表 ============
+def dish_label(dishes):
+    """[(菜名, 价格)] -> "牛肉米线 14元、牛肉粉 15元" """
+    return "、".join(f"{name} {price:g}元" for name, price in dishes)
+
+
+def add_dish_column(frame, result, matches, minute, weekday=0, row=0):
+    """给 result_frame 的结果表加一列"匹配菜品"：各食堂此刻在供应的最便宜的几道命中菜品"""
+    dishes = matches.by_canteen(minute, weekday)
+    frame["匹配菜品"] = [dish_label(dishes.get(j, [])) for j in np.flatnonzero(result.eligible[row]).tolist()]
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按菜名或标签搜索供应中的菜品")
+    parser.add_argument("query", help="菜名或标签，多个词用空格分隔（需同时包含）")
+    parser.add_argument("--budget", type=float, nargs=2, metavar=("MIN", "MAX"), help="价格预算（元）")
+    parser.add_argument("--time", default="12:00", help="就餐时间 HH:MM")
+    parser.add_argument("--weekday", type=int, default=0, help="星期（0 表示周一）")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录文件")
+    parser.add_argument("--menu", default=MENU_PATH, help="菜品目录文件")
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(args.catalog)
+    menu = load_menu(catalog.db, args.menu)
+    hour, minute = map(int, args.time.split(":"))
+    matches = menu.search(args.query, args.budget)
+    dishes = matches.by_canteen(hour * 60 + minute, args.weekday, limit=len(menu))
+    print(f"共 {len(menu)} 道菜，命中 {len(matches)} 道，{args.time} 有 {len(dishes)} 个食堂在供应")
+    for code, found in sorted(dishes.items(), key=lambda item: item[1][0][1]):
+        print(f"  {catalog.arrays.names[code]}：{dish_label(found)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# metrics.py - 轻量运行指标：分段计时、计数器、进程负载与 Prometheus 文本导出
+#
+# 页面每次运行时把各段（侧边栏、评分、结果表、渲染、整次运行）的耗时记入直方图，
+# 重跑、缓存命中、反馈提交等计入计数器；页面上的状态指标直接读这些实测值。
+# 同一份数据由本地 HTTP 线程以 Prometheus 文本格式导出（默认 127.0.0.1:9108/metrics）。
+import logging
+import os
+import resource
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get("CANTEEN_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("CANTEEN_METRICS_PORT", "9108"))
+PREFIX = "canteen"
+# 直方图桶上界（秒）
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 512
+SESSION_WINDOW_SECONDS = 300
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _process_start_time():
+    """进程启动时间（Unix 秒）：由 /proc/self/stat 的 starttime 与 /proc/stat 的 btime 计算，
+    不能读取 /proc 时退回本模块的导入时间"""
+    try:
+        with open("/proc/self/stat") as f:
+            # 第 2 个字段（进程名）可能含空格，从最后一个 ")" 之后数起，starttime 是第 22 个字段
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_START_TIME = _process_start_time()
+
+
+def _quantile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        for i, upper in enumerate(BUCKETS):
+            if seconds <= upper:
+                self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class ProcessLoad:
+    """进程 CPU 占用（相邻两次采样之间）、常驻内存与系统平均负载"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._last = (clock(), time.process_time())
+        self._cpu_percent = 0.0
+        self._lock = threading.Lock()
+
+    def cpu_percent(self):
+        """距上次调用的进程 CPU 占用百分比（按单核计，可超过 100）"""
+        with self._lock:
+            now, cpu = self.clock(), time.process_time()
+            elapsed = now - self._last[0]
+            if elapsed > 0.05:
+                self._cpu_percent = 100.0 * (cpu - self._last[1]) / elapsed
+                self._last = (now, cpu)
+            return self._cpu_percent
+
+    @staticmethod
+    def resident_bytes():
+        """当前常驻内存；不能读取 /proc 时退回进程峰值"""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def load_average():
+        try:
+            return os.getloadavg()[0]
+        except (OSError, AttributeError):
+            return None
+
+
+class Metrics:
+    """线程安全的指标登记表，进程内共用一份"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.load = ProcessLoad(clock)
+        self._counters = defaultdict(float)     # (名称, 标签) -> 值
+        self._histograms = defaultdict(_Histogram)
+        self._counter_fns = {}                  # 名称 -> (说明, 取值函数)，导出时读取
+        self._help = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    # ============ 记录 ============
+    def inc(self, name, value=1.0, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+            if help_text:
+                self._help[name] = help_text
+
+    def observe(self, section, seconds):
+        with self._lock:
+            self._histograms[section].observe(seconds)
+
+    @contextmanager
+    def span(self, section):
+        """计时一段代码，耗时记入 section 的直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(section, time.perf_counter() - start)
+
+    def counter_fn(self, name, help_text, fn):
+        """登记一个由外部维护的计数器（如结果缓存的命中数），导出时调用 fn 取值"""
+        with self._lock:
+            self._counter_fns[name] = (help_text, fn)
+
+    def touch_session(self, session_id):
+        with self._lock:
+            self._sessions[session_id] = self.clock()
+
+    # ============ 读取 ============
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def latency(self, section, q=0.5):
+        """某段最近若干次耗时的分位数（秒），没有记录时为 None"""
+        with self._lock:
+            histogram = self._histograms.get(section)
+            samples = list(histogram.recent) if histogram else []
+        return _quantile(samples, q)
+
+    def active_sessions(self, window=SESSION_WINDOW_SECONDS):
+        """最近 window 秒内有操作的会话数"""
+        cutoff = self.clock() - window
+        with self._lock:
+            for sid in [sid for sid, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[sid]
+            return len(self._sessions)
+
+    # ============ 导出 ============
+    def render_prometheus(self):
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (list(h.counts), h.total, h.count) for k, h in self._histograms.items()}
+            counter_fns = dict(self._counter_fns)
+            help_texts = dict(self._help)
+
+        by_name = defaultdict(list)
+        for (name, labels), value in counters.items():
+            by_name[name].append((labels, value))
+        for name, (help_text, fn) in counter_fns.items():
+            by_name[name].append(((), float(fn())))
+            help_texts[name] = help_text
+        for name in sorted(by_name):
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# HELP {metric} {help_texts.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_labels(labels)} {_number(value)}" for labels, value in sorted(by_name[name]))
+
+        metric = f"{PREFIX}_section_seconds"
+        lines.append(f"# HELP {metric} 页面各段的运行耗时")
+        lines.append(f"# TYPE {metric} histogram")
+        for section in sorted(histograms):
+            counts, total, count = histograms[section]
+            for upper, n in zip(BUCKETS, counts):
+                lines.append(f'{metric}_bucket{{section="{_escape(section)}",le="{upper:g}"}} {n}')
+            lines.append(f'{metric}_bucket{{section="{_escape(section)}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{section="{_escape(section)}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{section="{_escape(section)}"}} {count}')
+
+        gauges = [
+            (f"{PREFIX}_active_sessions", "最近 5 分钟内有操作的会话数", self.active_sessions()),
+            ("process_cpu_seconds_total", "进程累计 CPU 时间（秒）", time.process_time()),
+            ("process_resident_memory_bytes", "进程常驻内存（字节）", self.load.resident_bytes()),
+            ("process_start_time_seconds", "进程启动时间（Unix 秒）", PROCESS_START_TIME),
+        ]
+        load = self.load.load_average()
+        if load is not None:
+            gauges.append(("node_load1", "系统 1 分钟平均负载", load))
+        for metric, help_text, value in gauges:
+            kind = "counter" if metric.endswith("_total") else "gauge"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+# ============ HTTP 导出 ============
+def _handler(metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_metrics_server(metrics, host=METRICS_HOST, port=METRICS_PORT):
+    """在后台线程上提供 /metrics，端口被占用时记录日志并返回 None"""
+    try:
+        server = ThreadingHTTPServer((host, port), _handler(metrics))
+    except OSError:
+        logger.warning("指标端口 %s:%s 不可用，未启动 /metrics", host, port)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
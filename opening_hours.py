@@ -0,0 +1,159 @@
+# opening_hours.py - 营业时间解析与按分钟的营业位图索引
+#
+# "11:00-13:30, 17:00-19:00" 这类文本在加载时解析一次，
+# 生成 食堂 × 星期 × 1440 分钟 的营业位图（按位压缩存储），
+# "第 t 分钟哪些食堂营业" 之后只是一次数组索引。
+# 结束时间早于开始时间表示跨过午夜，超出部分计入下一天。
+import re
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+DAYS_PER_WEEK = 7
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+_INTERVAL_RE = re.compile(r"(\d{1,2})[:：](\d{2})\s*[-–—~～至]\s*(\d{1,2})[:：](\d{2})")
+_SEPARATOR_RE = re.compile(r"[,，;；、]")
+
+
+# ============ 解析 ============
+def _to_minute(hour, minute, text):
+    if hour > 24 or minute >= 60 or (hour == 24 and minute):
+        raise ValueError(f"无法解析营业时间: {text!r}")
+    return hour * 60 + minute
+
+
+def parse_intervals(text):
+    """解析一天的营业时间文本，返回 [(开始分钟, 结束分钟)]，结束不含"""
+    intervals = []
+    for part in _SEPARATOR_RE.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        match = _INTERVAL_RE.fullmatch(part)
+        if not match:
+            raise ValueError(f"无法解析营业时间: {text!r}")
+        h1, m1, h2, m2 = map(int, match.groups())
+        start = _to_minute(h1, m1, text) % MINUTES_PER_DAY
+        end = _to_minute(h2, m2, text)
+        if start == end % MINUTES_PER_DAY and end != MINUTES_PER_DAY:
+            raise ValueError(f"营业时间区间为空: {part!r}")
+        intervals.append((start, end))
+    return intervals
+
+
+def format_intervals(intervals):
+    """[(开始分钟, 结束分钟)] -> "11:00-13:30, 17:00-19:00"，parse_intervals 的逆运算"""
+    return ", ".join(f"{start // 60}:{start % 60:02d}-{end // 60}:{end % 60:02d}" for start, end in intervals)
+
+
+def parse_weekdays(key):
+    """解析星期键：0-6 的整数、"mon-fri"、"sat,sun"、"0-4" 等；"fri-mon" 这类范围跨过周日"""
+    if isinstance(key, int):
+        if not 0 <= key < DAYS_PER_WEEK:
+            raise ValueError(f"无法解析星期: {key!r}")
+        return [key]
+    days = []
+    for part in str(key).lower().split(","):
+        bounds = [b.strip() for b in part.split("-")]
+        if len(bounds) > 2:
+            raise ValueError(f"无法解析星期: {key!r}")
+        try:
+            idx = [int(b) if b.isdigit() else WEEKDAY_NAMES.index(b) for b in bounds]
+        except ValueError:
+            raise ValueError(f"无法解析星期: {key!r}") from None
+        if any(not 0 <= d < DAYS_PER_WEEK for d in idx):
+            raise ValueError(f"无法解析星期: {key!r}")
+        first, last = idx[0], idx[-1]
+        if last < first:
+            last += DAYS_PER_WEEK
+        days.extend(d % DAYS_PER_WEEK for d in range(first, last + 1))
+    return days
+
+
+def parse_schedule(hours):
+    """解析一个食堂的营业时间，返回 {星期: [(开始, 结束)]}
+
+    hours 为字符串时每天相同；为字典时键是星期（见 parse_weekdays），
+    未列出的星期视为不营业。
+    """
+    if isinstance(hours, str):
+        intervals = parse_intervals(hours)
+        return {day: intervals for day in range(DAYS_PER_WEEK)}
+    schedule = {}
+    for key, text in hours.items():
+        intervals = parse_intervals(text)
+        for day in parse_weekdays(key):
+            schedule[day] = intervals
+    return schedule
+
+
+def schedule_mask(hours):
+    """一个食堂的营业位图，形状 (7, 1440)"""
+    mask = np.zeros((DAYS_PER_WEEK, MINUTES_PER_DAY), dtype=bool)
+    for day, intervals in parse_schedule(hours).items():
+        for start, end in intervals:
+            if end > start:
+                mask[day, start:end] = True
+            else:
+                mask[day, start:] = True
+                mask[(day + 1) % DAYS_PER_WEEK, :end] = True
+    return mask
+
+
+# ============ 索引 ============
+class OpeningHoursIndex:
+    """M 个食堂的营业位图，按分钟位压缩为 (M, 7, 180) 的 uint8"""
+
+    def __init__(self, packed):
+        self.packed = packed
+
+    def __len__(self):
+        return self.packed.shape[0]
+
+    @classmethod
+    def from_masks(cls, masks):
+        masks = np.asarray(masks, dtype=bool).reshape(-1, DAYS_PER_WEEK, MINUTES_PER_DAY)
+        return cls(np.packbits(masks, axis=-1))
+
+    @classmethod
+    def from_hours(cls, hours_list):
+        """由营业时间文本（或按星期的字典）列表构建"""
+        return cls.from_masks([schedule_mask(hours) for hours in hours_list])
+
+    def is_open(self, minutes, weekdays=0):
+        """N 个 (星期, 分钟) 查询 -> (N, M) 营业矩阵"""
+        minutes = np.asarray(minutes, dtype=np.intp) % MINUTES_PER_DAY
+        weekdays = np.broadcast_to(np.asarray(weekdays, dtype=np.intp), minutes.shape)
+        byte = self.packed[:, weekdays, minutes >> 3]
+        bit = (byte >> (7 - (minutes & 7)).astype(np.uint8)) & 1
+        return bit.T.astype(bool)
+
+    def open_at(self, minute, weekday=0):
+        """第 minute 分钟各食堂是否营业，返回 (M,)"""
+        return self.is_open([minute], weekday)[0]
+
+    def minute_mask(self, weekday=0):
+        """某天的完整营业位图，返回 (M, 1440) 布尔矩阵"""
+        return np.unpackbits(self.packed[:, weekday], axis=-1)[:, :MINUTES_PER_DAY].astype(bool)
+
+    def open_during(self, start, end, weekday=0, require_all=False):
+        """[start, end) 时间窗内是否营业，end <= start 时跨到下一天
+
+        require_all=False 表示窗口内任一分钟营业即可，True 表示全程营业。
+        """
+        start %= MINUTES_PER_DAY
+        if end <= start:
+            head = self._window(start, MINUTES_PER_DAY, weekday)
+            tail = self._window(0, end, (weekday + 1) % DAYS_PER_WEEK)
+            window = np.concatenate([head, tail], axis=1)
+        else:
+            window = self._window(start, end, weekday)
+        if window.shape[1] == 0:
+            return np.zeros(len(self), dtype=bool)
+        return window.all(axis=1) if require_all else window.any(axis=1)
+
+    def _window(self, start, end, weekday):
+        b0, b1 = start >> 3, (end + 7) >> 3
+        bits = np.unpackbits(self.packed[:, weekday, b0:b1], axis=-1)
+        return bits[:, start - b0 * 8:end - b0 * 8].astype(bool)
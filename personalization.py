@@ -0,0 +1,439 @@
+# personalization.py - 个性化推荐：用户 × 食堂 稀疏交互矩阵与低秩分解
+#
+# 刷卡到访与用户评分累积为稀疏的 用户 × 条目 交互矩阵（只存非零单元，按编码排序的数组，
+# 条目目前是食堂，菜品可复用同一个类）。矩阵用带偏置的矩阵分解（SGD）得到用户与条目的
+# 低维向量：到访视为正反馈，评分直接作为目标值，每个正样本再随机抽取用户未交互过的
+# 条目作为弱负样本。新交互到达时只对被更新的单元做几轮 SGD（partial_fit），不做全量重训。
+# 在线服务时，一批用户的个性化推荐分调整量只是一次 (N, k) × (k, M) 的小矩阵乘法。
+# 页面在线更新的模型由 PreferenceSaver 定期写回 PREFERENCES_PATH，API 服务检测到文件更新后重新读取；
+# 文件被命令行重训等其他进程更新时，PreferenceSaver 先读取新文件并重放页面尚未写盘的交互，再写回。
+import argparse
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+PREFERENCES_PATH = os.environ.get(
+    "CANTEEN_PREFERENCES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "preferences.npz")
+)
+DEFAULT_FACTORS = 16
+DEFAULT_LEARNING_RATE = 0.1
+DEFAULT_REGULARIZATION = 0.02
+DEFAULT_EPOCHS = 5
+DEFAULT_SAVE_SECONDS = 30.0  # 在线更新后最多隔这么久写回一次
+BATCH_SIZE = 1024
+INITIAL_USERS = 1024
+
+# 到访的目标评分与负样本（未交互条目）的目标评分、权重
+VISIT_RATING = 4.0
+UNVISITED_RATING = 2.0
+NEGATIVE_SAMPLES = 2
+NEGATIVE_WEIGHT = 0.25
+
+# 个性化调整：偏好项每 1 分对应 ADJUSTMENT_PER_POINT 推荐分，按 n / (n + PRIOR_COUNT) 收缩
+ADJUSTMENT_PER_POINT = 1.0
+MAX_ADJUSTMENT = 1.0
+PRIOR_COUNT = 5
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionMatrix:
+    """稀疏交互矩阵：单元编码 用户 * 条目数 + 条目 升序存放，附到访次数与评分和、评分次数"""
+
+    def __init__(self, n_items):
+        self.n_items = n_items
+        self.codes = np.empty(0, dtype=np.int64)
+        self.visits = np.empty(0, dtype=np.float32)
+        self.rating_sum = np.empty(0, dtype=np.float32)
+        self.rating_count = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, users, items, visits=None, ratings=None):
+        """累加一批交互（visits 为到访次数，ratings 为评分，NaN 表示没有评分），返回被更新的单元编码"""
+        codes = np.asarray(users, dtype=np.int64) * self.n_items + np.asarray(items, dtype=np.int64)
+        visits = np.zeros(len(codes)) if visits is None else np.asarray(visits, dtype=np.float64)
+        ratings = np.full(len(codes), np.nan) if ratings is None else np.asarray(ratings, dtype=np.float64)
+        rated = ~np.isnan(ratings)
+
+        touched, inverse = np.unique(codes, return_inverse=True)
+        add_visits = np.bincount(inverse, visits, len(touched))
+        add_sum = np.bincount(inverse, np.where(rated, ratings, 0.0), len(touched))
+        add_count = np.bincount(inverse, rated, len(touched))
+
+        pos = np.searchsorted(self.codes, touched)
+        found = pos < len(self.codes)
+        found[found] = self.codes[pos[found]] == touched[found]
+        self.visits[pos[found]] += add_visits[found]
+        self.rating_sum[pos[found]] += add_sum[found]
+        self.rating_count[pos[found]] += add_count[found]
+
+        new = ~found
+        self.codes = np.insert(self.codes, pos[new], touched[new])
+        self.visits = np.insert(self.visits, pos[new], add_visits[new])
+        self.rating_sum = np.insert(self.rating_sum, pos[new], add_sum[new])
+        self.rating_count = np.insert(self.rating_count, pos[new], add_count[new])
+        return touched
+
+    def contains(self, codes):
+        pos = np.searchsorted(self.codes, codes)
+        inside = pos < len(self.codes)
+        inside[inside] = self.codes[pos[inside]] == codes[inside]
+        return inside
+
+    def targets(self, codes):
+        """单元的 (目标评分, 权重)：有评分时取平均评分，否则为到访评分；权重随交互次数对数增长"""
+        pos = np.searchsorted(self.codes, codes)
+        visits, rating_sum, rating_count = self.visits[pos], self.rating_sum[pos], self.rating_count[pos]
+        target = np.where(rating_count > 0, rating_sum / np.maximum(rating_count, 1), VISIT_RATING)
+        return target, 1.0 + np.log1p(visits + rating_count)
+
+    def user_counts(self, n_users):
+        """各用户交互过的条目数 (n_users,)"""
+        return np.bincount(self.codes // self.n_items, minlength=n_users)[:n_users]
+
+
+class PreferenceModel:
+    """用户与条目（食堂）的低秩偏好模型，支持增量更新；线程安全"""
+
+    def __init__(self, names, factors=DEFAULT_FACTORS, learning_rate=DEFAULT_LEARNING_RATE,
+                 regularization=DEFAULT_REGULARIZATION, seed=0):
+        self.names = list(names)
+        self.factors = factors
+        self.learning_rate = learning_rate
+        self.regularization = regularization
+        self.rng = np.random.default_rng(seed)
+        self.user_ids = []
+        self._user_position = {}
+        self.user_vectors = self._init_vectors(INITIAL_USERS)
+        self.user_bias = np.zeros(INITIAL_USERS)
+        self.item_vectors = self._init_vectors(len(self.names))
+        self.item_bias = np.zeros(len(self.names))
+        self.global_mean = (VISIT_RATING + UNVISITED_RATING) / 2
+        self.matrix = InteractionMatrix(len(self.names))
+        self.version = 0
+        self._user_counts = np.zeros(INITIAL_USERS)
+        self._pending = None  # 尚未写盘的交互批次，track_pending() 后才记录
+        self._lock = threading.Lock()
+
+    def _init_vectors(self, n):
+        return self.rng.normal(0.0, 0.1, (n, self.factors))
+
+    @property
+    def n_users(self):
+        return len(self.user_ids)
+
+    def _user_rows(self, user_ids, create):
+        """用户 ID -> 行号；create 时为新用户分配行（容量按倍数扩展），否则未知用户为 -1"""
+        rows = np.empty(len(user_ids), dtype=np.int64)
+        for i, user in enumerate(user_ids):
+            user = str(user)
+            row = self._user_position.get(user)
+            if row is None:
+                if not create:
+                    rows[i] = -1
+                    continue
+                row = self._user_position[user] = len(self.user_ids)
+                self.user_ids.append(user)
+            rows[i] = row
+        capacity = len(self.user_bias)
+        if self.n_users > capacity:
+            grow = max(self.n_users, capacity * 2) - capacity
+            self.user_vectors = np.vstack([self.user_vectors, self._init_vectors(grow)])
+            self.user_bias = np.concatenate([self.user_bias, np.zeros(grow)])
+            self._user_counts = np.concatenate([self._user_counts, np.zeros(grow)])
+        return rows
+
+    def _item_columns(self, names):
+        position = {name: j for j, name in enumerate(self.names)}
+        return np.array([position.get(name, -1) for name in names], dtype=np.int64)
+
+    # ============ 增量拟合 ============
+    def partial_fit(self, user_ids, items, visits=None, ratings=None, epochs=DEFAULT_EPOCHS):
+        """加入一批交互并只对受影响的单元做 SGD；items 为条目名称，未知条目的交互被忽略
+
+        返回计入的交互条数。
+        """
+        with self._lock:
+            columns = self._item_columns(items)
+            known = columns >= 0
+            if not known.any():
+                return 0
+            rows = self._user_rows(np.asarray(user_ids, dtype=object)[known], create=True)
+            visits = None if visits is None else np.asarray(visits, dtype=np.float64)[known]
+            ratings = None if ratings is None else np.asarray(ratings, dtype=np.float64)[known]
+            touched = self.matrix.add(rows, columns[known], visits, ratings)
+            if self._pending is not None:
+                self._pending.append((np.asarray(user_ids, dtype=object)[known], np.asarray(items)[known],
+                                      visits, ratings, epochs))
+            self._user_counts[:self.n_users] = self.matrix.user_counts(self.n_users)
+            for _ in range(epochs):
+                self._sgd_epoch(touched)
+            self.version += 1
+            return int(known.sum())
+
+    def _sgd_epoch(self, codes):
+        """对给定单元（加负样本）按小批量做一轮 SGD"""
+        codes = self.rng.permutation(codes)
+        n_items = self.matrix.n_items
+        for start in range(0, len(codes), BATCH_SIZE):
+            batch = codes[start:start + BATCH_SIZE]
+            target, weight = self.matrix.targets(batch)
+            users, items = batch // n_items, batch % n_items
+
+            # 负样本：同一用户随机抽取未交互过的条目，已交互的抽样丢弃
+            neg_users = np.repeat(users, NEGATIVE_SAMPLES)
+            neg_items = self.rng.integers(0, n_items, len(neg_users))
+            keep = ~self.matrix.contains(neg_users * n_items + neg_items)
+            users = np.concatenate([users, neg_users[keep]])
+            items = np.concatenate([items, neg_items[keep]])
+            target = np.concatenate([target, np.full(keep.sum(), UNVISITED_RATING)])
+            weight = np.concatenate([weight, np.full(keep.sum(), NEGATIVE_WEIGHT)])
+            self._sgd_step(users, items, target, weight)
+
+    def _sgd_step(self, users, items, target, weight):
+        p, q = self.user_vectors[users], self.item_vectors[items]
+        predicted = self.global_mean + self.user_bias[users] + self.item_bias[items] + np.einsum("ij,ij->i", p, q)
+        error = weight * (target - predicted)
+        reg = self.regularization
+        # 同一用户或条目在一个批次中多次出现时取梯度平均，热门条目不会因样本多而步长过大
+        user_lr = self.learning_rate / np.bincount(users)[users]
+        item_lr = self.learning_rate / np.bincount(items)[items]
+        np.add.at(self.user_bias, users, user_lr * (error - reg * self.user_bias[users]))
+        np.add.at(self.item_bias, items, item_lr * (error - reg * self.item_bias[items]))
+        np.add.at(self.user_vectors, users, user_lr[:, None] * (error[:, None] * q - reg * p))
+        np.add.at(self.item_vectors, items, item_lr[:, None] * (error[:, None] * p - reg * q))
+
+    # ============ 在线调整 ============
+    def adjustments(self, user_ids, names=None):
+        """N 个用户对各条目的个性化推荐分调整量 (N, M)
+
+        names 给出时按名称对齐（模型中没有的条目为 0）；未知用户整行为 0。
+        只取用户向量与条目向量的内积（个人偏好），条目整体好坏由基础分与反馈汇总体现。
+        """
+        with self._lock:
+            rows = self._user_rows(user_ids, create=False)
+            known = rows >= 0
+            columns = np.arange(len(self.names)) if names is None else self._item_columns(names)
+            result = np.zeros((len(rows), len(columns)))
+            if not known.any():
+                return result
+            users = rows[known]
+            affinity = self.user_vectors[users] @ self.item_vectors[np.maximum(columns, 0)].T
+            counts = self._user_counts[users]
+            shrink = (counts / (counts + PRIOR_COUNT))[:, None]
+        adjustment = np.clip(ADJUSTMENT_PER_POINT * affinity * shrink, -MAX_ADJUSTMENT, MAX_ADJUSTMENT)
+        adjustment[:, columns < 0] = 0.0
+        result[known] = adjustment
+        return result
+
+    def adjustment_for(self, user_id, names=None):
+        """单个用户的调整量 (M,)"""
+        return self.adjustments([user_id], names)[0]
+
+    def __contains__(self, user_id):
+        return str(user_id) in self._user_position
+
+    # ============ 与模型文件同步 ============
+    def track_pending(self):
+        """开始记录尚未写盘的交互，用于文件被其他进程更新后重放（见 reload_from）"""
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+        return self
+
+    @property
+    def has_pending(self):
+        return bool(self._pending)
+
+    def reload_from(self, other):
+        """换成另一个模型（重新读取的文件）的参数，再重放本进程尚未写盘的交互；返回重放的批数
+
+        对象本身不变，持有它的页面与后台线程无需重新获取；version 递增，按版本缓存的结果随之失效。
+        """
+        with self._lock:
+            for name in ("names", "factors", "learning_rate", "regularization", "user_ids", "_user_position",
+                         "user_vectors", "user_bias", "item_vectors", "item_bias", "global_mean", "matrix",
+                         "_user_counts"):
+                setattr(self, name, getattr(other, name))
+            pending, self._pending = self._pending, ([] if self._pending is not None else None)
+            self.version += 1
+        for user_ids, items, visits, ratings, epochs in pending or []:
+            self.partial_fit(user_ids, items, visits, ratings, epochs)
+        return len(pending or [])
+
+    # ============ 持久化 ============
+    def save(self, path):
+        """写入 .npz：先写临时文件再替换，读取方不会读到写了一半的文件"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with self._lock, open(temp, "wb") as f:
+            n = self.n_users
+            np.savez_compressed(
+                f, names=np.array(self.names), user_ids=np.array(self.user_ids, dtype=str),
+                user_vectors=self.user_vectors[:n], user_bias=self.user_bias[:n],
+                item_vectors=self.item_vectors, item_bias=self.item_bias,
+                codes=self.matrix.codes, visits=self.matrix.visits, rating_sum=self.matrix.rating_sum,
+                rating_count=self.matrix.rating_count,
+                params=np.array([self.factors, self.learning_rate, self.regularization, self.global_mean]),
+            )
+            if self._pending is not None:
+                self._pending = []
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path, names=None):
+        """读取模型；给定 names 时按名称对齐条目，新条目随机初始化，已删除条目的交互丢弃"""
+        with np.load(path) as data:
+            factors, learning_rate, regularization, global_mean = data["params"]
+            saved_names = data["names"].tolist()
+            model = cls(saved_names if names is None else names, int(factors), float(learning_rate),
+                        float(regularization))
+            model.global_mean = float(global_mean)
+            model._user_rows(data["user_ids"].tolist(), create=True)
+            n = model.n_users
+            model.user_vectors[:n] = data["user_vectors"]
+            model.user_bias[:n] = data["user_bias"]
+
+            # 条目按名称对齐，交互单元编码随之重映射
+            columns = model._item_columns(saved_names)
+            kept = columns >= 0
+            model.item_vectors[columns[kept]] = data["item_vectors"][kept]
+            model.item_bias[columns[kept]] = data["item_bias"][kept]
+            codes = data["codes"]
+            users, items = codes // len(saved_names), codes % len(saved_names)
+            keep = kept[items]
+            new_codes = users[keep] * len(model.names) + columns[items[keep]]
+            order = np.argsort(new_codes, kind="stable")
+            model.matrix.codes = new_codes[order]
+            model.matrix.visits = data["visits"][keep][order]
+            model.matrix.rating_sum = data["rating_sum"][keep][order]
+            model.matrix.rating_count = data["rating_count"][keep][order]
+        model._user_counts[:n] = model.matrix.user_counts(n)
+        return model
+
+
+def load_or_empty(names, path=PREFERENCES_PATH):
+    """读取偏好模型并按名称对齐；文件不存在时返回空模型（所有用户调整量为 0）"""
+    if os.path.exists(path):
+        return PreferenceModel.load(path, names)
+    return PreferenceModel(names)
+
+
+def preferences_mtime(path=PREFERENCES_PATH):
+    """偏好模型文件的修改时间，不存在时为 None（用于判断是否需要重新读取）"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class PreferenceSaver:
+    """后台定期与模型文件同步：每 interval 秒检查一次，stop() 时再同步一次
+
+    文件被其他进程（如命令行重训）更新时先读取新文件，并重放本进程尚未写盘的交互，不会覆盖对方的结果；
+    本进程有未写盘的交互时才写盘。model 应是从 path 读取（或文件尚不存在时新建）的模型。
+    """
+
+    def __init__(self, model, path=PREFERENCES_PATH, interval=DEFAULT_SAVE_SECONDS):
+        self.model = model.track_pending()
+        self.path = path
+        self.interval = interval
+        self._file_mtime = preferences_mtime(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动保存线程（重复调用无副作用）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="preference-saver", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.save_if_changed()
+
+    def reload_if_changed(self):
+        """模型文件自上次读取或写入后被其他进程更新时重新读取，返回是否读取"""
+        mtime = preferences_mtime(self.path)
+        if mtime is None or mtime == self._file_mtime:
+            return False
+        self.model.reload_from(PreferenceModel.load(self.path, self.model.names))
+        self._file_mtime = mtime
+        return True
+
+    def save_if_changed(self):
+        """先同步文件的更新，本进程有未写盘的交互时再写盘，返回是否写入"""
+        self.reload_if_changed()
+        if not self.model.has_pending:
+            return False
+        self.model.save(self.path)
+        self._file_mtime = preferences_mtime(self.path)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save_if_changed()
+            except Exception:
+                # 保存失败时保留内存中的模型，下个周期重试
+                logger.exception("偏好模型保存失败")
+
+
+# ============ 命令行 ============
+def iter_visit_chunks(path, user_col="card", canteen_col="canteen", chunk_size=1_000_000):
+    """按块读取刷卡流水中的 (用户, 食堂) 两列"""
+    from ingest import iter_log_chunks
+
+    for chunk in iter_log_chunks(path, chunk_size, (user_col, canteen_col)):
+        yield chunk.dropna()
+
+
+def main(argv=None):
+    from catalog import CATALOG_PATH, load_catalog
+
+    parser = argparse.ArgumentParser(description="由刷卡到访与评分增量训练个性化偏好模型")
+    parser.add_argument("visits", nargs="*", help="刷卡流水（.csv / .parquet / .arrow），需含卡号与食堂列")
+    parser.add_argument("--ratings", help="评分 CSV，列为卡号列（同 --user-col）、canteen、rating（1-5）")
+    parser.add_argument("-o", "--output", default=PREFERENCES_PATH, help="模型输出路径（.npz）")
+    parser.add_argument("--update", action="store_true", help="在已有模型上增量更新")
+    parser.add_argument("--user-col", default="card", help="卡号列")
+    parser.add_argument("--canteen-col", default="canteen", help="食堂名称列")
+    parser.add_argument("--factors", type=int, default=DEFAULT_FACTORS, help="向量维数")
+    parser.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS, help="每批交互的 SGD 轮数")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录（.json / .toml / .csv）")
+    args = parser.parse_args(argv)
+    if not args.visits and not args.ratings:
+        parser.error("需要指定刷卡流水或 --ratings")
+
+    names = load_catalog(args.catalog).arrays.names
+    if args.update and os.path.exists(args.output):
+        model = PreferenceModel.load(args.output, names)
+    else:
+        model = PreferenceModel(names, factors=args.factors)
+
+    counted = 0
+    for path in args.visits:
+        for chunk in iter_visit_chunks(path, args.user_col, args.canteen_col):
+            counted += model.partial_fit(chunk[args.user_col].astype(str), chunk[args.canteen_col],
+                                         visits=np.ones(len(chunk)), epochs=args.epochs)
+    if args.ratings:
+        user, canteen = args.user_col, args.canteen_col
+        ratings = pd.read_csv(args.ratings, dtype={user: str}).dropna(subset=[user, canteen, "rating"])
+        counted += model.partial_fit(ratings[user], ratings[canteen],
+                                     ratings=ratings["rating"].clip(1, 5), epochs=args.epochs)
+    model.save(args.output)
+    print(f"计入 {counted} 条交互，共 {model.n_users} 位用户、{len(model.matrix)} 个非零单元", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
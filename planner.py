@@ -0,0 +1,172 @@
+# planner.py - 全天就餐规划：一次向量化扫描一天中的每个时段 × 每个食堂
+#
+# 把一天按 slot_minutes 切成 T 个时段，同一个用户画像复制成 T 个"就餐时间不同"的画像，
+# 交给 score_profiles 一次算出 T × M 的营业、时间因子、等待、拥挤度与推荐分矩阵，
+# 再从中挑出满足价格预算与最长等待的最佳 (食堂, 时间) 组合：每个食堂取 总等待、拥挤度 最低的时段，
+# 食堂之间按不含时间因子的推荐分排序（时间因子在高峰期放大推荐分，用它排序会把人推向高峰）。
+# 拥挤度与等待直接取当天的数据表，不加随机扰动，同样的输入总是得到同样的规划。
+from dataclasses import dataclass
+from datetime import time as clock_time
+
+import numpy as np
+import pandas as pd
+
+from scoring import build_profiles, score_profiles
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_SLOT_MINUTES = 1
+DEFAULT_TOP_K = 10
+CHUNK_CELLS = 2_000_000      # 每次交给 score_profiles 的 时段 × 食堂 单元数上限，限制临时内存
+
+
+@dataclass(frozen=True)
+class DayPlan:
+    """一天的规划网格，除 minutes / time_factor 为 (T,)、preference 为 (M,) 外均为 (T, M) 矩阵"""
+    minutes: np.ndarray        # 各时段起点（一天中的第几分钟）
+    time_factor: np.ndarray
+    preference: np.ndarray     # 不含时间因子的推荐分，与时段无关
+    eligible: np.ndarray       # 营业中且类型、价格符合
+    feasible: np.ndarray       # eligible 且 步行 + 排队 不超过最长等待
+    score: np.ndarray          # float32
+    wait: np.ndarray           # int16，排队分钟
+    walk: np.ndarray           # int16，步行分钟
+    crowd: np.ndarray          # int16，拥挤度百分比
+
+    @property
+    def total_wait(self):
+        return self.wait + self.walk
+
+    def best_per_canteen(self):
+        """各食堂最佳就餐时段：(时段下标 (M,), 推荐分 (M,))，可行时段中依次取总等待最短、拥挤度最低、时间最早
+
+        推荐分为不含时间因子的 preference；全天都不可行的食堂时段下标为 -1、推荐分为 -inf。
+        """
+        # 拥挤度不超过 100，按 总等待 * 128 + 拥挤度 合成一个整数比较
+        cost = np.where(self.feasible, self.total_wait.astype(np.int32) * 128 + self.crowd, np.iinfo(np.int32).max)
+        best_slot = cost.argmin(axis=0)
+        possible = self.feasible.any(axis=0)
+        best_slot[~possible] = -1
+        return best_slot, np.where(possible, self.preference, -np.inf)
+
+    def best_pairs(self, k=DEFAULT_TOP_K):
+        """推荐分（不含时间因子）最高的 k 个 (食堂下标, 时段下标)，每个食堂只取其最佳时段"""
+        best_slot, best_score = self.best_per_canteen()
+        cols = np.flatnonzero(best_slot >= 0)
+        total_wait = self.total_wait[best_slot[cols], cols]
+        order = np.lexsort((best_slot[cols], total_wait, -best_score[cols]))[:k]
+        return [(int(cols[i]), int(best_slot[cols[i]])) for i in order]
+
+    def best_by_slot(self):
+        """各时段推荐分最高的可行食堂：(食堂下标 (T,), 推荐分 (T,))，无可行食堂时为 (-1, -inf)"""
+        ranked = np.where(self.feasible, self.score, -np.inf)
+        best = ranked.argmax(axis=1)
+        score = ranked[np.arange(len(best)), best]
+        best[~np.isfinite(score)] = -1
+        return best, score
+
+
+def plan_slots(start=0, end=MINUTES_PER_DAY, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """[start, end) 内各时段的起点分钟"""
+    if slot_minutes < 1:
+        raise ValueError("时段长度至少为 1 分钟")
+    return np.arange(start, end, slot_minutes, dtype=np.int32)
+
+
+def plan_day(canteens, user_type, dining_purpose, price_range, max_wait_time, selected_types, weekday,
+             crowd, wait, adjustment=None, walk=None, start=0, end=MINUTES_PER_DAY,
+             slot_minutes=DEFAULT_SLOT_MINUTES, mask=None, factor=None):
+    """扫描 [start, end) 每个时段的推荐结果，返回 DayPlan
+
+    crowd / wait 为当天 (M, 1440) 的预测拥挤度与排队等待；walk 为 (M,) 或 (1, M) 步行分钟。
+    mask 为 (M,) 或 (T, M) 的附加筛选条件，如各时段有搜索菜品供应的食堂（见 menu.DishMatches.canteen_mask）。
+    factor 为当天 (1440,) 的每分钟时间因子（见 academic_calendar.DaySchedule），缺省按 TIME_FACTOR_RULES。
+    时段按行分块交给 score_profiles，整天 1440 分钟 × 上万食堂也不会一次占用过多内存。
+    """
+    minutes = plan_slots(start, end, slot_minutes)
+    n_slots, m = len(minutes), len(canteens)
+    profiles = build_profiles(
+        [user_type] * n_slots, [dining_purpose] * n_slots, minutes, [price_range] * n_slots,
+        [max_wait_time] * n_slots, [selected_types] * n_slots, weekday
+    )
+    walk = None if walk is None else np.asarray(walk, dtype=np.float64).reshape(1, m)
+    mask = None if mask is None else np.broadcast_to(mask, (n_slots, m))
+
+    shape = (n_slots, m)
+    time_factor = np.empty(n_slots)
+    eligible = np.empty(shape, dtype=bool)
+    feasible = np.empty(shape, dtype=bool)
+    score = np.empty(shape, dtype=np.float32)
+    queue_wait = np.empty(shape, dtype=np.int16)
+    walk_minutes = np.empty(shape, dtype=np.int16)
+    crowd_level = np.empty(shape, dtype=np.int16)
+
+    step = max(1, CHUNK_CELLS // max(m, 1))
+    for lo in range(0, n_slots, step):
+        rows = slice(lo, lo + step)
+        chunk = _slice_profiles(profiles, rows)
+        result = score_profiles(
+            canteens, chunk, crowd=crowd[:, chunk.minute].T, wait=wait[:, chunk.minute].T,
+            adjustment=adjustment, walk=walk, mask=None if mask is None else mask[rows],
+            factor=None if factor is None else factor[chunk.minute]
+        )
+        time_factor[rows] = result.time_factor
+        eligible[rows] = result.eligible
+        feasible[rows] = result.eligible & (result.total_wait <= max_wait_time)
+        score[rows] = result.score
+        queue_wait[rows] = result.wait
+        walk_minutes[rows] = result.walk
+        crowd_level[rows] = result.crowd
+
+    # 不含时间因子的推荐分与时段无关，用一个画像算一次
+    preference = score_profiles(
+        canteens, _slice_profiles(profiles, slice(0, 1)), crowd=np.zeros((1, m)), wait=np.zeros((1, m)),
+        adjustment=adjustment, walk=walk, factor=np.ones(1)
+    ).score[0].astype(np.float32)
+
+    return DayPlan(minutes=minutes, time_factor=time_factor, preference=preference, eligible=eligible,
+                   feasible=feasible, score=score, wait=queue_wait, walk=walk_minutes, crowd=crowd_level)
+
+
+def _slice_profiles(profiles, rows):
+    return type(profiles)(**{name: getattr(profiles, name)[rows] for name in profiles.__dataclass_fields__})
+
+
+# ============ 结果表 ============
+def _clock(minutes):
+    return [clock_time(int(m) // 60, int(m) % 60) for m in minutes]
+
+
+def plan_frame(canteens, plan, k=DEFAULT_TOP_K):
+    """最佳 (食堂, 时间) 组合表，按推荐分（不含时间因子）从高到低"""
+    pairs = plan.best_pairs(k)
+    cols = np.array([c for c, _ in pairs], dtype=np.int64)
+    slots = np.array([t for _, t in pairs], dtype=np.int64)
+    return pd.DataFrame({
+        "食堂名称": np.asarray(canteens.names, dtype=object)[cols],
+        "就餐时间": _clock(plan.minutes[slots]),
+        "推荐指数": plan.preference[cols],
+        "等待时间": plan.wait[slots, cols],
+        "步行时间": plan.walk[slots, cols],
+        "拥挤度": plan.crowd[slots, cols],
+    })
+
+
+def heatmap_frame(canteens, plan, rows=None):
+    """热力图用的长表：每个 营业中的 (食堂, 时段) 一行，只保留 rows 指定的食堂（默认全部）
+
+    列：食堂名称、分钟、时间、推荐指数、等待时间、步行时间、拥挤度、可行。
+    """
+    cols = np.arange(len(canteens)) if rows is None else np.asarray(rows, dtype=np.int64)
+    slot_index, col_index = np.nonzero(plan.eligible[:, cols])
+    cols = cols[col_index]
+    minutes = plan.minutes[slot_index]
+    return pd.DataFrame({
+        "食堂名称": np.asarray(canteens.names, dtype=object)[cols],
+        "分钟": minutes,
+        "时间": [f"{m // 60:02d}:{m % 60:02d}" for m in minutes.tolist()],
+        "推荐指数": plan.score[slot_index, cols],
+        "等待时间": plan.wait[slot_index, cols],
+        "步行时间": plan.walk[slot_index, cols],
+        "拥挤度": plan.crowd[slot_index, cols],
+        "可行": plan.feasible[slot_index, cols],
+    })
@@ -0,0 +1,99 @@
+# result_cache.py - 按归一化输入缓存推荐结果（LRU + TTL）
+#
+# 缓存键由身份、就餐目的、按时间桶取整后的计划时间、价格预算、
+# 最长等待和类型集合组成；随机扰动由键派生的种子生成，
+# 因此命中缓存与重新计算得到的结果完全一致。
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_BUCKET_MINUTES = 5
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL_SECONDS = 300
+
+
+def bucket_minute(minute, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """把一天中的分钟数向下取整到时间桶起点"""
+    return int(minute) // bucket_minutes * bucket_minutes
+
+
+def normalize_query(user_type, dining_purpose, minute, price_range, max_wait_time, selected_types,
+                    weekday=0, bucket_minutes=DEFAULT_BUCKET_MINUTES, origin=None):
+    """把推荐输入归一化为可哈希的缓存键；origin 为所在楼宇名称，None 表示不考虑位置"""
+    return (
+        user_type,
+        dining_purpose,
+        int(weekday),
+        bucket_minute(minute, bucket_minutes),
+        int(price_range[0]),
+        int(price_range[1]),
+        int(max_wait_time),
+        tuple(sorted(set(selected_types))),
+        origin,
+    )
+
+
+def seed_for_key(key):
+    """由缓存键派生稳定的随机种子（不受 PYTHONHASHSEED 影响）"""
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def rng_for_key(key):
+    """由缓存键派生的随机数生成器"""
+    return np.random.default_rng(seed_for_key(key))
+
+
+class ResultCache:
+    """线程安全的 LRU + TTL 缓存"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存值，否则调用 compute() 计算并写入
+
+        并发未命中时可能重复计算，但结果由键决定，写入哪一份都一样。
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,77 @@
+# results.py - 推荐结果表的构建与导出（不依赖 Streamlit，页面与基准测试共用）
+#
+# 结果表是带类型的列式表：价格、等待、步行、拥挤度为数值列，类型与状态为分类列，
+# 是否推荐为布尔列。"12分钟"、"67%" 这类文字只在页面显示时由列格式生成，
+# 统计直接对数值列计算；API 等下游可通过 Arrow 导出拿到同样的类型。
+import numpy as np
+import pandas as pd
+
+from scoring import CANTEEN_TYPES
+
+# ============ 拥挤度分级 ============
+CROWD_LEVELS = [
+    (30, "🟢 非常空闲", "#10B981"),
+    (50, "🟡 比较空闲", "#F59E0B"),
+    (70, "🟠 适中", "#F97316"),
+    (85, "🔴 拥挤", "#EF4444"),
+]
+CROWD_LEVEL_MAX = ("⚫ 非常拥挤", "#6B7280")
+CROWD_LABELS = [status for _, status, _ in CROWD_LEVELS] + [CROWD_LEVEL_MAX[0]]
+_CROWD_UPPER = np.array([upper for upper, _, _ in CROWD_LEVELS])
+
+# 推荐状态，按 不推荐 < 推荐 < 强烈推荐 排序
+RECOMMEND_LEVELS = ["⏳ 不推荐", "👍 推荐", "🏆 强烈推荐"]
+
+
+def crowd_codes(crowd):
+    """拥挤度（百分比）-> CROWD_LABELS 中的下标"""
+    return np.searchsorted(_CROWD_UPPER, crowd, side="right")
+
+
+# ============ 结果表 ============
+def result_frame(canteens, result, seat_occupancy, row=0):
+    """评分结果中第 row 个画像的推荐结果表，只包含符合条件的食堂
+
+    seat_occupancy 为 (M,) 座位占用率。价格单位为元，时间单位为分钟，拥挤度为百分比，
+    座位占用为 0-1 的比例。
+    """
+    cols = np.flatnonzero(result.eligible[row])
+    crowd = result.crowd[row, cols]
+    recommended = result.recommended[row, cols]
+    status = recommended.astype(np.int8) + result.strong[row, cols]
+    return pd.DataFrame({
+        "食堂名称": np.asarray(canteens.names, dtype=object)[cols],
+        "类型": pd.Categorical.from_codes(canteens.type_code[cols], CANTEEN_TYPES),
+        "最低价": canteens.price_min[cols],
+        "最高价": canteens.price_max[cols],
+        "座位数": canteens.seats[cols],
+        "推荐指数": result.score[row, cols],
+        "等待时间": result.wait[row, cols],
+        "步行时间": result.walk[row, cols],
+        "拥挤度": crowd,
+        "拥挤状态": pd.Categorical.from_codes(crowd_codes(crowd), CROWD_LABELS, ordered=True),
+        "座位占用": seat_occupancy[cols],
+        "推荐状态": pd.Categorical.from_codes(status, RECOMMEND_LEVELS, ordered=True),
+        "推荐": recommended,
+    })
+
+
+# ============ 导出 ============
+def to_arrow(frame):
+    """结果表 -> pyarrow.Table（分类列为字典编码），需要 pyarrow"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("导出 Arrow 需要安装 pyarrow") from None
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def arrow_ipc_bytes(frame):
+    """结果表 -> Arrow IPC 流格式的字节串"""
+    table = to_arrow(frame)
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,342 @@
+# scenarios.py - 情景推演：批量评估食堂目录的改动（提前营业、加座位、调价等）
+#
+# 情景文件（JSON）列出对目录的改动，每条改动针对一个食堂：
+#   {"canteen": "北一食堂（大众餐厅）", "open_earlier": 30}          营业时段开始提前 30 分钟
+#   {"canteen": "...", "close_later": 30}                           营业时段结束推迟 30 分钟
+#   {"canteen": "...", "add_seats": 100, "add_windows": 2}          增加座位 / 打饭窗口
+#   {"canteen": "...", "price_range": [10, 16]}                     其他字段直接替换（取值规则同目录）
+# 可带 "name" 作为情景名称。文件中的 "scenarios" 是命名情景列表（每个含若干 changes），
+# "axes" 是若干组互斥的改动，各组（每组另含"不改"）做笛卡尔积，例如 3 组 × 各 5 种改动得到 216 个情景。
+#
+# 每个情景在改动后的目录上运行高峰期仿真（见 simulator.py，同一批学生、同一种子，情景之间只差目录），
+# 按 情景 × 餐次 × 食堂 汇总推荐份额、平均排队与等座、座位利用率等指标。
+# 情景分发到进程池并行计算，结果写成 Parquet（需要 pyarrow，否则退回 CSV）。
+#
+# 用法：
+#   python scenarios.py data/scenarios.json -o scenarios.parquet --students 12000 --meals lunch dinner
+import argparse
+import copy
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from catalog import CATALOG_PATH, CatalogError, build_catalog, read_records, validate
+from forecast import FORECAST_PATH, load_or_prior
+from opening_hours import MINUTES_PER_DAY, WEEKDAY_NAMES, format_intervals, parse_schedule
+from scoring import default_windows
+from shared_state import build_day_tables
+from simulator import (
+    DEFAULT_SEED, DEFAULT_STUDENTS, DEFAULT_WEEKDAY, MEAL_WINDOWS, POLICIES, generate_students, simulate
+)
+
+SCENARIOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "scenarios.json")
+BASELINE = "现状"
+ADJUSTMENTS = ("open_earlier", "close_later", "add_seats", "add_windows")
+KEY_COLUMNS = ["scenario_id", "scenario", "meal", "canteen"]
+METRIC_COLUMNS = ["students", "served", "unserved", "share", "mean_queue_wait", "mean_seat_wait", "mean_walk", "seat_utilization",
+                  "peak_seat_utilization", "max_queue"]
+
+logger = logging.getLogger(__name__)
+
+
+class ScenarioError(ValueError):
+    """情景文件格式或取值有误"""
+
+
+# ============ 改动 ============
+def _shift_hours(hours, earlier, later):
+    """营业时间的每个时段开始提前 earlier 分钟、结束推迟 later 分钟，返回按星期的字典"""
+    shifted = {}
+    for day, intervals in parse_schedule(hours).items():
+        spans = []
+        for start, end in intervals:
+            length = (end - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+            if length + earlier + later >= MINUTES_PER_DAY:
+                spans.append((0, MINUTES_PER_DAY))
+                continue
+            new_start = (start - earlier) % MINUTES_PER_DAY
+            new_end = (end + later) % MINUTES_PER_DAY or MINUTES_PER_DAY
+            spans.append((new_start, new_end))
+        shifted[WEEKDAY_NAMES[day]] = format_intervals(spans)
+    return shifted
+
+
+def describe_change(change):
+    """改动的默认名称，如 "北一食堂（大众餐厅） 提前 30 分钟营业" """
+    parts = []
+    for key, value in change.items():
+        if key in ("canteen", "name"):
+            continue
+        if key == "open_earlier":
+            parts.append(f"提前 {value} 分钟营业")
+        elif key == "close_later":
+            parts.append(f"推迟 {value} 分钟打烊")
+        elif key == "add_seats":
+            parts.append(f"座位 {value:+d}")
+        elif key == "add_windows":
+            parts.append(f"窗口 {value:+d}")
+        else:
+            parts.append(f"{key}={json.dumps(value, ensure_ascii=False)}")
+    return f"{change.get('canteen', '?')} {'、'.join(parts)}"
+
+
+def apply_changes(records, changes):
+    """把改动应用到目录记录的副本上，返回新记录列表；取值是否合法由 catalog.validate 检查"""
+    records = copy.deepcopy(records)
+    by_name = {record["name"]: record for record in records}
+    for change in changes:
+        record = by_name[change["canteen"]]
+        for key, value in change.items():
+            if key in ("canteen", "name"):
+                continue
+            if key == "add_seats":
+                record["seats"] = record["seats"] + value
+            elif key == "add_windows":
+                record["windows"] = record.get("windows", default_windows(record["seats"])) + value
+            elif key not in ("open_earlier", "close_later"):
+                record[key] = value
+        earlier, later = change.get("open_earlier", 0), change.get("close_later", 0)
+        if earlier or later:
+            record["opening_hours"] = _shift_hours(record["opening_hours"], earlier, later)
+    return records
+
+
+def _check_change(change, names, where, problems):
+    if not isinstance(change, dict):
+        problems.append(f"{where}: 改动必须是对象")
+        return
+    if change.get("canteen") not in names:
+        problems.append(f"{where}: 未知的食堂 {change.get('canteen')!r}")
+    for key, value in change.items():
+        if key in ADJUSTMENTS and not (isinstance(value, int) and not isinstance(value, bool)):
+            problems.append(f"{where}: {key} 必须是整数（分钟或个数）")
+    if "name" in change and not isinstance(change["name"], str):
+        problems.append(f"{where}: name 是改动的名称，必须是字符串")
+    if len(change) <= 1 + ("name" in change):
+        problems.append(f"{where}: 没有任何改动")
+
+
+# ============ 情景 ============
+def expand_scenarios(spec, records):
+    """情景文件 -> [(名称, 改动列表)]，第一个是现状；名称重复、改动无效时抛出 ScenarioError（列出所有问题）"""
+    if not isinstance(spec, dict):
+        raise ScenarioError("情景文件必须是包含 scenarios 和/或 axes 的对象")
+    names = {record["name"] for record in records}
+    problems = []
+    scenarios = [(BASELINE, [])]
+
+    named = spec.get("scenarios", [])
+    if not isinstance(named, list):
+        problems.append("scenarios 必须是列表")
+        named = []
+    for i, scenario in enumerate(named):
+        where = f"第 {i + 1} 个情景"
+        if not (isinstance(scenario, dict) and isinstance(scenario.get("changes"), list) and scenario["changes"]):
+            problems.append(f"{where}: 必须包含非空的 changes 列表")
+            continue
+        for change in scenario["changes"]:
+            _check_change(change, names, where, problems)
+        label = scenario.get("name") or " + ".join(
+            c.get("name") or describe_change(c) for c in scenario["changes"] if isinstance(c, dict)
+        )
+        scenarios.append((label, scenario["changes"]))
+
+    axes = spec.get("axes", [])
+    if not (isinstance(axes, list) and all(isinstance(axis, list) and axis for axis in axes)):
+        problems.append("axes 必须是非空改动列表的列表")
+        axes = []
+    for k, axis in enumerate(axes):
+        for j, change in enumerate(axis):
+            _check_change(change, names, f"第 {k + 1} 组第 {j + 1} 个改动", problems)
+    if problems:
+        raise ScenarioError("情景文件校验失败：\n" + "\n".join(problems))
+
+    # 每组多一个"不改"选项；全部不改即现状，已在列表开头
+    for combo in itertools.product(*[[None] + axis for axis in axes]):
+        changes = [change for change in combo if change is not None]
+        if changes:
+            scenarios.append((" + ".join(c.get("name") or describe_change(c) for c in changes), changes))
+
+    seen, duplicates = set(), set()
+    for label, _ in scenarios:
+        (duplicates if label in seen else seen).add(label)
+    if duplicates:
+        raise ScenarioError(f"情景名称重复：{sorted(duplicates)}")
+
+    # 先在主进程里把每个情景的目录校验一遍，避免进程池中途失败
+    for label, changes in scenarios[1:]:
+        try:
+            validate(apply_changes(records, changes))
+        except CatalogError as exc:
+            problems.append(f"情景 {label}: {exc}")
+    if problems:
+        raise ScenarioError("情景改动后的目录无效：\n" + "\n".join(problems))
+    return scenarios
+
+
+# ============ 评估 ============
+_WORKER = {}
+
+
+def _init_worker(records, buildings, forecast_path, settings):
+    """进程池初始化：每个进程只准备一次基础目录与预测器"""
+    base = build_catalog(records, buildings)
+    _WORKER.update(records=records, buildings=buildings, settings=settings,
+                   forecaster=load_or_prior(base.arrays, forecast_path))
+
+
+def _meal_metrics(canteens, result, meal):
+    """一次仿真 -> 各食堂的指标列（长度 M）；平均排队、等座与步行只统计打上饭的学生"""
+    m = len(canteens)
+    students = np.bincount(result.choice[result.choice >= 0], minlength=m)
+    served = result.served
+    choice = result.choice[served]
+    served_count = np.bincount(choice, minlength=m)
+
+    def mean_by_canteen(values):
+        total = np.bincount(choice, weights=values[served], minlength=m)
+        return np.divide(total, served_count, out=np.full(m, np.nan), where=served_count > 0)
+
+    start, end, _ = MEAL_WINDOWS[meal]
+    window = (result.minutes >= start) & (result.minutes < end)
+    utilization = result.seats_used[:, window] / np.maximum(result.seats, 1)[:, None]
+    return {
+        "students": students,
+        "served": served_count,
+        "unserved": students - served_count,
+        "share": students / max(len(result.choice), 1),
+        "mean_queue_wait": mean_by_canteen(result.queue_wait),
+        "mean_seat_wait": mean_by_canteen(result.seat_wait),
+        "mean_walk": mean_by_canteen(result.walk),
+        "seat_utilization": utilization.mean(axis=1) if window.any() else np.zeros(m),
+        "peak_seat_utilization": result.seats_used.max(axis=1, initial=0) / np.maximum(result.seats, 1),
+        "max_queue": result.queue_length.max(axis=1, initial=0),
+    }
+
+
+def evaluate_scenario(task):
+    """在一个情景下按各餐次仿真，返回列字典（行 = 餐次 × 食堂）"""
+    scenario_id, label, changes = task
+    settings = _WORKER["settings"]
+    catalog = build_catalog(apply_changes(_WORKER["records"], changes), _WORKER["buildings"])
+    canteens, walking = catalog.arrays, catalog.walking
+    # 预测拥挤度按名称对齐基础目录，情景只改变营业时间与容量，排队估计随之重算
+    day_tables = build_day_tables(canteens, _WORKER["forecaster"], settings["weekday"])
+    columns = {}
+    for meal in settings["meals"]:
+        students = generate_students(settings["students"], walking, meal, settings["seed"], settings["weekday"])
+        result = simulate(canteens, walking, students, settings["policy"], day_tables, settings["seed"])
+        metrics = _meal_metrics(canteens, result, meal)
+        metrics.update(scenario_id=np.full(len(canteens), scenario_id), scenario=[label] * len(canteens),
+                       meal=[meal] * len(canteens), canteen=list(canteens.names))
+        for key, values in metrics.items():
+            columns.setdefault(key, []).extend(np.asarray(values).tolist())
+    return columns
+
+
+def run_scenarios(scenarios, records, buildings=(), students=DEFAULT_STUDENTS, meals=("lunch",), policy="forecast",
+                  seed=DEFAULT_SEED, weekday=DEFAULT_WEEKDAY, workers=None, forecast_path=FORECAST_PATH):
+    """并行评估全部情景，返回长表 DataFrame（情景 × 餐次 × 食堂）；workers=1 时在本进程内顺序计算"""
+    if policy not in POLICIES:
+        raise ValueError(f"未知的策略: {policy}")
+    unknown = sorted(set(meals) - set(MEAL_WINDOWS))
+    if unknown:
+        raise ValueError(f"未知的餐次: {unknown}")
+    settings = {"students": students, "meals": list(meals), "policy": policy, "seed": seed, "weekday": weekday}
+    init_args = (records, list(buildings), forecast_path, settings)
+    tasks = [(i, label, changes) for i, (label, changes) in enumerate(scenarios)]
+    if workers == 1:
+        _init_worker(*init_args)
+        parts = [evaluate_scenario(task) for task in tasks]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            parts = list(pool.map(evaluate_scenario, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    frame = pd.DataFrame({key: [v for part in parts for v in part[key]] for key in KEY_COLUMNS + METRIC_COLUMNS})
+    for column in ("scenario", "meal", "canteen"):
+        frame[column] = frame[column].astype("category")
+    return frame.astype({"scenario_id": np.int32, "students": np.int32, "served": np.int32, "unserved": np.int32,
+                         "max_queue": np.int32})
+
+
+def summarize(frame):
+    """每个情景的总体指标（按打上饭的学生人数加权），附与现状的差值"""
+    weighted = frame.assign(
+        queue_total=frame["mean_queue_wait"].fillna(0) * frame["served"],
+        walk_total=frame["mean_walk"].fillna(0) * frame["served"],
+    )
+    totals = weighted.groupby(["scenario_id", "scenario"], observed=True).agg(
+        students=("students", "sum"), served=("served", "sum"), unserved=("unserved", "sum"),
+        queue_total=("queue_total", "sum"), walk_total=("walk_total", "sum"),
+        max_queue=("max_queue", "max"), peak_seat_utilization=("peak_seat_utilization", "max"),
+    ).reset_index()
+    totals["mean_queue_wait"] = totals["queue_total"] / totals["served"].clip(lower=1)
+    totals["mean_walk"] = totals["walk_total"] / totals["served"].clip(lower=1)
+    baseline = totals.loc[totals["scenario_id"] == 0, "mean_queue_wait"]
+    totals["queue_wait_change"] = totals["mean_queue_wait"] - (baseline.iloc[0] if len(baseline) else np.nan)
+    return totals.drop(columns=["queue_total", "walk_total"]).sort_values("scenario_id", ignore_index=True)
+
+
+# ============ 输出 ============
+def write_results(frame, path):
+    """写成 Parquet（.parquet）或 CSV；没有 pyarrow 时 Parquet 退回同名 .csv，返回实际写入的路径"""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            frame.to_parquet(path, index=False, compression="zstd")
+            return path
+        except ImportError:
+            path = os.path.splitext(path)[0] + ".csv"
+            logger.warning("未安装 pyarrow，结果改写为 CSV：%s", path)
+    frame.to_csv(path, index=False)
+    return path
+
+
+def load_spec(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise ScenarioError(f"无法读取情景文件 {path}: {exc}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量推演食堂目录改动对推荐份额、排队与座位的影响")
+    parser.add_argument("spec", nargs="?", default=SCENARIOS_PATH, help="情景文件（JSON）")
+    parser.add_argument("-o", "--output", default="scenarios.parquet", help="结果文件（.parquet / .csv）")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="基础食堂目录")
+    parser.add_argument("--students", type=int, default=DEFAULT_STUDENTS, help="每餐仿真学生人数")
+    parser.add_argument("--meals", nargs="+", choices=sorted(MEAL_WINDOWS), default=["lunch"], help="仿真的餐次")
+    parser.add_argument("--policy", choices=POLICIES, default="forecast", help="学生选择食堂的策略")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子（各情景共用）")
+    parser.add_argument("--weekday", type=int, default=DEFAULT_WEEKDAY, help="星期（0 表示周一）")
+    parser.add_argument("--workers", type=int, help="进程数，缺省为 CPU 核数")
+    parser.add_argument("--top", type=int, default=10, help="打印排队改善最多的前 N 个情景")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    _, records, buildings = read_records(args.catalog)
+    scenarios = expand_scenarios(load_spec(args.spec), records)
+    started = time.perf_counter()
+    frame = run_scenarios(scenarios, records, buildings, args.students, args.meals, args.policy, args.seed,
+                          args.weekday, args.workers)
+    path = write_results(frame, args.output)
+    elapsed = time.perf_counter() - started
+    print(f"{len(scenarios)} 个情景 × {len(args.meals)} 餐，用时 {elapsed:.1f} 秒，结果写入 {path}", file=sys.stderr)
+
+    totals = summarize(frame)
+    for row in totals.sort_values("queue_wait_change").head(args.top).itertuples():
+        print(f"{row.queue_wait_change:+7.2f} 分钟  平均排队 {row.mean_queue_wait:6.2f}  最长队伍 {row.max_queue:5d}  "
+              f"座位峰值 {row.peak_seat_utilization:.0%}  {row.scenario}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
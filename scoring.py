@@ -0,0 +1,271 @@
+# scoring.py - 向量化批量推荐评分引擎（不依赖 Streamlit）
+#
+# 食堂属性以列式 NumPy 数组保存，一次向量化计算即可得到
+# N 个用户画像 × M 个食堂的评分矩阵，规则与页面上的推荐算法一致。
+from dataclasses import dataclass
+
+import numpy as np
+
+from opening_hours import OpeningHoursIndex
+
+# ============ 取值范围 ============
+USER_TYPES = ["本科生", "研究生", "教师", "留学生", "访客"]
+DINING_PURPOSES = ["日常快速就餐", "朋友聚餐", "学习讨论", "改善伙食", "约会用餐", "招待访客"]
+CANTEEN_TYPES = ["大众食堂", "风味食堂", "清真食堂", "快餐食堂", "自助食堂", "教工食堂", "美食广场", "夜宵食堂"]
+
+# 名称标签：加载时对食堂名称做一次子串匹配，之后只按布尔数组计算
+NAME_TAGS = ["教工", "清真", "夜宵", "美食", "快餐", "大众"]
+
+# ============ 评分参数 ============
+MIN_SCORE = 1.0
+MAX_SCORE = 10.0
+RECOMMEND_SCORE = 6.5
+STRONG_RECOMMEND_SCORE = 8.0
+
+BASE_WAIT = 10
+MIN_WAIT, MAX_WAIT = 3, 40
+WAIT_NOISE = (-2, 5)
+
+BASE_CROWD = 50
+MIN_CROWD, MAX_CROWD = 10, 95
+CROWD_NOISE = (-10, 15)
+
+# 时间因子：(时间窗列表, 因子)，按顺序匹配，区间两端均包含
+TIME_FACTOR_RULES = [
+    ([(11 * 60 + 40, 12 * 60 + 30), (17 * 60 + 40, 18 * 60 + 30)], 1.8),  # 高峰期
+    ([(11 * 60, 11 * 60 + 40), (17 * 60, 17 * 60 + 40)], 1.3),            # 高峰期前奏
+    ([(12 * 60 + 30, 13 * 60), (18 * 60 + 30, 19 * 60)], 1.1),            # 高峰期尾声
+]
+OFF_PEAK_FACTOR = 1.0
+PEAK_FACTOR_THRESHOLD = 1.5
+
+DEFAULT_SERVICE_MINUTES = 0.6
+
+# 步行时间：超出 FREE_WALK_MINUTES 的部分每分钟扣 WALK_PENALTY_PER_MINUTE 分，最多扣 MAX_WALK_PENALTY
+FREE_WALK_MINUTES = 3
+WALK_PENALTY_PER_MINUTE = 0.15
+MAX_WALK_PENALTY = 2.0
+
+
+# ============ 数据结构 ============
+def default_windows(seats):
+    """目录未给出 windows 时的打饭窗口数：每 50 个座位一个"""
+    return max(1, seats // 50)
+
+
+@dataclass(frozen=True)
+class CanteenArrays:
+    """食堂属性的列式（struct-of-arrays）表示，长度均为 M"""
+    names: list
+    type_code: np.ndarray      # 在 CANTEEN_TYPES 中的下标
+    price_min: np.ndarray
+    price_max: np.ndarray
+    base_score: np.ndarray
+    seats: np.ndarray
+    windows: np.ndarray        # 打饭窗口数
+    service_minutes: np.ndarray  # 每个窗口服务一人的平均分钟数
+    tags: dict                 # 标签 -> 布尔数组
+    hours: OpeningHoursIndex   # 营业位图
+    coords: np.ndarray         # (M, 2) 平面坐标（米），未标注为 NaN
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_db(cls, db):
+        """由 名称 -> 食堂信息 的字典（见 catalog.py）构建"""
+        names = list(db)
+        infos = [db[name] for name in names]
+        unknown = {info["type"] for info in infos} - set(CANTEEN_TYPES)
+        if unknown:
+            raise ValueError(f"未知的食堂类型: {sorted(unknown)}")
+        return cls(
+            names=names,
+            type_code=np.array([CANTEEN_TYPES.index(info["type"]) for info in infos], dtype=np.int16),
+            price_min=np.array([info["price_range"][0] for info in infos], dtype=np.float64),
+            price_max=np.array([info["price_range"][1] for info in infos], dtype=np.float64),
+            base_score=np.array([info["base_score"] for info in infos], dtype=np.float64),
+            seats=np.array([info["seats"] for info in infos], dtype=np.int32),
+            windows=np.array([info.get("windows", default_windows(info["seats"])) for info in infos], dtype=np.int32),
+            service_minutes=np.array([info.get("service_minutes", DEFAULT_SERVICE_MINUTES) for info in infos],
+                                     dtype=np.float64),
+            tags={tag: np.array([tag in name for name in names], dtype=bool) for tag in NAME_TAGS},
+            hours=OpeningHoursIndex.from_hours([info["opening_hours"] for info in infos]),
+            coords=np.array([info.get("coords") or (np.nan, np.nan) for info in infos], dtype=np.float64)
+            .reshape(-1, 2),
+        )
+
+
+@dataclass(frozen=True)
+class ProfileBatch:
+    """N 个用户画像（查询）的列式表示"""
+    user_type: np.ndarray      # 在 USER_TYPES 中的下标
+    purpose: np.ndarray        # 在 DINING_PURPOSES 中的下标
+    minute: np.ndarray         # 计划就餐时间（一天中的第几分钟）
+    weekday: np.ndarray        # 星期几，0 表示周一
+    price_lo: np.ndarray
+    price_hi: np.ndarray
+    max_wait: np.ndarray
+    type_mask: np.ndarray      # (N, len(CANTEEN_TYPES)) 布尔矩阵
+
+    def __len__(self):
+        return len(self.minute)
+
+
+@dataclass(frozen=True)
+class ScoreResult:
+    """评分结果，除 time_factor 为 (N,) 外均为 (N, M) 矩阵"""
+    eligible: np.ndarray
+    score: np.ndarray
+    wait: np.ndarray           # 排队等待（分钟）
+    walk: np.ndarray           # 步行时间（分钟），未给出位置时为 0
+    total_wait: np.ndarray     # 步行 + 排队
+    crowd: np.ndarray
+    recommended: np.ndarray
+    strong: np.ndarray
+    time_factor: np.ndarray
+
+
+def build_profiles(user_types, purposes, minutes, price_ranges, max_waits, type_sets, weekdays=0):
+    """由逐列序列构建 ProfileBatch，未知身份或目的会抛出 ValueError"""
+    user_code = {name: i for i, name in enumerate(USER_TYPES)}
+    purpose_code = {name: i for i, name in enumerate(DINING_PURPOSES)}
+    try:
+        user_type = np.array([user_code[u] for u in user_types], dtype=np.int16)
+        purpose = np.array([purpose_code[p] for p in purposes], dtype=np.int16)
+    except KeyError as exc:
+        raise ValueError(f"未知的身份或就餐目的: {exc.args[0]}") from None
+
+    prices = np.asarray(price_ranges, dtype=np.float64).reshape(-1, 2)
+    type_mask = np.zeros((len(user_type), len(CANTEEN_TYPES)), dtype=bool)
+    for i, types in enumerate(type_sets):
+        for t in types:
+            if t in CANTEEN_TYPES:
+                type_mask[i, CANTEEN_TYPES.index(t)] = True
+
+    minute = np.asarray(minutes, dtype=np.int32)
+    return ProfileBatch(
+        user_type=user_type,
+        purpose=purpose,
+        minute=minute,
+        weekday=np.broadcast_to(np.asarray(weekdays, dtype=np.int8), minute.shape),
+        price_lo=prices[:, 0],
+        price_hi=prices[:, 1],
+        max_wait=np.asarray(max_waits, dtype=np.float64),
+        type_mask=type_mask,
+    )
+
+
+def single_profile(user_type, dining_purpose, minute, price_range, max_wait_time, selected_types, weekday=0):
+    """构建只含一个画像的 ProfileBatch"""
+    return build_profiles(
+        [user_type], [dining_purpose], [minute], [price_range], [max_wait_time], [selected_types], [weekday]
+    )
+
+
+# ============ 规则 ============
+def time_factor(minutes):
+    """按一天中的分钟数计算时间因子（向量化）"""
+    m = np.asarray(minutes)
+    conditions = [
+        np.logical_or.reduce([(m >= start) & (m <= end) for start, end in windows])
+        for windows, _ in TIME_FACTOR_RULES
+    ]
+    return np.select(conditions, [factor for _, factor in TIME_FACTOR_RULES], OFF_PEAK_FACTOR)
+
+
+def _randint(rng, low, high, shape):
+    if rng is None:
+        return np.random.randint(low, high, size=shape)
+    return rng.integers(low, high, size=shape)
+
+
+def score_profiles(canteens, profiles, rng=None, crowd=None, wait=None, adjustment=None, walk=None, mask=None,
+                   factor=None):
+    """一次向量化计算 N 个画像 × M 个食堂的推荐结果
+
+    rng 为 numpy Generator 时使用它产生扰动，否则使用全局随机状态。
+    crowd 为 (N, M) 的预测拥挤度时直接采用，等待时间按预测与经验拥挤度之比
+    缩放，不再加随机扰动；同时给出 wait（如排队模型估计）时等待时间直接采用。
+    adjustment 为 (M,) 或 (N, M) 的推荐分调整量（如用户反馈汇总），叠加在基础分数上。
+    walk 为 (N, M) 步行分钟时按距离扣分，且"最长等待"按 步行 + 排队 的总时间判断。
+    mask 为 (M,) 或 (N, M) 的附加筛选条件（如菜品搜索命中的食堂，见 menu.py），与其他过滤条件取交集。
+    factor 为 (N,) 时间因子（如按校历编译的当天作息，见 academic_calendar.py），缺省按 TIME_FACTOR_RULES 计算。
+    """
+    shape = (len(profiles), len(canteens))
+    tags = canteens.tags
+    user_type = profiles.user_type[:, None]
+    purpose = profiles.purpose[:, None]
+    price_lo = profiles.price_lo[:, None]
+    price_hi = profiles.price_hi[:, None]
+
+    # 类型、价格、营业时间过滤
+    eligible = profiles.type_mask[:, canteens.type_code]
+    eligible &= ~((canteens.price_min > price_hi) | (canteens.price_max < price_lo))
+    eligible &= canteens.hours.is_open(profiles.minute, profiles.weekday)
+    if mask is not None:
+        eligible &= mask
+
+    # 基础分数与价格调整
+    score = np.broadcast_to(canteens.base_score, shape).copy()
+    if adjustment is not None:
+        score += adjustment
+    avg_price = (canteens.price_min + canteens.price_max) / 2
+    score -= np.where(avg_price > price_hi, 1.5, np.where(avg_price > (price_lo + price_hi) / 2, 0.5, 0.0))
+
+    # 用户身份调整
+    score += 1.0 * ((user_type == USER_TYPES.index("教师")) & tags["教工"])
+    score += 1.0 * ((user_type == USER_TYPES.index("留学生")) & tags["清真"])
+
+    # 就餐目的调整
+    score += 1.0 * ((purpose == DINING_PURPOSES.index("学习讨论")) & tags["教工"])
+    score += 1.0 * ((purpose == DINING_PURPOSES.index("朋友聚餐")) & (tags["夜宵"] | tags["美食"]))
+    score += 0.8 * ((purpose == DINING_PURPOSES.index("日常快速就餐")) & tags["快餐"])
+
+    # 时间因子调整
+    factor = time_factor(profiles.minute) if factor is None else np.asarray(factor, dtype=np.float64)
+    score *= factor[:, None]
+
+    # 步行距离调整
+    if walk is None:
+        walk = np.zeros(shape, dtype=np.int16)
+    else:
+        walk = np.broadcast_to(np.asarray(walk, dtype=np.float64), shape)
+        score -= np.minimum(WALK_PENALTY_PER_MINUTE * np.clip(walk - FREE_WALK_MINUTES, 0.0, None), MAX_WALK_PENALTY)
+        walk = np.ceil(walk).astype(np.int16)
+    score = np.clip(score, MIN_SCORE, MAX_SCORE)
+
+    # 经验等待时间与拥挤度
+    base_wait = np.where(factor > PEAK_FACTOR_THRESHOLD, BASE_WAIT * 1.8, BASE_WAIT)[:, None]
+    base_wait = base_wait * np.where(tags["快餐"], 0.7, 1.0) * np.where(tags["大众"], 1.3, 1.0)
+    base_crowd = (BASE_CROWD * factor)[:, None]
+    base_crowd = base_crowd * np.where(tags["教工"], 0.7, 1.0) * np.where(tags["大众"], 1.3, 1.0)
+
+    if crowd is None:
+        wait = base_wait + _randint(rng, *WAIT_NOISE, shape)
+        crowd = base_crowd + _randint(rng, *CROWD_NOISE, shape)
+    else:
+        crowd = np.broadcast_to(np.asarray(crowd, dtype=np.float64), shape)
+        if wait is None:
+            wait = base_wait * crowd / np.clip(base_crowd, MIN_CROWD, MAX_CROWD)
+        else:
+            wait = np.broadcast_to(np.asarray(wait, dtype=np.float64), shape)
+    wait = np.clip(np.trunc(wait), MIN_WAIT, MAX_WAIT).astype(np.int16)
+    crowd = np.clip(np.trunc(crowd), MIN_CROWD, MAX_CROWD).astype(np.int16)
+
+    # 推荐状态
+    total_wait = wait + walk
+    recommended = (score >= RECOMMEND_SCORE) & (total_wait <= profiles.max_wait[:, None])
+    strong = recommended & (score >= STRONG_RECOMMEND_SCORE)
+
+    return ScoreResult(
+        eligible=eligible,
+        score=score,
+        wait=wait,
+        walk=walk,
+        total_wait=total_wait,
+        crowd=crowd,
+        recommended=recommended,
+        strong=strong,
+        time_factor=factor,
+    )
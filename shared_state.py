@@ -0,0 +1,335 @@
+# shared_state.py - 进程级共享推荐状态与后台刷新
+#
+# 所有会话共用一份当天的 拥挤度 / 等待 / 营业 数据，由单个后台线程按固定节拍刷新；
+# 若接入反馈库，每隔若干节拍把评分汇总为各食堂的推荐分调整量；
+# 若接入食堂目录，每个节拍检查目录文件，更新后按新目录重建全部数据表；
+# 校历（见 academic_calendar.py）文件更新时同样重新加载，快照带上当天编译好的作息。
+# 若接入实时进出事件（见 live_occupancy.py），当前分钟实测拥挤度与预测的偏差叠加到之后的
+# LIVE_HORIZON_MINUTES 分钟（线性衰减），并据此重算当天的排队估计。
+# 每次刷新生成一个新的不可变快照（数组只读）并整体替换引用，
+# 会话读取快照不需要加锁，只需做筛选和格式化。
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from academic_calendar import CALENDAR_PATH, CalendarError, calendar_mtime, load_calendar
+from forecast import FORECAST_PATH, load_or_prior
+from queueing import estimate_from_crowd
+from result_cache import rng_for_key
+from scoring import build_profiles, score_profiles
+
+DEFAULT_TICK_SECONDS = 30
+DEFAULT_AGGREGATE_EVERY = 10
+LIVE_HORIZON_MINUTES = 60
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """某一时刻的共享状态，创建后不再修改"""
+    version: int
+    created_at: datetime
+    canteens: object            # CanteenArrays
+    catalog: object             # Catalog（未接入目录时为 None）
+    forecaster: object          # CrowdForecaster，非当天的数据表按它生成
+    weekday: int
+    data_version: tuple         # 当天数据表与推荐分调整量的版本，数据变化时才变化
+    crowd: np.ndarray           # (M, 1440) 预测拥挤度
+    queue: object               # QueueEstimate，(M, 1440)
+    open_mask: np.ndarray       # (M, 1440) 营业位图
+    minute: int                 # 刷新时的分钟
+    crowd_now: np.ndarray       # (M,)
+    wait_now: np.ndarray        # (M,)
+    open_now: np.ndarray        # (M,)
+    score_adjustment: np.ndarray  # (M,) 反馈汇总得到的推荐分调整量
+    day: object                 # DaySchedule，当天按校历编译的作息
+    live: np.ndarray            # (M,) 当前拥挤度来自实时事件的食堂
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+def build_day_tables(canteens, forecaster, weekday):
+    """某天每分钟的 (拥挤度, 排队估计, 营业位图)，数组均只读"""
+    crowd = forecaster.day_profile(weekday)
+    open_mask = canteens.hours.minute_mask(weekday)
+    queue = estimate_from_crowd(canteens, crowd, open_mask)
+    for array in (crowd, open_mask, queue.arrival_rate, queue.utilization, queue.wait, queue.seat_occupancy):
+        _readonly(array)
+    return crowd, queue, open_mask
+
+
+class SharedState:
+    """持有最新快照；refresh() 由后台线程定时调用"""
+
+    def __init__(self, canteens=None, forecaster=None, tick_seconds=DEFAULT_TICK_SECONDS, clock=datetime.now,
+                 forecast_path=FORECAST_PATH, feedback_store=None, aggregate_every=DEFAULT_AGGREGATE_EVERY,
+                 catalog_store=None, calendar_path=CALENDAR_PATH, live=None):
+        self.catalog_store = catalog_store
+        self.catalog = catalog_store.catalog if catalog_store is not None else None
+        if self.catalog is not None:
+            canteens = self.catalog.arrays
+        self.canteens = canteens
+        self.forecaster = forecaster or load_or_prior(canteens, forecast_path)
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self.forecast_path = forecast_path
+        self.feedback_store = feedback_store
+        self.aggregate_every = aggregate_every
+        self.calendar_path = calendar_path
+        self.calendar = load_calendar(calendar_path)
+        self._calendar_version = 0
+        self.live = live
+        self._live_delta = None
+        self._live_tables = None
+        self._live_version = 0
+        self._today = None
+        self._ticks = 0
+        self._adjustment = _readonly(np.zeros(len(canteens)))
+        self._adjustment_version = 0
+        self._forecast_mtime = self._mtime()
+        self._generation = 0
+        self._day_cache = {}
+        # 刷新与 _day_cache 的读写共用一把锁；可重入，刷新过程中也要经 _tables 取当天数据表
+        self._refresh_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshot = None
+        self.refresh()
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.forecast_path)
+        except OSError:
+            return None
+
+    def _version(self, weekday):
+        """某天数据的版本：(星期, 预测器重载次数, 预测器版本, 调整量版本, 校历版本, 实时修正版本)
+
+        实时修正只作用于当天，其他日子的最后一项恒为 0。
+        """
+        live_version = self._live_version if weekday == self._today else 0
+        return (weekday, self._generation, self.forecaster.version, self._adjustment_version, self._calendar_version,
+                live_version)
+
+    def data_version(self, day, snapshot=None):
+        """快照中就餐日期 day（datetime.date）数据的版本（见 _version），缓存键与缓存值都应取自同一个快照
+
+        实时修正只属于快照当天，同一星期几的其他日期与其他日子一样取纯预测表的版本。
+        """
+        snapshot = snapshot or self.snapshot
+        if day == snapshot.created_at.date():
+            return snapshot.data_version
+        return (day.weekday(), *snapshot.data_version[1:5], 0)
+
+    def _tables(self, weekday, canteens, forecaster, generation):
+        """按 (星期, 代次, 预测器版本) 缓存的数据表；在锁内生成，同一天的并发请求只生成一次
+
+        旧快照（代次或预测器版本已过时）的数据表照常生成但不写入缓存，不会挤掉当前数据的表。
+        """
+        key = (weekday, generation, forecaster.version)
+        with self._refresh_lock:
+            tables = self._day_cache.get(key)
+            if tables is None:
+                tables = build_day_tables(canteens, forecaster, weekday)
+                if key[1:] == (self._generation, self.forecaster.version):
+                    self._day_cache = {k: v for k, v in self._day_cache.items() if k[1:] == key[1:]}
+                    self._day_cache[key] = tables
+        return tables
+
+    def day_tables(self, weekday, snapshot=None):
+        """某天的数据表，按快照中的食堂与预测器生成并缓存；供非当天的查询使用"""
+        snapshot = snapshot or self.snapshot
+        return self._tables(weekday, snapshot.canteens, snapshot.forecaster, snapshot.data_version[1])
+
+    def conditions(self, day, snapshot=None):
+        """就餐日期 day 每分钟的预测拥挤度 (M, 1440) 与排队估计
+
+        快照当天直接读快照（含实时修正）；其他日期（包括同一星期几的其他日期）用纯预测表。
+        """
+        snapshot = snapshot or self.snapshot
+        if day == snapshot.created_at.date():
+            return snapshot.crowd, snapshot.queue
+        crowd, queue, _ = self.day_tables(day.weekday(), snapshot)
+        return crowd, queue
+
+    def score_query(self, key, snapshot=None, personal=None, mask=None, day=None):
+        """按归一化查询键（见 result_cache.normalize_query）评分，扰动由键派生的种子生成
+
+        personal 为 (M,) 个性化调整量（见 personalization.py），叠加在反馈汇总的调整量上；
+        mask 为 (M,) 附加筛选条件（如菜品搜索命中的食堂，见 menu.py）；
+        day 为就餐日期的 DaySchedule（见 academic_calendar.py），时间因子按当天作息取、数据表按日期取（见 conditions）；
+        缺省时时间因子按 TIME_FACTOR_RULES，数据表用该星期几的纯预测表。
+        返回 (ScoreResult, 该时刻各食堂座位占用 (M,))；页面与 API 共用这一份计算。
+        """
+        result, seat_occupancy = self.score_queries([key], snapshot, personal, mask, day, rng=rng_for_key(key))
+        return result, seat_occupancy[0]
+
+    def score_queries(self, keys, snapshot=None, personal=None, mask=None, day=None, rng=None):
+        """一批同一就餐日期（或同一星期几）的查询键一起评分，每一行与单独 score_query 的结果相同
+
+        personal、mask 为 (N, M) 或可广播的形状，含义同 score_query；返回 (ScoreResult, 各查询时刻的座位占用 (N, M))。
+        分流推荐用它对同一时段的所有在线用户按各自的输入评分。
+        """
+        snapshot = snapshot or self.snapshot
+        columns = list(zip(*keys))
+        user_types, purposes, weekdays, minutes, price_mins, price_maxs, max_waits, types, origins = columns
+        profiles = build_profiles(user_types, purposes, minutes, list(zip(price_mins, price_maxs)), max_waits, types,
+                                  weekdays)
+        if day is not None:
+            crowd, queue = self.conditions(day.date, snapshot)
+        else:
+            crowd, queue, _ = self.day_tables(weekdays[0], snapshot)
+        walking = snapshot.catalog.walking if snapshot.catalog is not None else None
+        result = score_profiles(
+            snapshot.canteens, profiles, rng=rng,
+            crowd=crowd[:, profiles.minute].T, wait=queue.wait[:, profiles.minute].T,
+            adjustment=snapshot.score_adjustment if personal is None else snapshot.score_adjustment + personal,
+            walk=walking.minutes_for(list(origins)) if walking is not None else None, mask=mask,
+            factor=None if day is None else day.factor[profiles.minute]
+        )
+        return result, queue.seat_occupancy[:, profiles.minute].T
+
+    def _reload_catalog(self):
+        """目录更新后切换到新的食堂数组，预测表按名称重新对齐，调整量需重新汇总"""
+        self.catalog = self.catalog_store.catalog
+        self.canteens = self.catalog.arrays
+        if self.live is not None:
+            self.live.realign(self.canteens.names, self.canteens.seats)
+        self.forecaster = load_or_prior(self.canteens, self.forecast_path)
+        self._forecast_mtime = self._mtime()
+        self._generation += 1
+        self._day_cache = {}
+        self._adjustment = _readonly(np.zeros(len(self.canteens)))
+        self._adjustment_version += 1
+
+    def _reload_calendar(self):
+        """校历文件有变化时重新加载，新文件有误时沿用旧校历"""
+        if calendar_mtime(self.calendar_path) == self.calendar.mtime:
+            return
+        try:
+            self.calendar = load_calendar(self.calendar_path)
+        except CalendarError:
+            logger.exception("新的校历无效，继续使用旧校历")
+            return
+        self._calendar_version += 1
+
+    def _apply_live(self, now, tables):
+        """用实时拥挤度修正当天数据表，返回 (拥挤度, 排队估计, 有实时数据的食堂)
+
+        偏差按整数百分比取，偏差不变且仍在同一分钟时复用上次的修正结果。
+        """
+        crowd, queue, open_mask = tables
+        minute = now.hour * 60 + now.minute
+        delta = np.zeros(len(self.canteens))
+        observed = np.zeros(len(self.canteens), dtype=bool)
+        live = self.live.snapshot if self.live is not None else None
+        if live is not None and live.fresh(now):
+            live_crowd, observed = live.aligned(self.canteens.names)
+            delta = np.where(observed, np.round(live_crowd - crowd[:, minute]), 0.0)
+        if self._live_delta is None or not np.array_equal(delta, self._live_delta):
+            self._live_delta = delta
+            self._live_version += 1
+        observed = _readonly(observed)
+        if not delta.any():
+            return crowd, queue, observed
+
+        key = (self._version(now.weekday())[:3], minute, self._live_version)
+        if self._live_tables is None or self._live_tables[0] != key:
+            end = min(minute + LIVE_HORIZON_MINUTES, crowd.shape[1])
+            weights = 1.0 - np.arange(end - minute) / LIVE_HORIZON_MINUTES
+            corrected = crowd.copy()
+            window = corrected[:, minute:end]
+            window += delta[:, None] * weights
+            np.clip(window, 0.0, 100.0, out=window)
+            corrected_queue = estimate_from_crowd(self.canteens, corrected, open_mask)
+            for array in (corrected, corrected_queue.arrival_rate, corrected_queue.utilization, corrected_queue.wait,
+                          corrected_queue.seat_occupancy):
+                _readonly(array)
+            self._live_tables = (key, corrected, corrected_queue)
+        return self._live_tables[1], self._live_tables[2], observed
+
+    def _aggregate_feedback(self):
+        adjustment = self.feedback_store.score_adjustments(self.canteens.names)
+        if not np.array_equal(adjustment, self._adjustment):
+            self._adjustment = _readonly(adjustment)
+            self._adjustment_version += 1
+
+    def refresh(self):
+        """重新生成快照：目录或预测文件更新时重新读取，当天数据表不变时复用"""
+        with self._refresh_lock:
+            catalog_changed = self.catalog_store is not None and self.catalog_store.reload_if_changed()
+            if catalog_changed:
+                self._reload_catalog()
+
+            mtime = self._mtime()
+            if mtime != self._forecast_mtime:
+                self.forecaster = load_or_prior(self.canteens, self.forecast_path)
+                self._forecast_mtime = mtime
+                self._generation += 1
+                self._day_cache = {}
+            self._reload_calendar()
+
+            if self.feedback_store is not None and (catalog_changed or self._ticks % self.aggregate_every == 0):
+                try:
+                    self._aggregate_feedback()
+                except Exception:
+                    logger.exception("反馈汇总失败，沿用上一次的调整量")
+            self._ticks += 1
+
+            now = self.clock()
+            weekday, minute = now.weekday(), now.hour * 60 + now.minute
+            tables = self._tables(weekday, self.canteens, self.forecaster, self._generation)
+            crowd, queue, live = self._apply_live(now, tables)
+            open_mask = tables[2]
+            self._today = weekday
+            previous = self.snapshot
+            self.snapshot = Snapshot(
+                version=previous.version + 1 if previous else 1,
+                created_at=now,
+                canteens=self.canteens,
+                catalog=self.catalog,
+                forecaster=self.forecaster,
+                weekday=weekday,
+                data_version=self._version(weekday),
+                crowd=crowd,
+                queue=queue,
+                open_mask=open_mask,
+                minute=minute,
+                crowd_now=_readonly(crowd[:, minute].copy()),
+                wait_now=_readonly(queue.wait[:, minute].copy()),
+                open_now=_readonly(open_mask[:, minute].copy()),
+                score_adjustment=self._adjustment,
+                day=self.calendar.day(now.date()),
+                live=live,
+            )
+            return self.snapshot
+
+    # ============ 后台刷新 ============
+    def start(self):
+        """启动后台刷新线程（重复调用无副作用）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="shared-state-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                # 刷新失败时保留上一份快照，下个节拍重试
+                logger.exception("共享状态刷新失败")
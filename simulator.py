@@ -0,0 +1,385 @@
+# simulator.py - 高峰期离散事件仿真：评估推荐策略是减少排队还是只是转移排队
+#
+# 用法：
+#   python simulator.py --students 12000 --meal lunch --policies forecast live balanced nearest
+#   python simulator.py --students 50000 --policies forecast --json result.json   # 兼作评分压测
+#   python simulator.py --date 2026-10-14 --forecast data/crowd_forecast.npz --feedback-db data/feedback.db
+#
+# 学生按下课高峰（正态混合）到达，每分钟到达的一批学生一起向推荐器查询
+# （一次 score_profiles 批量评分），步行到所选食堂后排队打饭：每个食堂有 windows 个窗口、
+# 服务时间为指数分布；打完饭需要座位，座位满时排队等座，吃完离开释放座位。
+# 事件（到达食堂、打饭完成、离座）放在最小堆中按时间推进，每分钟记录一次
+# 各食堂的排队人数与座位占用，直到所有排队与等座清空。所有随机量都来自同一个种子，同样的参数结果完全一致。
+# 评分的输入与页面相同（见 batch_runner.load_state）：预测文件（缺省为经验画像）生成的当天数据表、
+# 反馈汇总的推荐分调整量与校历给出的当天时间因子。
+#
+# 策略：
+#   forecast  页面当前的做法：按预测拥挤度 / 排队估计评分，去推荐分最高的推荐食堂
+#   live      同样的评分规则，但拥挤度与等待取仿真中的实时排队（假设有实时客流数据）
+#   balanced  分流模式：按实时剩余容量用 allocation.allocate 分配
+#   nearest   不用推荐器，去最近的营业食堂（对照组）
+import argparse
+import heapq
+import json
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from allocation import allocate
+from batch_runner import load_state
+from catalog import CATALOG_PATH
+from feedback_store import FEEDBACK_DB_PATH
+from forecast import FORECAST_PATH, CrowdForecaster
+from scoring import CANTEEN_TYPES, DINING_PURPOSES, USER_TYPES, build_profiles, score_profiles
+from shared_state import build_day_tables
+
+POLICIES = ["forecast", "live", "balanced", "nearest"]
+DEFAULT_STUDENTS = 12000
+DEFAULT_SEED = 0
+DEFAULT_WEEKDAY = 2
+
+# 到达高峰：(中心分钟, 标准差, 占比)，按时间窗截断
+MEAL_WINDOWS = {
+    "lunch": (11 * 60, 13 * 60, [(11 * 60 + 45, 12, 0.6), (12 * 60 + 15, 15, 0.4)]),
+    "dinner": (17 * 60, 19 * 60, [(17 * 60 + 45, 12, 0.6), (18 * 60 + 15, 15, 0.4)]),
+}
+USER_TYPE_SHARE = [0.70, 0.15, 0.08, 0.04, 0.03]
+PURPOSE_SHARE = [0.60, 0.15, 0.10, 0.10, 0.03, 0.02]
+EAT_MINUTES = (18.0, 5.0, 8.0)      # 就餐时长：均值、标准差、下限
+
+# 事件类型
+ARRIVE, SERVED, LEAVE = 0, 1, 2
+
+
+@dataclass(frozen=True)
+class Students:
+    """N 个仿真学生的画像与到达时间（分钟，浮点）"""
+    arrival: np.ndarray
+    profiles: object           # ProfileBatch，minute 为到达所在的整分钟
+    origin: np.ndarray         # 出发楼宇下标
+    eat_minutes: np.ndarray
+
+    def __len__(self):
+        return len(self.arrival)
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    """一次仿真的结果：时间序列为 (M, T)，逐人数据为 (N,)
+
+    未分配到食堂的学生 choice 为 -1；served 标出打上饭的学生，等待指标只统计这些学生。
+    """
+    policy: str
+    minutes: np.ndarray
+    queue_length: np.ndarray
+    seats_used: np.ndarray
+    choice: np.ndarray
+    served: np.ndarray
+    walk: np.ndarray
+    queue_wait: np.ndarray
+    seat_wait: np.ndarray
+    seats: np.ndarray
+    scoring_seconds: float
+    scored_profiles: int
+    elapsed_seconds: float
+
+    def summary(self):
+        """主要指标字典（分钟 / 比例），便于对比各策略"""
+        served = self.served
+        queue_wait, seat_wait = self.queue_wait[served], self.seat_wait[served]
+        total = queue_wait + seat_wait + self.walk[served]
+        utilization = self.seats_used / np.maximum(self.seats, 1)[:, None]
+        return {
+            "policy": self.policy,
+            "students": int(len(self.choice)),
+            "unassigned": int((self.choice < 0).sum()),
+            "served": int(served.sum()),
+            "unserved": int(((self.choice >= 0) & ~served).sum()),
+            "mean_queue_wait": round(float(queue_wait.mean()), 2) if served.any() else None,
+            "p95_queue_wait": round(float(np.percentile(queue_wait, 95)), 2) if served.any() else None,
+            "mean_seat_wait": round(float(seat_wait.mean()), 2) if served.any() else None,
+            "mean_walk": round(float(self.walk[served].mean()), 2) if served.any() else None,
+            "mean_total": round(float(total.mean()), 2) if served.any() else None,
+            "max_queue": int(self.queue_length.max(initial=0)),
+            "peak_seat_utilization": round(float(utilization.max(initial=0.0)), 3),
+            "canteens_used": int(len(np.unique(self.choice[served]))),
+            "scored_profiles": self.scored_profiles,
+            "scoring_profiles_per_second": round(self.scored_profiles / self.scoring_seconds)
+            if self.scoring_seconds > 0 else None,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+        }
+
+
+# ============ 生成学生 ============
+def generate_students(n, walking, meal="lunch", seed=DEFAULT_SEED, weekday=DEFAULT_WEEKDAY):
+    """按到达高峰与画像分布生成 n 个学生"""
+    rng = np.random.default_rng(seed)
+    start, end, peaks = MEAL_WINDOWS[meal]
+    centers, spreads, shares = (np.array(column, dtype=np.float64) for column in zip(*peaks))
+    peak = rng.choice(len(peaks), n, p=shares / shares.sum())
+    arrival = np.sort(np.clip(rng.normal(centers[peak], spreads[peak]), start, end - 1e-6))
+
+    low = rng.integers(5, 13, n)
+    profiles = build_profiles(
+        np.array(USER_TYPES, dtype=object)[rng.choice(len(USER_TYPES), n, p=USER_TYPE_SHARE)],
+        np.array(DINING_PURPOSES, dtype=object)[rng.choice(len(DINING_PURPOSES), n, p=PURPOSE_SHARE)],
+        np.floor(arrival).astype(np.int32), np.column_stack([low, low + rng.integers(8, 21, n)]),
+        rng.integers(10, 26, n), [CANTEEN_TYPES] * n, weekday,
+    )
+    mean, sd, floor = EAT_MINUTES
+    return Students(
+        arrival=arrival,
+        profiles=profiles,
+        origin=rng.integers(0, max(len(walking), 1), n),
+        eat_minutes=np.maximum(rng.normal(mean, sd, n), floor),
+    )
+
+
+def _take(profiles, rows):
+    return type(profiles)(**{name: getattr(profiles, name)[rows] for name in profiles.__dataclass_fields__})
+
+
+# ============ 仿真 ============
+class _Canteens:
+    """仿真中的食堂状态：打饭队列、空闲窗口、等座队列、空闲座位"""
+
+    def __init__(self, canteens):
+        m = len(canteens)
+        self.windows = canteens.windows.astype(np.int64)
+        self.service_minutes = canteens.service_minutes
+        self.seats = canteens.seats.astype(np.int64)
+        self.free_windows = self.windows.copy()
+        self.free_seats = self.seats.copy()
+        self.queues = [deque() for _ in range(m)]
+        self.seat_queues = [deque() for _ in range(m)]
+
+    def queue_lengths(self):
+        return np.array([len(q) for q in self.queues]) + (self.windows - self.free_windows)
+
+    def live_conditions(self):
+        """实时 (拥挤度 %, 预计等待分钟)，形状 (M,)"""
+        in_service = self.windows - self.free_windows
+        waiting = np.array([len(q) for q in self.queues])
+        crowd = 100.0 * (self.seats - self.free_seats + waiting + in_service) / np.maximum(self.seats, 1)
+        wait = (waiting / np.maximum(self.windows, 1) + 1.0) * self.service_minutes
+        return crowd, wait
+
+
+def _choose(policy, canteens, batch, state, day_crowd, day_wait, walk, rng, bucket_minutes, adjustment=None,
+            factor=None):
+    """一批学生（同一分钟到达）按策略选择食堂，返回 (下标 (n,), 评分耗时秒)"""
+    minute = int(batch.minute[0])
+    n = len(batch)
+    if policy == "nearest":
+        is_open = canteens.hours.is_open(batch.minute, batch.weekday)
+        return np.where(is_open.any(axis=1), np.where(is_open, walk, np.inf).argmin(axis=1), -1), 0.0
+
+    if policy == "forecast":
+        crowd, wait = day_crowd[:, minute], day_wait[:, minute]
+    else:
+        crowd, wait = state.live_conditions()
+    started = time.perf_counter()
+    result = score_profiles(canteens, batch, rng=rng, crowd=np.broadcast_to(crowd, (n, len(canteens))),
+                            wait=np.broadcast_to(wait, (n, len(canteens))), adjustment=adjustment, walk=walk,
+                            factor=None if factor is None else factor[batch.minute])
+    scoring = time.perf_counter() - started
+
+    feasible = result.eligible & result.recommended
+    # 没有推荐食堂的学生退而求其次，在营业且符合条件的食堂中选分最高的
+    fallback = ~feasible.any(axis=1, keepdims=True)
+    feasible = np.where(fallback, result.eligible, feasible)
+    if policy == "balanced":
+        # 剩余容量：本时段的打饭吞吐量与空闲座位中的较小者，扣掉已在排队的人
+        throughput = state.windows / state.service_minutes
+        capacity = np.floor(np.minimum(throughput * bucket_minutes, state.free_seats) - state.queue_lengths()).clip(0)
+        is_open = result.eligible.any(axis=0)
+        shortfall = n - capacity[is_open].sum()
+        if shortfall > 0 and throughput[is_open].sum() > 0:
+            capacity = capacity + np.ceil(shortfall * np.where(is_open, throughput, 0) / throughput[is_open].sum())
+        return allocate(result.score, feasible, capacity), scoring
+
+    ranked = np.where(feasible, result.score, -np.inf)
+    choice = ranked.argmax(axis=1)
+    choice[~np.isfinite(ranked[np.arange(n), choice])] = -1
+    return choice, scoring
+
+
+def simulate(canteens, walking, students, policy="forecast", day_tables=None, seed=DEFAULT_SEED,
+             bucket_minutes=1, adjustment=None, factor=None):
+    """运行一次仿真，返回 SimulationResult；仿真一直进行到所有学生打完饭、就座并离开
+
+    day_tables 为 build_day_tables 的结果（forecast 策略使用），缺省按经验画像生成；
+    adjustment 为 (M,) 推荐分调整量，factor 为当天 (1440,) 的时间因子（见 academic_calendar.DaySchedule），
+    缺省时不调整、时间因子按 TIME_FACTOR_RULES。
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"未知的策略: {policy}")
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    if day_tables is None:
+        day_tables = build_day_tables(canteens, CrowdForecaster.for_canteens(canteens),
+                                      int(students.profiles.weekday[0]))
+    day_crowd, queue, _ = day_tables
+    walk_matrix = walking.matrix if len(walking) else np.zeros((1, len(canteens)), dtype=np.float32)
+
+    state = _Canteens(canteens)
+    n = len(students)
+    choice = np.full(n, -1, dtype=np.int64)
+    walk = np.zeros(n)
+    queue_wait = np.zeros(n)
+    seat_wait = np.zeros(n)
+    queued_at = np.full(n, np.nan)
+    served_at = np.full(n, np.nan)
+    service = rng.exponential(1.0, n)        # 以各食堂平均服务时间为单位
+    scoring_seconds = 0.0
+
+    events = []
+    seq = 0
+
+    def push(t, kind, j, i):
+        nonlocal seq
+        heapq.heappush(events, (t, seq, kind, j, i))
+        seq += 1
+
+    def start_service(j, i, t):
+        state.free_windows[j] -= 1
+        queue_wait[i] = t - queued_at[i]
+        push(t + service[i] * state.service_minutes[j], SERVED, j, i)
+
+    def take_seat(j, i, t):
+        state.free_seats[j] -= 1
+        seat_wait[i] = t - served_at[i]
+        push(t + students.eat_minutes[i], LEAVE, j, i)
+
+    # 每分钟到达的学生一起查询推荐器
+    minute_of = students.profiles.minute
+    boundaries = np.flatnonzero(np.diff(minute_of)) + 1
+    decision_batches = np.split(np.arange(n), boundaries) if n else []
+    batch_index = 0
+    now = int(np.floor(students.arrival[0])) if n else 0
+    queue_length, seats_used = [], []
+
+    while batch_index < len(decision_batches) or events:
+        # 本分钟开始：记录状态，再让本分钟到达的学生做决定并出发
+        queue_length.append(state.queue_lengths())
+        seats_used.append(state.seats - state.free_seats)
+        if batch_index < len(decision_batches) and len(decision_batches[batch_index]) \
+                and minute_of[decision_batches[batch_index][0]] == now:
+            rows = decision_batches[batch_index]
+            batch_index += 1
+            batch = _take(students.profiles, rows)
+            walk_rows = walk_matrix[np.minimum(students.origin[rows], len(walk_matrix) - 1)]
+            picked, seconds = _choose(policy, canteens, batch, state, day_crowd, queue.wait, walk_rows, rng,
+                                      bucket_minutes, adjustment, factor)
+            scoring_seconds += seconds
+            choice[rows] = picked
+            going = picked >= 0
+            walk[rows[going]] = walk_rows[going, picked[going]]
+            for i, j in zip(rows[going].tolist(), picked[going].tolist()):
+                push(students.arrival[i] + walk[i], ARRIVE, j, i)
+
+        # 处理本分钟内发生的事件
+        while events and events[0][0] < now + 1:
+            t, _, kind, j, i = heapq.heappop(events)
+            if kind == ARRIVE:
+                queued_at[i] = t
+                if state.free_windows[j] > 0:
+                    start_service(j, i, t)
+                else:
+                    state.queues[j].append(i)
+            elif kind == SERVED:
+                served_at[i] = t
+                state.free_windows[j] += 1
+                if state.queues[j]:
+                    start_service(j, state.queues[j].popleft(), t)
+                if state.free_seats[j] > 0:
+                    take_seat(j, i, t)
+                else:
+                    state.seat_queues[j].append(i)
+            else:
+                state.free_seats[j] += 1
+                if state.seat_queues[j]:
+                    take_seat(j, state.seat_queues[j].popleft(), t)
+        now += 1
+
+    m = len(canteens)
+    return SimulationResult(
+        policy=policy,
+        minutes=np.arange(now - len(queue_length), now),
+        queue_length=np.array(queue_length, dtype=np.int32).reshape(-1, m).T,
+        seats_used=np.array(seats_used, dtype=np.int32).reshape(-1, m).T,
+        choice=choice,
+        served=~np.isnan(served_at),
+        walk=walk,
+        queue_wait=queue_wait,
+        seat_wait=seat_wait,
+        seats=state.seats,
+        scoring_seconds=scoring_seconds,
+        scored_profiles=0 if policy == "nearest" else n,
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
+
+def compare_policies(catalog, n_students=DEFAULT_STUDENTS, policies=POLICIES, meal="lunch", seed=DEFAULT_SEED,
+                     weekday=DEFAULT_WEEKDAY, day_tables=None, adjustment=None, factor=None):
+    """同一批学生（同一种子）在各策略下的仿真结果；评分输入的含义同 simulate"""
+    canteens, walking = catalog.arrays, catalog.walking
+    students = generate_students(n_students, walking, meal, seed, weekday)
+    if day_tables is None:
+        day_tables = build_day_tables(canteens, CrowdForecaster.for_canteens(canteens), weekday)
+    return [simulate(canteens, walking, students, policy, day_tables, seed, adjustment=adjustment, factor=factor)
+            for policy in policies]
+
+
+def _minutes(value, width):
+    return f"{value:{width}.2f}" if value is not None else f"{'-':>{width}}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="高峰期离散事件仿真，对比推荐策略的排队效果")
+    parser.add_argument("--students", type=int, default=DEFAULT_STUDENTS, help="学生人数")
+    parser.add_argument("--meal", choices=sorted(MEAL_WINDOWS), default="lunch", help="午餐或晚餐高峰")
+    parser.add_argument("--policies", nargs="+", choices=POLICIES, default=POLICIES, help="参与对比的策略")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子")
+    parser.add_argument("--weekday", type=int, default=DEFAULT_WEEKDAY,
+                        help="星期（0 表示周一），就餐日期取从今天起的下一个该星期几")
+    parser.add_argument("--date", type=date.fromisoformat, help="就餐日期（YYYY-MM-DD），给出时代替 --weekday")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="食堂目录（.json / .toml / .csv）")
+    parser.add_argument("--forecast", default=FORECAST_PATH, help="拥挤度预测文件（.npz），不存在时使用经验画像")
+    parser.add_argument("--feedback-db", default=FEEDBACK_DB_PATH, help="反馈库，存在时按食堂评分调整推荐分")
+    parser.add_argument("--json", help="把各策略的指标与每分钟排队序列写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    today = date.today()
+    dining_date = args.date or today + timedelta(days=(args.weekday - today.weekday()) % 7)
+    weekday = dining_date.weekday()
+    # 与页面相同的评分输入：预测表、反馈汇总的调整量、校历时间因子
+    state = load_state(args.catalog, forecast_path=args.forecast, feedback_path=args.feedback_db)
+    catalog = state.catalog
+    results = compare_policies(catalog, args.students, args.policies, args.meal, args.seed, weekday,
+                               day_tables=state.day_tables(weekday), adjustment=state.snapshot.score_adjustment,
+                               factor=state.calendar.day(dining_date).factor)
+    for result in results:
+        s = result.summary()
+        print(f"{s['policy']:<9} 平均排队 {_minutes(s['mean_queue_wait'], 6)} 分钟  "
+              f"p95 {_minutes(s['p95_queue_wait'], 6)}  等座 {_minutes(s['mean_seat_wait'], 5)}  "
+              f"步行 {_minutes(s['mean_walk'], 5)}  最长队伍 {s['max_queue']:4d}  "
+              f"座位峰值 {s['peak_seat_utilization']:.0%}  用到 {s['canteens_used']} 个食堂  "
+              f"未分配 {s['unassigned']} 人  （{s['elapsed_seconds']:.2f} 秒）", file=sys.stderr)
+    if args.json:
+        payload = [{
+            **result.summary(),
+            "minutes": result.minutes.tolist(),
+            "queue_length": dict(zip(catalog.arrays.names, result.queue_length.tolist())),
+            "seats_used": dict(zip(catalog.arrays.names, result.seats_used.tolist())),
+        } for result in results]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from academic_calendar import (DEFAULT_PROFILE, AcademicCalendar, CalendarError, load_calendar, meal_name,
+                               parse_calendar)
+from scoring import OFF_PEAK_FACTOR, time_factor
+
+DATA = {
+    "profiles": {
+        "周末": [{"windows": ["12:00-12:50"], "factor": 1.3}],
+        "考试周": [{"windows": ["11:50-12:20", "17:30-18:10"], "factor": 1.8},
+                 {"windows": ["11:20-12:30"], "factor": 1.2}],
+    },
+    "rules": [
+        {"name": "周末", "weekdays": "sat-sun", "profile": "周末"},
+        {"name": "周三下午无课", "weekdays": "wed", "windows": ["17:10-17:39"], "factor": 1.8},
+        {"name": "考试周", "from": "2026-01-05", "to": "2026-01-16", "profile": "考试周"},
+        {"name": "调休上课", "dates": ["2026-01-10"], "profile": "教学日"},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def calendar():
+    return parse_calendar(DATA)
+
+
+def test_default_day_matches_time_factor_rules(calendar):
+    schedule = calendar.day(date(2026, 10, 15))                # 周四，没有规则选中
+    assert schedule.profile == DEFAULT_PROFILE and schedule.events == ()
+    assert np.array_equal(schedule.factor, time_factor(np.arange(1440)))
+    assert schedule.peak_windows == ((700, 750), (1060, 1110))
+    assert schedule.peak_window_at(12 * 60) == (700, 750)
+    assert schedule.peak_window_at(1440 + 12 * 60) == (700, 750)
+    assert schedule.peak_window_at(15 * 60) is None
+    assert not schedule.factor.flags.writeable
+
+
+def test_overlay_extends_peak(calendar):
+    schedule = calendar.day(date(2026, 10, 14))                # 周三
+    assert schedule.events == ("周三下午无课",)
+    assert schedule.factor[17 * 60 + 10] == 1.8
+    assert schedule.peak_window_at(17 * 60 + 20) == (17 * 60 + 10, 18 * 60 + 30)
+    assert meal_name(schedule.peak_windows[1][0]) == "晚餐"
+    assert "周三下午无课" in schedule.describe()
+
+
+def test_later_profile_rules_take_precedence(calendar):
+    exam = calendar.day(date(2026, 1, 8))
+    assert exam.profile == "考试周" and exam.events == ("考试周",)
+    # 先匹配的时间窗优先：11:50-12:20 取 1.8，两侧取 1.2
+    assert exam.factor[[11 * 60 + 20, 11 * 60 + 50, 12 * 60 + 25, 13 * 60]].tolist() == [1.2, 1.8, 1.2, OFF_PEAK_FACTOR]
+    assert exam.peak_windows == ((710, 740), (1050, 1090))
+
+    assert calendar.day(date(2026, 1, 11)).profile == "考试周"     # 考试周里的周日
+    makeup = calendar.day(date(2026, 1, 10))                        # 调休的周六
+    assert makeup.profile == DEFAULT_PROFILE and makeup.events == ("调休上课",)
+    assert calendar.day(date(2026, 10, 17)).peak_windows == ()      # 普通周末没有高峰
+
+
+def test_signature_and_cache(calendar):
+    first, second = calendar.day(date(2026, 10, 15)), calendar.day(date(2026, 10, 22))
+    assert first.signature == second.signature != calendar.day(date(2026, 10, 14)).signature
+    assert calendar.day(date(2026, 10, 15)) is first
+
+
+def test_errors_are_listed_together():
+    data = {
+        "profiles": {"坏作息": [{"windows": ["11:00"], "factor": 0}]},
+        "rules": [
+            {"name": "甲", "weekdays": "funday", "profile": "周末"},
+            {"name": "乙", "from": "2026-13-01", "windows": ["23:00-01:00"], "factor": 1.5},
+            {"name": "丙", "profile": "教学日", "windows": ["12:00-13:00"]},
+            {"weekdays": "mon"},
+        ],
+    }
+    with pytest.raises(CalendarError) as info:
+        parse_calendar(data)
+    message = str(info.value)
+    for expected in ("factor 必须是正数", "无法解析星期", "未定义的作息 '周末'", "无效的日期", "不能跨过午夜",
+                     "必须且只能给出", "第 4 条规则缺少 name"):
+        assert expected in message
+
+
+def test_load_calendar(tmp_path):
+    missing = load_calendar(str(tmp_path / "missing.json"))
+    assert isinstance(missing, AcademicCalendar) and missing.day(date(2026, 10, 17)).profile == DEFAULT_PROFILE
+    path = tmp_path / "calendar.json"
+    path.write_text("[", encoding="utf-8")
+    with pytest.raises(CalendarError, match="无法读取"):
+        load_calendar(str(path))
+    assert load_calendar().day(date(2026, 1, 8)).profile == "考试周"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from allocation import allocate
+
+
+def check_assignment(assignment, utility, feasible, capacity):
+    load = np.bincount(assignment[assignment >= 0], minlength=len(capacity))
+    assert (load <= capacity).all()
+    rows = np.flatnonzero(assignment >= 0)
+    assert feasible[rows, assignment[rows]].all()
+    # 没分到的人，其所有可行食堂都已满
+    full = load >= capacity
+    for i in np.flatnonzero(assignment < 0):
+        assert full[feasible[i]].all()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_capacity_is_never_exceeded(seed):
+    rng = np.random.default_rng(seed)
+    n, m = 2000, 8
+    utility = rng.normal(size=(n, m))
+    feasible = rng.random((n, m)) < 0.6
+    capacity = rng.integers(0, 400, m)
+    assignment = allocate(utility, feasible, capacity)
+    check_assignment(assignment, utility, feasible, capacity)
+
+
+def test_everyone_placed_when_capacity_suffices():
+    rng = np.random.default_rng(1)
+    utility = rng.normal(size=(500, 4))
+    utility[:, 0] += 3                       # 人人最想去 0 号
+    feasible = np.ones_like(utility, dtype=bool)
+    capacity = np.array([100, 200, 200, 200])
+    assignment = allocate(utility, feasible, capacity)
+    check_assignment(assignment, utility, feasible, capacity)
+    assert (assignment >= 0).all()
+    assert (assignment == 0).sum() == 100
+
+
+def test_no_feasible_option_is_minus_one():
+    utility = np.ones((3, 2))
+    feasible = np.array([[True, False], [False, False], [False, True]])
+    assert allocate(utility, feasible, [5, 5]).tolist() == [0, -1, 1]
+
+
+def test_uncongested_users_get_their_favourite():
+    utility = np.array([[3.0, 1.0], [1.0, 3.0], [2.0, 0.0]])
+    assignment = allocate(utility, np.ones_like(utility, dtype=bool), [10, 10])
+    assert assignment.tolist() == [0, 1, 0]
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+import pytest
+
+from api_server import RecommendationService, start_api_server
+from catalog import CatalogStore
+from shared_state import SharedState
+from tests.test_shared_state import write_catalog
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = tmp_path / "canteens.json"
+    write_catalog(path, ["甲", "乙"], 1)
+    state = SharedState(catalog_store=CatalogStore(str(path)), forecast_path=str(tmp_path / "forecast.npz"),
+                        clock=lambda: datetime(2026, 10, 14, 12, 0))
+    return RecommendationService(state, menu_path=str(tmp_path / "menu.json"))
+
+
+async def _get(port, target, headers=None):
+    """发一个 HTTP/1.1 请求（Connection: close），返回 (状态码, 头部字典, 响应体)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"GET {target} HTTP/1.1", "Host: test", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    fields = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), {name.lower(): value for name, value in fields.items()}, body
+
+
+def _run(service, scenario):
+    """在临时端口上启动服务，执行 scenario(port) 后关闭"""
+    async def main():
+        server = await start_api_server(service, "127.0.0.1", 0)
+        try:
+            return await scenario(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_etag_revalidation(service):
+    async def scenario(port):
+        status, headers, body = await _get(port, "/api/recommendations?time=12:00&weekday=2")
+        assert status == 200 and json.loads(body)["count"] == 2
+        etag = headers["etag"]
+        # 同一时间桶内的时间得到同一响应，带 If-None-Match 重新验证返回 304 且没有响应体
+        status, headers, body = await _get(port, "/api/recommendations?time=12:03&weekday=2",
+                                           {"If-None-Match": f"W/{etag}"})
+        assert status == 304 and headers["etag"] == etag and body == b""
+        status, _, body = await _get(port, "/api/recommendations?time=12:00&weekday=2", {"If-None-Match": '"x"'})
+        assert status == 200 and body
+    _run(service, scenario)
+
+
+@pytest.mark.parametrize("target, message", [
+    ("/api/recommendations?price_min=30&price_max=10", "price_min"),
+    ("/api/recommendations?user_type=" + quote("校友"), "身份"),
+    ("/api/recommendations?time=25:00", "time"),
+    ("/api/recommendations?weekday=3&date=2026-10-14", "不符"),
+    ("/api/recommendations?types=" + quote("火锅"), "类型"),
+    ("/api/recommendations?origin=" + quote("月球"), "楼宇"),
+    ("/api/recommendations?format=xml", "格式"),
+    ("/api/recommendations?top=-1", "top"),
+])
+def test_bad_requests(service, target, message):
+    status, _, body = _run(service, lambda port: _get(port, target))
+    assert status == 400
+    assert message in json.loads(body)["error"]
+
+
+def test_unknown_path(service):
+    status, _, _ = _run(service, lambda port: _get(port, "/api/nothing"))
+    assert status == 404
+
+
+def test_concurrent_identical_requests_compute_once(service, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+    score_query = service.state.score_query
+
+    def slow_score_query(*args, **kwargs):
+        with lock:
+            calls.append(args[0])
+        time.sleep(0.2)
+        return score_query(*args, **kwargs)
+
+    monkeypatch.setattr(service.state, "score_query", slow_score_query)
+
+    async def scenario(port):
+        responses = await asyncio.gather(*(_get(port, "/api/recommendations?time=12:00&weekday=2")
+                                           for _ in range(8)))
+        again = await _get(port, "/api/recommendations?time=12:04&weekday=2")
+        return responses, again
+
+    responses, again = _run(service, scenario)
+    assert all(status == 200 for status, _, _ in responses)
+    assert len({body for _, _, body in responses}) == 1
+    assert again[2] == responses[0][2]
+    assert len(calls) == 1
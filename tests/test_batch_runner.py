@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_runner import dining_dates, load_state, recommend_chunk
+from result_cache import normalize_query
+from scoring import CANTEEN_TYPES
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory):
+    missing = tmp_path_factory.mktemp("state")
+    return load_state(forecast_path=str(missing / "forecast.npz"), feedback_path=str(missing / "feedback.db"))
+
+
+def test_dining_dates():
+    today = date(2026, 10, 14)                    # 周三
+    chunk = pd.DataFrame({"weekday": [2, 4, np.nan, 1], "date": [None, None, "2026-12-01", ""]})
+    dates, errors = dining_dates(chunk, today)
+    assert dates == [today, date(2026, 10, 16), date(2026, 12, 1), date(2026, 10, 20)]
+    assert errors == [None] * 4
+    _, errors = dining_dates(pd.DataFrame({"weekday": [3, 9, np.nan], "date": ["2026-10-14", None, "10/14"]}), today)
+    assert "不符" in errors[0] and "0-6" in errors[1] and "YYYY-MM-DD" in errors[2]
+
+
+def test_bad_rows_reported_with_id(state):
+    chunk = pd.DataFrame({
+        "id": ["ok", "time", "user", "price", "date"],
+        "user_type": ["本科生", "本科生", "校友", "本科生", "本科生"],
+        "dining_purpose": ["日常快速就餐"] * 5,
+        "time": ["12:00", "25:00", "12:00", "12:00", "12:00"],
+        "price_min": [8, 8, 8, 30, 8],
+        "price_max": [25, 25, 25, 10, 25],
+        "max_wait": [15] * 5,
+        "weekday": [np.nan, np.nan, np.nan, np.nan, 3],
+        "date": [None, None, None, None, "2026-10-14"],
+    })
+    output = recommend_chunk(state.canteens, chunk, state=state)
+    assert [query_id for query_id, _, _ in output] == list(chunk["id"])
+    errors = {query_id: error for query_id, _, error in output}
+    assert errors["ok"] is None
+    assert "时间" in errors["time"] and "身份" in errors["user"]
+    assert "价格" in errors["price"] and "不符" in errors["date"]
+    assert all(not recs for query_id, recs, error in output if error)
+
+
+def test_batch_matches_interactive_scoring(state):
+    names = state.snapshot.canteens.names
+    # 时间不落在时间桶起点上，批量与页面都应按同样的时间桶取整
+    queries = [("本科生", "日常快速就餐", 12 * 60 + 3, 8, 25, 15, None),
+               ("教师", "学习讨论", 18 * 60 + 7, 10, 40, 30, "教学楼A区"),
+               ("研究生", "朋友聚餐", 20 * 60 + 4, 15, 35, 20, None), ("本科生", "改善伙食", 7 * 60 + 9, 5, 15, 10, None)]
+    today = state.snapshot.created_at.date()
+    chunk = pd.DataFrame({
+        "id": [str(i) for i in range(len(queries))],
+        "user_type": [q[0] for q in queries],
+        "dining_purpose": [q[1] for q in queries],
+        "time": [f"{q[2] // 60}:{q[2] % 60:02d}" for q in queries],
+        "price_min": [q[3] for q in queries],
+        "price_max": [q[4] for q in queries],
+        "max_wait": [q[5] for q in queries],
+        "origin": [q[6] for q in queries],
+        "date": [(today + timedelta(days=i)).isoformat() for i in range(len(queries))],
+    })
+    batch = {query_id: recs for query_id, recs, _ in recommend_chunk(state.canteens, chunk, top_k=len(names),
+                                                                      state=state)}
+
+    recommended = 0
+    for i, (user, purpose, minute, low, high, max_wait, _) in enumerate(queries):
+        day = state.calendar.day(today + timedelta(days=i))
+        key = normalize_query(user, purpose, minute, (low, high), max_wait, CANTEEN_TYPES, day.date.weekday(),
+                              origin=chunk["origin"][i])
+        result, _ = state.score_query(key, state.snapshot, day=day)
+        expected = [names[j] for j in np.argsort(-np.where(result.eligible & result.recommended, result.score,
+                                                            -np.inf)[0], kind="stable")
+                    if result.eligible[0, j] and result.recommended[0, j]]
+        assert [rec["canteen"] for rec in batch[str(i)]] == expected
+        recommended += len(expected)
+        for rec in batch[str(i)]:
+            j = names.index(rec["canteen"])
+            assert rec["score"] == round(float(result.score[0, j]), 1)
+            assert rec["wait"] == int(result.wait[0, j])
+    assert recommended > 0
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from catalog import CatalogError, CatalogStore, load_catalog, validate
+
+CSV_HEADER = "name,type,price_min,price_max,base_score,seats,windows,opening_hours,popular_dishes\n"
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def valid_record(**overrides):
+    record = {"name": "测试食堂", "type": "大众食堂", "price_range": [8, 12], "base_score": 8.0, "seats": 100,
+              "opening_hours": "6:30-20:30"}
+    record.update(overrides)
+    return record
+
+
+def test_default_catalog_loads():
+    catalog = load_catalog()
+    assert len(catalog) == len(catalog.db) > 0
+    assert len(catalog.walking) > 0
+
+
+def test_csv_catalog(tmp_path):
+    path = write(tmp_path / "canteens.csv", CSV_HEADER
+                 + "甲食堂,大众食堂,8,12,8.5,500,10,6:30-20:30,回锅肉|麻婆豆腐\n"
+                 + '乙食堂,快餐食堂,10,16,7.8,350,,"11:00-13:30, 17:00-19:00",\n')
+    catalog = load_catalog(path)
+    assert catalog.arrays.names == ["甲食堂", "乙食堂"]
+    assert catalog.db["甲食堂"]["popular_dishes"] == ["回锅肉", "麻婆豆腐"]
+    assert catalog.db["甲食堂"]["price_range"] == [8.0, 12.0]
+    assert catalog.arrays.windows.tolist() == [10, 7]        # 未给出时每 50 座一个窗口
+    assert len(catalog.walking) == 0
+    assert catalog.arrays.hours.open_at(12 * 60).tolist() == [True, True]
+    assert catalog.arrays.hours.open_at(15 * 60).tolist() == [True, False]
+
+
+def test_csv_non_numeric_field(tmp_path):
+    path = write(tmp_path / "bad.csv", CSV_HEADER + "甲食堂,大众食堂,八,12,8.5,500,10,6:30-20:30,\n")
+    with pytest.raises(CatalogError, match="甲食堂"):
+        load_catalog(path)
+
+
+def test_validation_lists_every_problem():
+    records = [
+        valid_record(type="火锅店"),
+        valid_record(name="乙", price_range=[12, 8], seats=0),
+        valid_record(name="丙", opening_hours={"fri-xyz": "10:00-14:00"}),
+        valid_record(name="乙"),
+    ]
+    with pytest.raises(CatalogError) as info:
+        validate(records, [{"name": "楼", "coords": [1]}])
+    message = str(info.value)
+    for fragment in ("测试食堂: type", "乙: price_range", "乙: seats", "丙: opening_hours", "乙: 名称重复",
+                     "楼宇 楼: coords"):
+        assert fragment in message
+
+
+def test_empty_catalog_rejected():
+    with pytest.raises(CatalogError, match="目录为空"):
+        validate([])
+
+
+def test_store_keeps_old_catalog_on_bad_update(tmp_path):
+    path = tmp_path / "canteens.json"
+    path.write_text(json.dumps({"canteens": [valid_record()]}, ensure_ascii=False), encoding="utf-8")
+    store = CatalogStore(str(path), check_seconds=0)
+    path.write_text(json.dumps({"canteens": [valid_record(seats=-1)]}, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert store.reload_if_changed() is False
+    assert store.catalog.arrays.seats.tolist() == [100]
+
+    path.write_text(json.dumps({"canteens": [valid_record(seats=300)]}, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (2, 2))
+    assert store.reload_if_changed() is True
+    assert store.catalog.arrays.seats.tolist() == [300]
+    assert np.array_equal(store.catalog.arrays.windows, [6])
@@ -0,0 +1,50 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from feedback_store import ADJUSTMENT_PER_POINT, FeedbackStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeedbackStore(str(tmp_path / "feedback.db"), flush_seconds=0.05)
+    yield store
+    store.close()
+
+
+def test_only_canteen_rating_moves_canteen_scores(store):
+    # 系统评分很低，但对食堂的评价很高
+    for _ in range(20):
+        store.submit(1, 1, 1, 1, canteen="甲", canteen_rating=5)
+    store.submit(5, 5, 5, 5, canteen="乙")                  # 没有给食堂评分，不计入
+    store.submit(5, 5, 5, 5)
+    store.flush()
+    assert store.rating_summary() == {"甲": (20, 5.0)}
+    adjustment = store.score_adjustments(["甲", "乙"])
+    assert adjustment[0] == pytest.approx(ADJUSTMENT_PER_POINT * 2 * 0.5)
+    assert adjustment[1] == 0
+    assert store.accuracy_summary() == (22, pytest.approx((20 + 5 + 5) / 22))
+
+
+def test_canteen_rating_requires_canteen(store):
+    with pytest.raises(ValueError):
+        store.submit(3, 3, 3, 3, canteen_rating=4)
+
+
+def test_old_database_gains_rating_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+                     "session_id TEXT, canteen TEXT, accuracy INTEGER NOT NULL, usability INTEGER NOT NULL, "
+                     "usefulness INTEGER NOT NULL, likelihood INTEGER NOT NULL, comment TEXT)")
+        conn.execute("INSERT INTO feedback (created_at, canteen, accuracy, usability, usefulness, likelihood) "
+                     "VALUES (0, '甲', 1, 1, 1, 1)")
+    store = FeedbackStore(path, flush_seconds=0.05)
+    try:
+        assert np.array_equal(store.score_adjustments(["甲"]), [0.0])
+        store.submit(3, 3, 3, 3, canteen="甲", canteen_rating=4)
+        store.flush()
+        assert store.rating_summary() == {"甲": (1, 4.0)}
+    finally:
+        store.close()
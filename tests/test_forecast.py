@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import load_catalog
+from forecast import CrowdForecaster, check_slot_minutes, main
+from opening_hours import MINUTES_PER_DAY
+
+SEATS = np.array([100.0, 200.0])
+
+
+def forecaster(slot_minutes=5, **kwargs):
+    prior = np.full((2, MINUTES_PER_DAY // slot_minutes), 40.0)
+    return CrowdForecaster(["甲", "乙"], SEATS, prior, slot_minutes, **kwargs)
+
+
+def occupancy(level):
+    """两个食堂全天占用 level 比例的在场人数 (2, 1440)"""
+    return np.repeat(SEATS[:, None] * level, MINUTES_PER_DAY, axis=1)
+
+
+def test_prior_only_without_data():
+    model = forecaster()
+    assert np.allclose(model.table, 40.0)
+    assert model.predict([720], 3).shape == (1, 2)
+
+
+def test_partial_fit_blends_with_prior():
+    model = forecaster(prior_weight=1.0)
+    model.partial_fit(occupancy(0.8), weekday=2)
+    # (80 + 40 * 1) / (1 + 1)
+    assert np.allclose(model.table[:, 2], 60.0)
+    assert np.allclose(model.table[:, 3], 40.0)
+    assert np.allclose(model.predict([0, 1439], [2, 3]), [[60.0, 60.0], [40.0, 40.0]])
+    assert model.version == 1
+
+
+def test_missing_minutes_only_update_observed_slots():
+    model = forecaster()
+    day = occupancy(0.8)
+    day[:, :MINUTES_PER_DAY // 2] = np.nan
+    day[0, -3:] = np.nan                  # 时间槽内部分缺测时按观测到的分钟取平均
+    model.partial_fit(day, weekday=0)
+    assert np.allclose(model.table[:, 0, 0], 40.0)
+    assert np.allclose(model.table[:, 0, -1], 60.0)
+
+
+def test_fit_equals_sequence_of_partial_fits():
+    days = [(2, occupancy(0.5)), (2, occupancy(0.9)), (4, occupancy(0.3))]
+    incremental = forecaster(decay=0.5)
+    for weekday, day in days:
+        incremental.partial_fit(day, weekday)
+    refit = forecaster(decay=0.5)
+    refit.partial_fit(occupancy(0.1), 2)
+    refit.fit(days)
+    assert np.allclose(incremental.table, refit.table)
+    # decay=0.5：(0.5 * 50 + 90 + 40) / (0.5 * 1 + 1 + 1)
+    assert np.allclose(incremental.table[:, 2], (0.5 * 50 + 90 + 40) / 2.5, atol=1e-4)
+
+
+def test_fit_frame_groups_by_day():
+    frame = pd.DataFrame({
+        "canteen": ["甲", "甲", "乙", "丙"],
+        "time": ["2026-10-14 12:00", "2026-10-14 12:01", "2026-10-15 18:00", "2026-10-14 12:00"],
+        "occupancy": [80, 80, 160, 999],
+    })
+    model = forecaster(slot_minutes=1).fit_frame(frame)
+    assert model.table[0, 2, 720] == pytest.approx(60.0)          # 周三 12:00，甲
+    assert model.table[1, 3, 1080] == pytest.approx(60.0)         # 周四 18:00，乙
+    assert model.table[1, 2, 720] == pytest.approx(40.0)
+
+
+def test_save_and_load_align_by_name(tmp_path):
+    model = forecaster()
+    model.partial_fit(occupancy(0.8), weekday=1)
+    path = str(tmp_path / "forecast.npz")
+    model.save(path)
+    assert np.allclose(CrowdForecaster.load(path).table, model.table)
+
+    canteens = load_catalog().arrays
+    aligned = CrowdForecaster.load(path, canteens)
+    assert aligned.names == canteens.names and aligned.slot_minutes == 5
+
+
+@pytest.mark.parametrize("slot_minutes", [0, -5, 7, 2.5])
+def test_slot_minutes_must_divide_day(slot_minutes):
+    with pytest.raises(ValueError, match="整除"):
+        check_slot_minutes(slot_minutes)
+    with pytest.raises(ValueError):
+        CrowdForecaster(["甲"], [100], np.zeros((1, 1)), slot_minutes)
+
+
+def test_cli_rejects_bad_slot_minutes(capsys):
+    with pytest.raises(SystemExit):
+        main(["history.csv", "--slot-minutes", "7"])
+    assert "整除" in capsys.readouterr().err
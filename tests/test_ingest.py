@@ -0,0 +1,87 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import CountStore, arrivals_to_occupancy, ingest, iter_log_chunks, iter_occupancy_days
+
+NAMES = ["甲", "乙"]
+LOG = "canteen,time\n甲,2026-10-14 12:00:30\n甲,2026-10-14 12:00:59\n乙,2026-10-15 18:01\n丙,2026-10-14 12:00\n甲,坏时间\n"
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "swipes.csv"
+    path.write_text(LOG, encoding="utf-8")
+    return str(path)
+
+
+def test_ingest_counts_per_day_and_minute(tmp_path, log):
+    directory = str(tmp_path / "counts")
+    counted, skipped, repeated = ingest([log], directory, NAMES, chunk_size=2)
+    assert (counted, skipped, repeated) == (3, 2, [])
+
+    store = CountStore.open(directory)
+    assert store.names == NAMES
+    assert store.days() == [pd.Timestamp("2026-10-14"), pd.Timestamp("2026-10-15")]
+    day = store.load_day("2026-10-14")
+    assert day.dtype == np.uint32 and day.shape == (2, 1440)
+    assert day[0, 720] == 2 and day.sum() == 2
+    assert store.load_day("2026-10-15")[1, 1081] == 1
+
+
+def test_reingesting_same_content_is_skipped(tmp_path, log):
+    directory = str(tmp_path / "counts")
+    ingest([log], directory, NAMES)
+    copy = str(tmp_path / "copy.csv")
+    shutil.copy(log, copy)
+    counted, _, repeated = ingest([log, copy], directory, NAMES)
+    assert counted == 0 and repeated == [log, copy]
+    assert CountStore.open(directory).load_day("2026-10-14")[0, 720] == 2
+
+    # 新的流水照常累加
+    more = tmp_path / "more.csv"
+    more.write_text("canteen,time\n甲,2026-10-14 12:00\n", encoding="utf-8")
+    assert ingest([str(more)], directory, NAMES)[0] == 1
+    assert CountStore.open(directory).load_day("2026-10-14")[0, 720] == 3
+    assert len(CountStore.open(directory).files) == 2
+
+
+def test_failed_file_leaves_counts_untouched(tmp_path, log, monkeypatch):
+    directory = str(tmp_path / "counts")
+    ingest([log], directory, NAMES)
+    more = tmp_path / "more.csv"
+    more.write_text("canteen,time\n甲,2026-10-14 12:00\n乙,2026-10-14 12:00\n", encoding="utf-8")
+
+    def broken_chunks(path, chunk_size, columns):
+        yield from iter_log_chunks(path, 1, columns)
+        raise OSError("读取中断")
+
+    monkeypatch.setattr("ingest.iter_log_chunks", broken_chunks)
+    with pytest.raises(OSError):
+        ingest([str(more)], directory, NAMES)
+    store = CountStore.open(directory)
+    assert store.load_day("2026-10-14").sum() == 2 and len(store.files) == 1
+
+    monkeypatch.undo()
+    assert ingest([str(more)], directory, NAMES)[0] == 2
+
+
+def test_create_rejects_different_names(tmp_path):
+    CountStore.create(str(tmp_path), NAMES)
+    with pytest.raises(ValueError, match="不一致"):
+        CountStore.create(str(tmp_path), ["乙", "甲"])
+
+
+def test_occupancy_from_arrivals(tmp_path, log):
+    arrivals = np.zeros((1, 1440))
+    arrivals[0, 10] = 4
+    occupancy = arrivals_to_occupancy(arrivals, dwell_minutes=3)
+    assert occupancy[0, 9:14].tolist() == [0, 4, 4, 4, 0]
+
+    directory = str(tmp_path / "counts")
+    ingest([log], directory, NAMES)
+    days = list(iter_occupancy_days(CountStore.open(directory), ["乙", "丁"]))
+    assert [weekday for weekday, _ in days] == [2, 3]
+    assert np.isnan(days[0][1][1]).all() and days[1][1][0, 1081] == 1
@@ -0,0 +1,110 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from menu import Menu, MenuError, load_menu, query_terms
+
+DB = {"甲": {"opening_hours": "6:30-20:30"}, "乙": {"opening_hours": "10:30-13:30, 16:30-22:00"}}
+RECORDS = [
+    {"canteen": "甲", "name": "牛肉米线", "price": 14, "tags": ["牛肉", "米线"]},
+    {"canteen": "甲", "name": "小锅米线", "price": 10, "tags": ["米线", "早餐"], "hours": "6:30-10:00"},
+    {"canteen": "乙", "name": "红烧牛肉面", "price": 16, "tags": ["牛肉", "面食"]},
+    {"canteen": "乙", "name": "牛肉米线", "price": 15, "tags": ["牛肉", "米线", "辣"]},
+    {"canteen": "乙", "name": "烤串", "price": 3, "tags": ["夜宵", "BBQ"], "hours": "18:00-22:00"},
+    {"canteen": "乙", "name": "素米线", "price": 8, "tags": ["米线", "素菜"]},
+    {"canteen": "丙", "name": "不在目录里的菜", "price": 1},
+]
+
+
+@pytest.fixture(scope="module")
+def menu():
+    return Menu.build(RECORDS, DB)
+
+
+def reference(terms, price_range=None):
+    """逐道菜核对：每个词都出现在菜名或某个标签中，且价格在预算内（两端都包含）"""
+    found = []
+    for r in RECORDS[:-1]:
+        fields = [r["name"].lower(), *(t.lower() for t in r.get("tags", []))]
+        if not all(any(term in f for f in fields) for term in terms):
+            continue
+        if price_range is not None and not price_range[0] <= r["price"] <= price_range[1]:
+            continue
+        found.append((r["price"], r["name"], r["canteen"]))
+    return sorted(found)
+
+
+def test_query_terms():
+    assert query_terms("  牛肉 米线，牛肉 ") == ("牛肉", "米线")
+    assert query_terms("BBQ/辣") == ("bbq", "辣")
+    assert query_terms(None) == ()
+
+
+def test_build_sorts_by_price_and_skips_unknown_canteens(menu):
+    assert len(menu) == 6
+    assert list(menu.price) == sorted(menu.price)
+    assert "不在目录里的菜" not in menu.names
+
+
+@pytest.mark.parametrize("query", ["米线", "牛肉 米线", "牛", "红烧牛肉", "牛肉面", "肉米", "bbq", "早餐 米线",
+                                   "米线 素菜", "辣", "火锅", "牛肉米线面"])
+@pytest.mark.parametrize("price_range", [None, (8, 15), (14, 14), (0, 3), (20, 10), (16.5, 100)])
+def test_search_matches_reference(menu, query, price_range):
+    matches = menu.search(query, price_range)
+    got = sorted((float(menu.price[i]), menu.names[i], list(DB)[menu.canteen[i]]) for i in matches.ids)
+    assert got == reference(query_terms(query), price_range)
+    assert list(matches.ids) == sorted(matches.ids)           # 编号递增即价格递增
+
+
+def test_price_bounds_are_inclusive(menu):
+    lo, hi = menu.price_bounds((10, 15))
+    assert menu.price[lo:hi].tolist() == [10, 14, 15]
+    assert menu.price_bounds(None) == (0, len(menu))
+    assert menu.price_bounds((100, 200)) == (len(menu), len(menu))
+
+
+def test_canteen_mask_follows_dish_hours(menu):
+    matches = menu.search("米线")
+    mask = matches.canteen_mask([7 * 60, 12 * 60, 21 * 60])
+    assert mask.tolist() == [[True, False], [True, True], [False, True]]
+    # 小锅米线只供应早餐，其他菜品随食堂营业时间
+    assert matches.by_canteen(7 * 60) == {0: [("小锅米线", 10.0), ("牛肉米线", 14.0)]}
+    assert matches.by_canteen(10 * 60 + 15) == {0: [("牛肉米线", 14.0)]}
+    assert [name for name, _ in matches.by_canteen(12 * 60, limit=1)[1]] == ["素米线"]
+    assert not menu.search("烤串").canteen_mask([12 * 60]).any()
+
+
+def test_validate_lists_every_problem():
+    records = [{"name": "甲菜", "canteen": "甲", "price": -1, "tags": "辣"}, {"canteen": "甲"},
+               {"name": "乙菜", "canteen": "乙", "price": 5, "hours": "25:00-26:00"}]
+    with pytest.raises(MenuError) as info:
+        Menu.build(records, DB)
+    message = str(info.value)
+    for expected in ("price 必须是非负数", "tags 必须是字符串列表", "第 2 道菜缺少 name", "乙菜: hours 无效"):
+        assert expected in message
+
+
+def test_load_menu(tmp_path):
+    assert len(load_menu(DB, str(tmp_path / "missing.json"))) == 0
+    path = tmp_path / "dishes.json"
+    path.write_text(json.dumps({"dishes": RECORDS[:2]}, ensure_ascii=False), encoding="utf-8")
+    loaded = load_menu(DB, str(path))
+    assert len(loaded) == 2 and loaded.mtime is not None
+    path.write_text("{", encoding="utf-8")
+    with pytest.raises(MenuError, match="无法读取"):
+        load_menu(DB, str(path))
+
+
+def test_search_on_generated_menu():
+    rng = np.random.default_rng(0)
+    words = ["牛肉", "米线", "鸡", "面", "饭", "辣", "素", "汤"]
+    records = [{"canteen": "甲" if i % 2 else "乙", "name": "".join(rng.choice(words, 2)),
+                "price": int(rng.integers(1, 40)), "tags": list(rng.choice(words, 2))} for i in range(2000)]
+    menu = Menu.build(records, DB)
+    for terms in itertools.combinations(words, 2):
+        ids = menu.search(terms, (10, 30)).ids
+        expected = [i for i in range(len(menu)) if 10 <= menu.price[i] <= 30 and all(
+            any(t in f for f in [menu.names[i], *menu.tags[i]]) for t in terms)]
+        assert ids.tolist() == expected
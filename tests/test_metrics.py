@@ -0,0 +1,93 @@
+import re
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import BUCKETS, PROCESS_START_TIME, Metrics, start_metrics_server
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def parse(text):
+    """解析 Prometheus 文本格式，同时检查每个样本之前都有所属指标的 HELP 与 TYPE"""
+    assert text.endswith("\n")
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in types, f"{name} 重复声明"
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"无效的样本行: {line!r}"
+        name, labels, value = match.group(1), match.group(2) or "", float(match.group(3))
+        family = re.sub(r"_(bucket|sum|count)$", "", name)
+        assert name in types or family in types, f"{name} 没有 TYPE"
+        samples.append((name, labels, value))
+    return types, samples
+
+
+def test_exposition_format():
+    metrics = Metrics()
+    metrics.inc("feedback", help_text="反馈提交次数", kind='he said "hi"\n')
+    metrics.inc("reruns", 2)
+    metrics.counter_fn("result_cache_hits", "缓存命中", lambda: 7)
+    for seconds in (0.0005, 0.003, 0.2, 30.0):
+        metrics.observe("script", seconds)
+    metrics.touch_session("s1")
+
+    types, samples = parse(metrics.render_prometheus())
+    assert types["canteen_reruns_total"] == "counter"
+    assert types["canteen_section_seconds"] == "histogram"
+    assert types["process_start_time_seconds"] == "gauge"
+    values = {(name, labels): value for name, labels, value in samples}
+    assert values[("canteen_feedback_total", '{kind="he said \\"hi\\"\\n"}')] == 1
+    assert values[("canteen_result_cache_hits_total", "")] == 7
+    assert values[("canteen_active_sessions", "")] == 1
+
+    buckets = [value for name, labels, value in samples if name == "canteen_section_seconds_bucket"]
+    assert len(buckets) == len(BUCKETS) + 1
+    assert buckets == sorted(buckets)                          # 桶计数累积
+    assert buckets[-1] == values[("canteen_section_seconds_count", '{section="script"}')] == 4
+    assert values[("canteen_section_seconds_sum", '{section="script"}')] == pytest.approx(30.2035)
+
+
+def test_process_start_time_is_the_process_not_the_registry():
+    assert PROCESS_START_TIME <= time.time()
+    first = dict(((name, value) for name, _, value in parse(Metrics().render_prometheus())[1]))
+    time.sleep(0.01)
+    second = dict(((name, value) for name, _, value in parse(Metrics().render_prometheus())[1]))
+    assert first["process_start_time_seconds"] == second["process_start_time_seconds"] == PROCESS_START_TIME
+
+
+def test_latency_and_sessions():
+    now = [0.0]
+    metrics = Metrics(clock=lambda: now[0])
+    assert metrics.latency("script") is None
+    for ms in range(1, 101):
+        metrics.observe("script", ms / 1000)
+    assert metrics.latency("script", 0.5) == pytest.approx(0.051)
+    metrics.touch_session("a")
+    now[0] = 301.0
+    metrics.touch_session("b")
+    assert metrics.active_sessions() == 1
+
+
+def test_metrics_endpoint():
+    metrics = Metrics()
+    metrics.inc("reruns")
+    server = start_metrics_server(metrics, "127.0.0.1", 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "canteen_reruns_total 1" in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+    finally:
+        server.shutdown()
+        server.server_close()
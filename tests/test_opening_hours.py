@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from opening_hours import (
+    MINUTES_PER_DAY, OpeningHoursIndex, format_intervals, parse_intervals, parse_schedule, parse_weekdays,
+    schedule_mask
+)
+
+
+def test_parse_intervals_variants():
+    assert parse_intervals("11:00-13:30, 17:00-19:00") == [(660, 810), (1020, 1140)]
+    assert parse_intervals("6：30～20：30") == [(390, 1230)]
+    assert parse_intervals("0:00-24:00") == [(0, MINUTES_PER_DAY)]
+
+
+@pytest.mark.parametrize("text", ["11:00", "25:00-26:00", "11:60-12:00", "12:00-12:00", "abc"])
+def test_parse_intervals_rejects(text):
+    with pytest.raises(ValueError):
+        parse_intervals(text)
+
+
+def test_format_intervals_round_trip():
+    text = "6:30-20:30, 22:00-2:00"
+    assert format_intervals(parse_intervals(text)) == text
+
+
+def test_parse_weekdays():
+    assert parse_weekdays(3) == [3]
+    assert parse_weekdays("mon-fri") == [0, 1, 2, 3, 4]
+    assert parse_weekdays("sat,sun") == [5, 6]
+    assert parse_weekdays("0-2, 6") == [0, 1, 2, 6]
+
+
+def test_parse_weekdays_wraps_past_sunday():
+    assert parse_weekdays("fri-mon") == [4, 5, 6, 0]
+    assert parse_weekdays("6-1") == [6, 0, 1]
+
+
+@pytest.mark.parametrize("key", [7, -1, "0-9", "mon-xyz", "funday", "mon-wed-fri"])
+def test_parse_weekdays_rejects(key):
+    with pytest.raises(ValueError):
+        parse_weekdays(key)
+
+
+def test_schedule_dict_leaves_unlisted_days_closed():
+    schedule = parse_schedule({"fri-sun": "10:00-14:00"})
+    assert sorted(schedule) == [4, 5, 6]
+
+
+def test_overnight_interval_spills_into_next_day():
+    mask = schedule_mask({"sun": "22:00-2:00"})
+    assert mask[6, 22 * 60:].all()
+    assert mask[0, :120].all()            # 周日跨到周一
+    assert not mask[0, 120:].any()
+    assert mask.sum() == 4 * 60
+
+
+def test_index_queries_match_masks():
+    hours = ["6:30-20:30", "11:00-13:30, 17:00-19:00", {"sat,sun": "16:00-1:00"}]
+    index = OpeningHoursIndex.from_hours(hours)
+    masks = np.array([schedule_mask(h) for h in hours])
+    rng = np.random.default_rng(0)
+    minutes = rng.integers(0, MINUTES_PER_DAY, 500)
+    weekdays = rng.integers(0, 7, 500)
+    expected = masks[:, weekdays, minutes].T
+    assert np.array_equal(index.is_open(minutes, weekdays), expected)
+    assert np.array_equal(index.minute_mask(5), masks[:, 5])
+
+
+def test_open_during_wraps_midnight():
+    index = OpeningHoursIndex.from_hours(["23:00-23:30", "0:30-1:00"])
+    assert index.open_during(22 * 60 + 50, 40, weekday=0).tolist() == [True, True]
+    assert index.open_during(23 * 60 + 40, 20, weekday=0).tolist() == [False, False]
+    assert index.open_during(22 * 60, 24 * 60, weekday=0, require_all=True).tolist() == [False, False]
@@ -0,0 +1,95 @@
+import asyncio
+import os
+from datetime import datetime
+
+import numpy as np
+
+from api_server import RecommendationService
+from catalog import CatalogStore
+from personalization import PreferenceModel, PreferenceSaver, load_or_empty, main
+from shared_state import SharedState
+from tests.test_shared_state import write_catalog
+
+NAMES = ["甲", "乙", "丙"]
+
+
+def test_saver_writes_only_after_updates(tmp_path):
+    path = str(tmp_path / "preferences.npz")
+    model = PreferenceModel(NAMES, seed=0)
+    saver = PreferenceSaver(model, path, interval=3600)
+    assert not saver.save_if_changed()
+    assert not os.path.exists(path)
+
+    model.partial_fit(["卡1"], ["甲"], ratings=[5])
+    assert saver.save_if_changed()
+    assert not saver.save_if_changed()
+    loaded = load_or_empty(NAMES, path)
+    assert "卡1" in loaded
+    assert np.allclose(loaded.adjustment_for("卡1"), model.adjustment_for("卡1"))
+
+
+def test_saver_flushes_on_stop(tmp_path):
+    path = str(tmp_path / "preferences.npz")
+    model = PreferenceModel(NAMES, seed=0)
+    saver = PreferenceSaver(model, path, interval=3600).start()
+    model.partial_fit(["卡1"], ["乙"], ratings=[4])
+    saver.stop()
+    assert "卡1" in load_or_empty(NAMES, path)
+
+
+def test_saver_keeps_external_retrain(tmp_path):
+    path = str(tmp_path / "preferences.npz")
+    model = PreferenceModel(NAMES, seed=0)
+    saver = PreferenceSaver(model, path, interval=3600)
+    model.partial_fit(["卡1"], ["甲"], ratings=[5])
+    assert saver.save_if_changed()
+
+    # 命令行在文件上重训，同时页面又收到一条评分：同步后两边的交互都在
+    retrained = PreferenceModel.load(path, NAMES)
+    retrained.partial_fit(["卡2"], ["乙"], ratings=[4])
+    retrained.save(path)
+    os.utime(path, ns=(1, 1))
+    model.partial_fit(["卡3"], ["丙"], ratings=[3])
+    version = model.version
+    assert saver.save_if_changed()
+    assert model.version > version
+    assert all(card in model for card in ("卡1", "卡2", "卡3"))
+    saved = load_or_empty(NAMES, path)
+    assert all(card in saved for card in ("卡1", "卡2", "卡3"))
+
+    # 没有本地更新时只读取文件、不写盘
+    other = PreferenceModel.load(path, NAMES)
+    other.partial_fit(["卡4"], ["甲"], ratings=[2])
+    other.save(path)
+    os.utime(path, ns=(2, 2))
+    assert not saver.save_if_changed()
+    assert "卡4" in model and os.path.getmtime(path) == 2e-9
+
+
+def test_cli_ratings_use_user_column(tmp_path):
+    catalog = tmp_path / "canteens.json"
+    write_catalog(catalog, ["甲", "乙"], 1)
+    ratings = tmp_path / "ratings.csv"
+    ratings.write_text("student,canteen,rating\n007,甲,5\n")
+    path = str(tmp_path / "preferences.npz")
+    main(["--ratings", str(ratings), "--user-col", "student", "--catalog", str(catalog), "-o", path])
+    assert "007" in load_or_empty(["甲", "乙"], path)
+
+
+def test_api_reloads_saved_preferences(tmp_path):
+    catalog = tmp_path / "canteens.json"
+    write_catalog(catalog, ["甲", "乙"], 1)
+    state = SharedState(catalog_store=CatalogStore(str(catalog)), forecast_path=str(tmp_path / "forecast.npz"),
+                        clock=lambda: datetime(2026, 10, 14, 12, 0))
+    path = str(tmp_path / "preferences.npz")
+    service = RecommendationService(state, preferences=load_or_empty(["甲", "乙"], path), preferences_path=path)
+    preferences, _ = service.preference_model(state.snapshot)
+    assert "卡1" not in preferences
+
+    model = PreferenceModel(["甲", "乙"], seed=0)
+    model.partial_fit(["卡1"], ["甲"], ratings=[5])
+    model.save(path)
+    preferences, _ = service.preference_model(state.snapshot)
+    assert "卡1" in preferences
+    response = asyncio.run(service.handle("GET", "/api/recommendations?card=卡1&time=12:00", {}))
+    assert response.status == 200
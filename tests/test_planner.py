@@ -0,0 +1,40 @@
+from dataclasses import replace
+
+import numpy as np
+
+from catalog import load_catalog
+from forecast import CrowdForecaster
+from planner import plan_day, plan_frame
+from scoring import CANTEEN_TYPES, PEAK_FACTOR_THRESHOLD
+from shared_state import build_day_tables
+
+WEDNESDAY = 2
+
+
+def lunch_plan():
+    canteens = load_catalog("data/canteens.json").arrays
+    # 压低基础分，使高峰期的时间因子不会被推荐分上限截平
+    canteens = replace(canteens, base_score=canteens.base_score / 2)
+    crowd, queue, _ = build_day_tables(canteens, CrowdForecaster.for_canteens(canteens), WEDNESDAY)
+    plan = plan_day(canteens, "本科生", "日常快速就餐", (5, 60), 60, list(CANTEEN_TYPES), WEDNESDAY, crowd,
+                    queue.wait, start=11 * 60, end=13 * 60 + 30)
+    return canteens, plan
+
+
+def test_planner_avoids_peak_slot():
+    canteens, plan = lunch_plan()
+    assert (plan.time_factor > PEAK_FACTOR_THRESHOLD).any()
+    best_slot, _ = plan.best_per_canteen()
+    cols = np.flatnonzero(plan.feasible.any(axis=0))
+    assert len(cols) and (best_slot[cols] >= 0).all()
+    assert (plan.time_factor[best_slot[cols]] <= PEAK_FACTOR_THRESHOLD).all()
+    total_wait = np.where(plan.feasible, plan.total_wait, np.iinfo(np.int16).max)
+    assert (total_wait[best_slot[cols], cols] == total_wait[:, cols].min(axis=0)).all()
+
+
+def test_plan_frame_ranks_by_preference_without_time_factor():
+    canteens, plan = lunch_plan()
+    frame = plan_frame(canteens, plan)
+    assert len(frame) == plan.feasible.any(axis=0).sum()
+    assert (np.diff(frame["推荐指数"].to_numpy()) <= 0).all()
+    assert all(not (11 * 60 + 40 <= t.hour * 60 + t.minute <= 12 * 60 + 30) for t in frame["就餐时间"])
@@ -0,0 +1,52 @@
+from math import factorial
+
+import numpy as np
+import pytest
+
+from queueing import MAX_UTILIZATION, erlang_c, estimate, steady_state_wait
+
+
+def closed_form_erlang_c(c, a):
+    top = a ** c / factorial(c) * c / (c - a)
+    return top / (sum(a ** k / factorial(k) for k in range(c)) + top)
+
+
+def test_erlang_c_known_values():
+    assert erlang_c(1, 0.5) == pytest.approx(0.5)          # M/M/1 时等于利用率
+    assert erlang_c(2, 1.0) == pytest.approx(1 / 3)
+
+
+def test_erlang_c_matches_closed_form_on_grid():
+    servers = np.array([1, 2, 4, 8, 16, 30])[:, None]
+    loads = servers * np.array([0.1, 0.5, 0.8, 0.95])[None, :]
+    expected = np.vectorize(closed_form_erlang_c)(servers, loads)
+    assert np.allclose(erlang_c(servers, loads), expected)
+
+
+def test_erlang_c_mixed_server_counts_broadcast():
+    servers = np.array([[1, 3], [5, 12]])
+    loads = np.array([[0.7, 2.0], [4.0, 6.0]])
+    expected = np.vectorize(closed_form_erlang_c)(servers, loads)
+    assert np.allclose(erlang_c(servers, loads), expected)
+
+
+def test_steady_state_wait_mm1():
+    lam, mu = 0.8, 1.0
+    assert steady_state_wait(lam, 1, mu) == pytest.approx(lam / (mu * (mu - lam)))
+
+
+def test_steady_state_wait_is_capped_when_overloaded():
+    capped = steady_state_wait(5.0, 2, 1.0)
+    at_limit = steady_state_wait(2 * MAX_UTILIZATION, 2, 1.0)
+    assert np.isfinite(capped) and capped == pytest.approx(at_limit)
+
+
+def test_backlog_accumulates_then_drains():
+    # 1 个窗口每分钟服务 1 人：前 10 分钟每分钟来 2 人，之后没人来
+    rate = np.concatenate([np.full(10, 2.0), np.zeros(30)])[None, :]
+    result = estimate(rate, [1], [1.0], [100])
+    backlog_wait = result.wait[0] - steady_state_wait(rate[0], 1, 1.0) - 1.0
+    assert backlog_wait[9] == pytest.approx(10.0)          # 积压 10 人
+    assert backlog_wait[19] == pytest.approx(0.0)          # 再过 10 分钟清空
+    assert (np.diff(backlog_wait[:10]) > 0).all()
+    assert (result.seat_occupancy <= 1.0).all()
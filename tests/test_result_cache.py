@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from result_cache import ResultCache, bucket_minute, normalize_query, rng_for_key, seed_for_key
+from scoring import CANTEEN_TYPES
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # a 变为最近使用
+    cache.put("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_expires_entries():
+    clock = FakeClock()
+    cache = ResultCache(maxsize=8, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    sentinel = object()
+    assert cache.get("a", sentinel) is sentinel
+    assert len(cache) == 0
+
+    # 重新写入时重新计时
+    cache.put("a", 2)
+    clock.now = 19.0
+    assert cache.get("a") == 2
+
+
+def test_get_or_compute_computes_once_per_key():
+    cache = ResultCache(clock=FakeClock())
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or "v") == "v"
+    assert len(calls) == 1
+
+
+def test_normalize_query_buckets_and_sorts():
+    key = normalize_query("本科生", "日常快速就餐", 12 * 60 + 4, (8.0, 25), 15.0, ["快餐食堂", "大众食堂", "快餐食堂"], 2)
+    same = normalize_query("本科生", "日常快速就餐", 12 * 60, (8, 25), 15, ["大众食堂", "快餐食堂"], 2)
+    assert key == same
+    assert key[3] == 720 and key[7] == ("大众食堂", "快餐食堂")
+    assert hash(key) == hash(same)
+    assert normalize_query("本科生", "日常快速就餐", 12 * 60 + 5, (8, 25), 15, CANTEEN_TYPES, 2)[3] == 725
+    assert normalize_query("本科生", "日常快速就餐", 720, (8, 25), 15, CANTEEN_TYPES, 3) != \
+        normalize_query("本科生", "日常快速就餐", 720, (8, 25), 15, CANTEEN_TYPES, 2)
+    assert bucket_minute(59, 15) == 45
+
+
+def test_key_seed_is_stable_across_processes():
+    key = normalize_query("研究生", "朋友聚餐", 18 * 60, (15, 35), 20, CANTEEN_TYPES, 4, origin="教学楼A区")
+    assert np.array_equal(rng_for_key(key).random(8), rng_for_key(key).random(8))
+    assert seed_for_key(key) != seed_for_key(key[:-1] + (None,))
+
+    # 种子不受 PYTHONHASHSEED 影响：另一个进程用不同的哈希种子得到同一个值
+    code = ("from result_cache import normalize_query, seed_for_key; from scoring import CANTEEN_TYPES; "
+            "print(seed_for_key(normalize_query('研究生', '朋友聚餐', 1080, (15, 35), 20, CANTEEN_TYPES, 4, "
+            "origin='教学楼A区')))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONHASHSEED": "123"}).stdout
+    assert int(output) == seed_for_key(key)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import load_catalog
+from results import CROWD_LABELS, RECOMMEND_LEVELS, arrow_ipc_bytes, crowd_codes, result_frame, to_arrow
+from scoring import CANTEEN_TYPES, ScoreResult
+
+
+@pytest.fixture(scope="module")
+def frame():
+    canteens = load_catalog().arrays
+    m = len(canteens)
+    eligible = np.ones((1, m), dtype=bool)
+    eligible[0, 1] = False
+    crowd = np.linspace(10.0, 95.0, m)[None, :]
+    recommended = np.arange(m)[None, :] % 2 == 0
+    strong = recommended & (np.arange(m)[None, :] % 4 == 0)
+    result = ScoreResult(
+        eligible=eligible, score=np.linspace(5.0, 9.0, m)[None, :], wait=np.full((1, m), 4.5),
+        walk=np.zeros((1, m)), total_wait=np.full((1, m), 4.5), crowd=crowd, recommended=recommended,
+        strong=strong, time_factor=np.ones(1),
+    )
+    return canteens, result_frame(canteens, result, np.full(m, 0.25))
+
+
+def test_crowd_codes_boundaries():
+    # 与原页面相同的左闭右开分级：< 30 非常空闲，30 起为比较空闲，85 起为非常拥挤
+    assert crowd_codes(np.array([0, 29.9, 30, 49.9, 50, 70, 84.9, 85, 100])).tolist() == [0, 0, 1, 1, 2, 3, 3, 4, 4]
+    assert len(CROWD_LABELS) == 5
+
+
+def test_frame_dtypes(frame):
+    canteens, df = frame
+    assert len(df) == len(canteens) - 1
+    assert canteens.names[1] not in df["食堂名称"].tolist()
+    for column in ("最低价", "最高价", "座位数", "推荐指数", "等待时间", "步行时间", "拥挤度", "座位占用"):
+        assert pd.api.types.is_numeric_dtype(df[column]), column
+    assert df["推荐"].dtype == bool
+    assert isinstance(df["类型"].dtype, pd.CategoricalDtype)
+    assert list(df["类型"].cat.categories) == CANTEEN_TYPES
+    assert df["拥挤状态"].cat.ordered and list(df["拥挤状态"].cat.categories) == CROWD_LABELS
+    assert df["推荐状态"].cat.ordered and list(df["推荐状态"].cat.categories) == RECOMMEND_LEVELS
+
+    # 推荐状态与推荐、强烈推荐一致，排序按 不推荐 < 推荐 < 强烈推荐
+    assert (df["推荐"] == (df["推荐状态"] > RECOMMEND_LEVELS[0])).all()
+    assert df.sort_values("推荐状态")["推荐状态"].iloc[-1] in (RECOMMEND_LEVELS[1], RECOMMEND_LEVELS[2])
+
+
+def test_arrow_round_trip(frame):
+    pa = pytest.importorskip("pyarrow")
+    _, df = frame
+    table = to_arrow(df)
+    assert pa.types.is_dictionary(table.schema.field("拥挤状态").type)
+    assert pa.types.is_boolean(table.schema.field("推荐").type)
+    with pa.ipc.open_stream(arrow_ipc_bytes(df)) as reader:
+        restored = reader.read_all().to_pandas()
+    pd.testing.assert_frame_equal(restored, df)
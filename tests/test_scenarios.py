@@ -0,0 +1,32 @@
+import numpy as np
+
+from scenarios import _meal_metrics, read_records, run_scenarios, summarize
+from simulator import SimulationResult
+
+
+def make_result(choice, served, queue_wait):
+    n = len(choice)
+    return SimulationResult(
+        policy="forecast", minutes=np.arange(11 * 60, 11 * 60 + 3), queue_length=np.zeros((2, 3), dtype=np.int32),
+        seats_used=np.zeros((2, 3), dtype=np.int32), choice=np.array(choice), served=np.array(served),
+        walk=np.zeros(n), queue_wait=np.array(queue_wait, dtype=float), seat_wait=np.zeros(n),
+        seats=np.array([100, 100]), scoring_seconds=0.0, scored_profiles=n, elapsed_seconds=0.0,
+    )
+
+
+def test_meal_metrics_count_only_served_students():
+    result = make_result([0, 0, 1, -1], [True, False, True, False], [4.0, 0.0, 6.0, 0.0])
+    metrics = _meal_metrics(np.zeros(2), result, "lunch")
+    assert metrics["students"].tolist() == [2, 1]
+    assert metrics["served"].tolist() == [1, 1]
+    assert metrics["unserved"].tolist() == [1, 0]
+    assert metrics["mean_queue_wait"].tolist() == [4.0, 6.0]
+
+
+def test_summary_weights_by_served_students(tmp_path):
+    _, records, buildings = read_records("data/canteens.json")
+    frame = run_scenarios([("现状", [])], records, buildings, students=300, workers=1,
+                          forecast_path=str(tmp_path / "forecast.npz"))
+    assert (frame["unserved"] == 0).all()
+    totals = summarize(frame)
+    assert totals.loc[0, "served"] == frame["served"].sum() == frame["students"].sum()
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from catalog import load_catalog
+from scoring import (
+    CANTEEN_TYPES, DINING_PURPOSES, USER_TYPES, build_profiles, score_profiles, single_profile, time_factor
+)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+def reference_row(name, info, user_type, purpose, minute, price_range, max_wait, wait_noise, crowd_noise):
+    """原页面 calculate_recommendations() 的逐行规则（营业时间过滤除外），返回 (分数, 等待, 拥挤度, 推荐)"""
+    if (11 * 60 + 40 <= minute <= 12 * 60 + 30) or (17 * 60 + 40 <= minute <= 18 * 60 + 30):
+        factor = 1.8
+    elif (11 * 60 <= minute <= 11 * 60 + 40) or (17 * 60 <= minute <= 17 * 60 + 40):
+        factor = 1.3
+    elif (12 * 60 + 30 <= minute <= 13 * 60) or (18 * 60 + 30 <= minute <= 19 * 60):
+        factor = 1.1
+    else:
+        factor = 1.0
+
+    min_price, max_price = info["price_range"]
+    score = info["base_score"]
+    avg_price = (min_price + max_price) / 2
+    if avg_price > price_range[1]:
+        score -= 1.5
+    elif avg_price > (price_range[0] + price_range[1]) / 2:
+        score -= 0.5
+    if user_type == "教师" and "教工" in name:
+        score += 1.0
+    elif user_type == "留学生" and "清真" in name:
+        score += 1.0
+    if purpose == "学习讨论" and "教工" in name:
+        score += 1.0
+    elif purpose == "朋友聚餐" and ("夜宵" in name or "美食" in name):
+        score += 1.0
+    elif purpose == "日常快速就餐" and "快餐" in name:
+        score += 0.8
+    score = max(1.0, min(10.0, score * factor))
+
+    base_wait = 10
+    if factor > 1.5:
+        base_wait *= 1.8
+    if "快餐" in name:
+        base_wait *= 0.7
+    if "大众" in name:
+        base_wait *= 1.3
+    wait = max(3, min(40, int(base_wait + wait_noise)))
+
+    base_crowd = 50 * factor
+    if "教工" in name:
+        base_crowd *= 0.7
+    if "大众" in name:
+        base_crowd *= 1.3
+    crowd = max(10, min(95, int(base_crowd + crowd_noise)))
+    return score, wait, crowd, score >= 6.5 and wait <= max_wait
+
+
+def test_time_factor_boundaries():
+    minutes = [10 * 60 + 59, 11 * 60, 11 * 60 + 40, 12 * 60 + 30, 12 * 60 + 31, 13 * 60, 13 * 60 + 1]
+    assert time_factor(minutes).tolist() == [1.0, 1.3, 1.8, 1.8, 1.1, 1.1, 1.0]
+
+
+def test_vectorised_scores_match_per_row_rules(catalog):
+    canteens = catalog.arrays
+    rng = np.random.default_rng(42)
+    n = 400
+    users = rng.choice(USER_TYPES, n)
+    purposes = rng.choice(DINING_PURPOSES, n)
+    minutes = rng.integers(6 * 60, 23 * 60, n)
+    low = rng.integers(5, 30, n)
+    prices = np.column_stack([low, low + rng.integers(0, 20, n)])
+    waits = rng.integers(5, 45, n)
+    types = [list(rng.choice(CANTEEN_TYPES, rng.integers(1, len(CANTEEN_TYPES) + 1), replace=False))
+             for _ in range(n)]
+    profiles = build_profiles(users, purposes, minutes, prices, waits, types, 2)
+
+    result = score_profiles(canteens, profiles, rng=np.random.default_rng(7))
+    # score_profiles 先整块抽等待扰动，再整块抽拥挤度扰动
+    noise = np.random.default_rng(7)
+    shape = (n, len(canteens))
+    wait_noise, crowd_noise = noise.integers(-2, 5, shape), noise.integers(-10, 15, shape)
+
+    for i in range(n):
+        for j, name in enumerate(canteens.names):
+            info = catalog.db[name]
+            lo, hi = info["price_range"]
+            expected_eligible = (info["type"] in types[i] and not (lo > prices[i, 1] or hi < prices[i, 0])
+                                 and canteens.hours.open_at(minutes[i], 2)[j])
+            assert result.eligible[i, j] == expected_eligible
+            score, wait, crowd, recommended = reference_row(
+                name, info, users[i], purposes[i], minutes[i], prices[i], waits[i], wait_noise[i, j],
+                crowd_noise[i, j]
+            )
+            assert result.score[i, j] == pytest.approx(score)
+            assert result.wait[i, j] == wait
+            assert result.crowd[i, j] == crowd
+            assert result.recommended[i, j] == recommended
+            assert result.strong[i, j] == (recommended and score >= 8.0)
+
+
+def test_single_profile_matches_batch_row(catalog):
+    canteens = catalog.arrays
+    batch = build_profiles(["教师", "本科生"], ["学习讨论", "朋友聚餐"], [12 * 60, 18 * 60], [(8, 25), (10, 30)],
+                           [15, 20], [CANTEEN_TYPES, CANTEEN_TYPES], 2)
+    crowd = np.full(len(canteens), 60.0)
+    both = score_profiles(canteens, batch, crowd=crowd)
+    one = score_profiles(canteens, single_profile("本科生", "朋友聚餐", 18 * 60, (10, 30), 20, CANTEEN_TYPES, 2),
+                         crowd=crowd)
+    assert np.array_equal(both.score[1], one.score[0])
+    assert np.array_equal(both.recommended[1], one.recommended[0])
+
+
+def test_given_wait_and_adjustment_are_used(catalog):
+    canteens = catalog.arrays
+    profile = single_profile("本科生", "改善伙食", 15 * 60, (5, 50), 10, CANTEEN_TYPES, 2)
+    m = len(canteens)
+    plain = score_profiles(canteens, profile, crowd=np.full(m, 40.0), wait=np.full(m, 8.0))
+    assert (plain.wait == 8).all()
+    boosted = score_profiles(canteens, profile, crowd=np.full(m, 40.0), wait=np.full(m, 8.0),
+                             adjustment=np.full(m, 0.5))
+    assert np.allclose(boosted.score, np.clip(plain.score + 0.5, 1.0, 10.0))
+    far = score_profiles(canteens, profile, crowd=np.full(m, 40.0), wait=np.full(m, 8.0), walk=np.full(m, 5.0))
+    assert (far.total_wait == 13).all()
+    assert not far.recommended.any()
+
+
+def test_unknown_profile_values_raise():
+    with pytest.raises(ValueError):
+        build_profiles(["校长"], ["日常快速就餐"], [720], [(8, 25)], [15], [CANTEEN_TYPES])
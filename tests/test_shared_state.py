@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+import shared_state
+from catalog import CatalogStore
+from live_occupancy import LiveOccupancy
+from result_cache import normalize_query
+from scoring import CANTEEN_TYPES
+from shared_state import SharedState
+
+
+def write_catalog(path, names, mtime):
+    records = [{"name": name, "type": "大众食堂", "price_range": [8, 12], "base_score": 8.0, "seats": 100,
+                "opening_hours": "6:30-20:30"} for name in names]
+    path.write_text(json.dumps({"canteens": records}, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def state(tmp_path):
+    path = tmp_path / "canteens.json"
+    write_catalog(path, ["甲", "乙"], 1)
+    return SharedState(catalog_store=CatalogStore(str(path), check_seconds=0),
+                       forecast_path=str(tmp_path / "forecast.npz"), clock=lambda: datetime(2026, 10, 14, 12, 0)), path
+
+
+def test_old_snapshot_stays_consistent_after_catalog_reload(state):
+    state, path = state
+    old = state.snapshot
+    friday = date(2026, 10, 16)
+    old_version = state.data_version(friday, old)
+    write_catalog(path, ["甲", "乙", "丙"], 2)
+    state.refresh()
+    assert len(state.snapshot.canteens) == 3
+
+    # 重载前取到的快照：版本、数据表与食堂数都来自这份快照
+    assert state.data_version(friday, old) == old_version
+    assert state.data_version(friday) != old_version
+    crowd, queue = state.conditions(friday, old)
+    assert crowd.shape[0] == queue.wait.shape[0] == len(old.canteens) == 2
+    crowd, queue = state.conditions(friday)
+    assert crowd.shape[0] == 3
+
+
+def test_today_uses_snapshot_tables(state):
+    state, _ = state
+    snapshot = state.snapshot
+    today = snapshot.created_at.date()
+    assert state.conditions(today, snapshot)[0] is snapshot.crowd
+    assert state.data_version(today, snapshot) == snapshot.data_version
+
+
+def test_live_tables_only_apply_to_today(tmp_path):
+    path = tmp_path / "canteens.json"
+    write_catalog(path, ["甲", "乙"], 1)
+    live = LiveOccupancy(["甲", "乙"], [100, 100])
+    live.ingest(["甲,2026-10-14 11:59,in"] * 30)
+    state = SharedState(catalog_store=CatalogStore(str(path)), forecast_path=str(tmp_path / "forecast.npz"),
+                        clock=lambda: datetime(2026, 10, 14, 12, 0), live=live)
+    snapshot = state.snapshot
+    assert snapshot.live[0]
+    today, next_week = date(2026, 10, 14), date(2026, 10, 21)
+    plain, _, _ = state.day_tables(today.weekday(), snapshot)
+    assert state.conditions(today, snapshot)[0][0, 12 * 60] != plain[0, 12 * 60]
+
+    # 同一星期几的其他日期不能拿到今天的实时修正
+    crowd, queue = state.conditions(next_week, snapshot)
+    assert crowd is plain
+    assert state.data_version(next_week, snapshot) != snapshot.data_version
+    assert state.data_version(next_week, snapshot)[-1] == 0
+
+
+def test_day_tables_built_once_under_concurrency(state, monkeypatch):
+    state, path = state
+    built = []
+    original = shared_state.build_day_tables
+
+    def slow_build(canteens, forecaster, weekday):
+        built.append(weekday)
+        time.sleep(0.05)
+        return original(canteens, forecaster, weekday)
+
+    monkeypatch.setattr(shared_state, "build_day_tables", slow_build)
+    old = state.snapshot
+    threads = [threading.Thread(target=state.day_tables, args=(4,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert built == [4]
+
+    # 目录更新后，旧快照的查询不会把当前数据的表挤出缓存
+    write_catalog(path, ["甲", "乙", "丙"], 2)
+    state.refresh()
+    built.clear()
+    state.day_tables(5)
+    state.day_tables(5, old)
+    state.day_tables(5)
+    assert built == [5, 5]
+
+
+def test_batch_scoring_matches_single_queries(state):
+    state, _ = state
+    snapshot = state.snapshot
+    day = state.calendar.day(date(2026, 10, 14))
+    keys = [normalize_query("本科生", "日常快速就餐", 12 * 60, (8, 25), 15, CANTEEN_TYPES, 2),
+            normalize_query("教师", "学习讨论", 12 * 60, (5, 40), 30, CANTEEN_TYPES, 2),
+            normalize_query("研究生", "朋友聚餐", 12 * 60 + 4, (8, 12), 10, ["大众食堂"], 2)]
+    personal = np.array([[0.0, 0.0], [0.8, -0.8], [0.0, 0.5]])
+    mask = np.array([[True, True], [True, True], [False, True]])
+    batch, seats = state.score_queries(keys, snapshot, personal, mask, day)
+    for i, key in enumerate(keys):
+        single, single_seats = state.score_query(key, snapshot, personal[i], mask[i], day)
+        for field in ("eligible", "score", "wait", "crowd", "recommended", "strong"):
+            assert np.array_equal(getattr(batch, field)[i], getattr(single, field)[0]), field
+        assert np.array_equal(seats[i], single_seats)
+    assert not batch.eligible[2, 0]
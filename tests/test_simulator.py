@@ -0,0 +1,37 @@
+import numpy as np
+
+from catalog import load_catalog
+from simulator import generate_students, main, simulate
+
+CATALOG = "data/canteens.json"
+
+
+def test_simulation_runs_until_every_queue_drains():
+    catalog = load_catalog(CATALOG)
+    students = generate_students(6000, catalog.walking, seed=1)
+    result = simulate(catalog.arrays, catalog.walking, students, "forecast", seed=1)
+    assigned = result.choice >= 0
+    assert (result.served == assigned).all()
+    assert result.queue_length[:, -1].sum() == 0
+    summary = result.summary()
+    assert summary["served"] == assigned.sum() and summary["unserved"] == 0
+    assert summary["mean_queue_wait"] == round(float(result.queue_wait[result.served].mean()), 2)
+
+
+def test_forecast_policy_uses_adjustment_and_day_factor():
+    catalog = load_catalog(CATALOG)
+    students = generate_students(500, catalog.walking, seed=2)
+    base = simulate(catalog.arrays, catalog.walking, students, "forecast", seed=2)
+    favourite = np.bincount(base.choice[base.choice >= 0]).argmax()
+    adjustment = np.zeros(len(catalog.arrays))
+    adjustment[favourite] = -20.0
+    adjusted = simulate(catalog.arrays, catalog.walking, students, "forecast", seed=2, adjustment=adjustment,
+                        factor=np.ones(1440))
+    assert favourite not in adjusted.choice
+
+
+def test_main_prints_policies_without_students(tmp_path, capsys):
+    main(["--students", "0", "--policies", "forecast", "nearest", "--date", "2026-10-14",
+          "--forecast", str(tmp_path / "forecast.npz"), "--feedback-db", str(tmp_path / "feedback.db")])
+    err = capsys.readouterr().err
+    assert "forecast" in err and "平均排队      -" in err
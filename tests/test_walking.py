@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from catalog import CatalogStore, load_catalog
+from result_cache import normalize_query
+from scoring import CANTEEN_TYPES
+from shared_state import SharedState
+from walking import WalkingIndex, walking_minutes
+
+CSV_CATALOG = ("name,type,price_min,price_max,base_score,seats,opening_hours\n"
+               "甲食堂,大众食堂,8,12,8.5,500,6:30-20:30\n"
+               "乙食堂,快餐食堂,10,16,7.8,350,6:30-21:00\n")
+
+
+def test_walking_minutes():
+    minutes = walking_minutes([[0, 0]], [[300, 400], [0, 0]], speed=100, detour=1.0)
+    assert minutes.tolist() == [[5.0, 0.0]]
+
+
+def test_minutes_for_known_and_unknown_buildings():
+    index = WalkingIndex(["楼"], [[0, 0]], [[75, 0], [np.nan, np.nan]], detour=1.0)
+    minutes = index.minutes_for(["楼", None, "不存在"])
+    assert minutes.shape == (3, 2)
+    assert minutes[0].tolist() == [1.0, 0.0]
+    assert not minutes[1:].any()
+
+
+def test_minutes_for_without_buildings():
+    index = WalkingIndex([], [], [[0, 0], [10, 10]])
+    assert index.minutes_for([None, "楼"]).tolist() == [[0.0, 0.0], [0.0, 0.0]]
+
+
+def test_nearest_respects_candidates():
+    index = WalkingIndex(["楼"], [[0, 0]], [[10, 0], [20, 0], [np.nan, np.nan]])
+    assert index.nearest_from_building("楼")[0] == 0
+    assert index.nearest_from_building("楼", np.array([False, True, True]))[0] == 1
+    assert index.nearest_from_building("楼", np.array([False, False, True]))[0] == -1
+
+
+@pytest.fixture
+def csv_catalog(tmp_path):
+    path = tmp_path / "canteens.csv"
+    path.write_text(CSV_CATALOG, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_catalog_scores_queries(csv_catalog, tmp_path):
+    assert len(load_catalog(csv_catalog).walking) == 0
+    state = SharedState(catalog_store=CatalogStore(csv_catalog), forecast_path=str(tmp_path / "forecast.npz"),
+                        clock=lambda: datetime(2026, 10, 14, 12, 0))
+    key = normalize_query("本科生", "日常快速就餐", 12 * 60, (8, 25), 15, CANTEEN_TYPES, 2)
+    result, seat_occupancy = state.score_query(key)
+    assert result.score.shape == (1, 2)
+    assert not result.walk.any()
+    assert seat_occupancy.shape == (2,)
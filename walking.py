@@ -0,0 +1,130 @@
+# walking.py - 步行时间索引：楼宇 × 食堂步行矩阵与最近食堂查询
+#
+# 食堂和校园楼宇在目录中带有平面坐标（米，各校区共用同一投影坐标系）。
+# 加载目录时一次算出 楼宇 × 食堂 的步行分钟矩阵，页面按所在楼宇直接取一行；
+# 任意坐标点的"最近营业食堂"查询走 KD 树（安装了 scipy 时使用 cKDTree，
+# 否则用 NumPy 分块暴力计算），数千个起点、上千个食堂也只需一次向量化查询。
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+WALKING_SPEED_M_PER_MIN = 75.0
+DETOUR_FACTOR = 1.3          # 校园道路相对直线距离的绕行系数
+DEFAULT_NEAREST_K = 8
+CHUNK_ROWS = 4096
+
+
+def walking_minutes(origins, targets, speed=WALKING_SPEED_M_PER_MIN, detour=DETOUR_FACTOR):
+    """(N, 2) 起点到 (M, 2) 终点的步行分钟 (N, M)，按行分块计算以限制临时内存"""
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    minutes = np.empty((len(origins), len(targets)), dtype=np.float32)
+    scale = detour / speed
+    for start in range(0, len(origins), CHUNK_ROWS):
+        block = origins[start:start + CHUNK_ROWS, None, :] - targets[None, :, :]
+        minutes[start:start + CHUNK_ROWS] = np.hypot(block[..., 0], block[..., 1]) * scale
+    return minutes
+
+
+class WalkingIndex:
+    """楼宇 × 食堂步行矩阵（预计算）与食堂坐标的 KD 树；未标注坐标的食堂步行时间记为 0"""
+
+    def __init__(self, building_names, building_xy, canteen_xy, speed=WALKING_SPEED_M_PER_MIN,
+                 detour=DETOUR_FACTOR):
+        self.building_names = list(building_names)
+        self._position = {name: i for i, name in enumerate(self.building_names)}
+        self.building_xy = np.asarray(building_xy, dtype=np.float64).reshape(-1, 2)
+        self.canteen_xy = np.asarray(canteen_xy, dtype=np.float64).reshape(-1, 2)
+        self.speed = speed
+        self.detour = detour
+        self.has_coords = ~np.isnan(self.canteen_xy).any(axis=1)
+
+        self.matrix = np.nan_to_num(walking_minutes(self.building_xy, self.canteen_xy, speed, detour), nan=0.0)
+        self.matrix.setflags(write=False)
+
+        self._tree_ids = np.flatnonzero(self.has_coords)
+        points = self.canteen_xy[self._tree_ids]
+        self._tree = cKDTree(points) if cKDTree is not None and len(points) else None
+
+    def __len__(self):
+        return len(self.building_names)
+
+    def building_index(self, names):
+        """楼宇名称 -> 下标，None 或未知名称为 -1"""
+        return np.array([self._position.get(name, -1) if name is not None else -1 for name in names],
+                        dtype=np.int64)
+
+    def minutes_for(self, origins):
+        """N 个起点楼宇（名称，None 表示不考虑位置）到各食堂的步行分钟 (N, M)"""
+        index = self.building_index(origins)
+        if not len(self.building_names):
+            # 目录没有楼宇（如 CSV 目录）时不考虑位置
+            return np.zeros((len(index), len(self.canteen_xy)), dtype=self.matrix.dtype)
+        minutes = self.matrix[np.maximum(index, 0)]
+        minutes[index < 0] = 0.0
+        return minutes
+
+    def minutes_from_points(self, points):
+        """任意坐标起点 (N, 2) 到各食堂的步行分钟 (N, M)"""
+        return np.nan_to_num(walking_minutes(points, self.canteen_xy, self.speed, self.detour), nan=0.0)
+
+    # ============ 最近食堂 ============
+    def _query(self, points, k):
+        """各点最近的 k 个有坐标食堂：(距离 (N, k), 食堂下标 (N, k))，按距离升序"""
+        if self._tree is not None:
+            dist, pos = self._tree.query(points, k=k)
+            return dist.reshape(len(points), k), self._tree_ids[pos.reshape(len(points), k)]
+
+        targets = self.canteen_xy[self._tree_ids]
+        dist = np.empty((len(points), k))
+        pos = np.empty((len(points), k), dtype=np.int64)
+        for start in range(0, len(points), CHUNK_ROWS):
+            block = points[start:start + CHUNK_ROWS, None, :] - targets[None, :, :]
+            d = np.hypot(block[..., 0], block[..., 1])
+            part = np.argpartition(d, k - 1, axis=1)[:, :k] if k < d.shape[1] else np.argsort(d, axis=1)
+            part_d = np.take_along_axis(d, part, axis=1)
+            order = np.argsort(part_d, axis=1)
+            dist[start:start + CHUNK_ROWS] = np.take_along_axis(part_d, order, axis=1)
+            pos[start:start + CHUNK_ROWS] = np.take_along_axis(part, order, axis=1)
+        return dist, self._tree_ids[pos]
+
+    def nearest(self, points, candidates=None):
+        """各坐标点最近的食堂（candidates 为 (M,) 布尔数组时只在其中找，如营业中的食堂）
+
+        返回 (食堂下标 (N,), 步行分钟 (N,))，找不到时下标为 -1、分钟为 inf。
+        先取最近的 k 个，其中没有候选食堂的点再扩大 k 重查。
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        allowed = self.has_coords if candidates is None else self.has_coords & np.asarray(candidates, dtype=bool)
+        index = np.full(len(points), -1, dtype=np.int64)
+        minutes = np.full(len(points), np.inf)
+        if not allowed.any():
+            return index, minutes
+
+        total = len(self._tree_ids)
+        k = min(DEFAULT_NEAREST_K, total)
+        pending = np.arange(len(points))
+        while len(pending):
+            dist, ids = self._query(points[pending], k)
+            ok = allowed[ids]
+            hit = ok.any(axis=1)
+            first = ok.argmax(axis=1)[hit]
+            rows = pending[hit]
+            index[rows] = ids[hit, first]
+            minutes[rows] = dist[hit, first] * self.detour / self.speed
+            pending = pending[~hit]
+            if k == total:
+                break
+            k = min(k * 4, total)
+        return index, minutes
+
+    def nearest_from_building(self, name, candidates=None):
+        """某楼宇最近的食堂 (下标, 步行分钟)，未知楼宇返回 (-1, inf)"""
+        i = self._position.get(name)
+        if i is None:
+            return -1, np.inf
+        index, minutes = self.nearest(self.building_xy[i], candidates)
+        return int(index[0]), float(minutes[0])